@@ -0,0 +1,66 @@
+import sys
+import time
+import resource
+import cv2
+
+from eye_tracker.GazeTracking.gaze_tracking import GazeTracking
+from eye_tracker.calibration import Calibration
+
+# Wall time and CPU use of the calibration frame analysis for several worker counts.
+# Frames of a recorded video are fed to Calibration.update(), looping over the video
+# if it is shorter than the calibration sequence. With --paced, frames are fed every
+# dt seconds like the real calibration; otherwise as fast as the workers take them.
+#
+# Usage: python benchmark_calibration.py video.avi [--paced] [workers ...]
+
+DT = 0.04
+PERIOD = 8
+TOTAL_LOOPS = 6
+
+def read_frames(path):
+    video = cv2.VideoCapture(path)
+    frames = []
+    while True:
+        ok, frame = video.read()
+        if not ok:
+            break
+        frames.append(frame)
+    video.release()
+    return frames
+
+def cpu_time():
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+def run(frames, workers, paced):
+    start_wall = time.monotonic()
+    start_cpu = cpu_time()
+
+    calibration = Calibration(DT, PERIOD, TOTAL_LOOPS, 1920, 1080, GazeTracking(), workers=workers)
+    step = 0
+    while not calibration.done:
+        if paced:
+            time.sleep(max(start_wall + step * DT - time.monotonic(), 0))
+        calibration.update(frames[step % len(frames)])
+        step += 1
+
+    # worker processes are joined when the calibration completes, so their CPU time is counted
+    return time.monotonic() - start_wall, cpu_time() - start_cpu, calibration.total_steps
+
+if __name__ == '__main__':
+    args = [arg for arg in sys.argv[1:] if arg != '--paced']
+    if not args:
+        sys.exit('Usage: python benchmark_calibration.py video.avi [--paced] [workers ...]')
+    paced = '--paced' in sys.argv
+    frames = read_frames(args[0])
+    worker_counts = [int(n) for n in args[1:]] or [1, 2, 4]
+
+    results = []
+    for workers in worker_counts:
+        wall, cpu, steps = run(frames, workers, paced)
+        results.append((workers, wall, cpu, steps))
+
+    print('workers  wall (s)  cpu (s)  cores used  frames/s')
+    for workers, wall, cpu, steps in results:
+        print('{:7d}  {:8.1f}  {:7.1f}  {:10.2f}  {:8.1f}'.format(workers, wall, cpu, cpu / wall, steps / wall))
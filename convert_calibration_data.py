@@ -0,0 +1,25 @@
+import os
+import sys
+
+from eye_tracker.calibration import load_calibration_data, save_calibration_data
+
+# Converts calibration data between CSV and the binary .npy format, which is memory-mapped
+# when loaded instead of being parsed. The formats are chosen by extension, the output
+# defaults to the input with its extension swapped (.csv -> .npy, .npy -> .csv).
+#
+# Usage: python convert_calibration_data.py input [output]
+# e.g.   python convert_calibration_data.py eye_tracker/calibration_data/matt.csv
+
+if __name__ == '__main__':
+    if len(sys.argv) not in (2, 3):
+        sys.exit('Usage: python convert_calibration_data.py input [output]')
+
+    source = sys.argv[1]
+    root, extension = os.path.splitext(source)
+    destination = sys.argv[2] if len(sys.argv) == 3 else root + ('.csv' if extension.lower() == '.npy' else '.npy')
+    if os.path.abspath(destination) == os.path.abspath(source):
+        sys.exit('Input and output are the same file.')
+
+    data = load_calibration_data(source)
+    save_calibration_data(destination, data)
+    print('{} rows written to {}'.format(len(data), destination))
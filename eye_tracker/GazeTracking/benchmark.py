@@ -0,0 +1,134 @@
+"""
+Benchmarks of GazeTracking on a recorded video.
+
+detection: compares the time spent in refresh() and the eye landmarks found
+with each detection scale against full-size detection.
+
+pupil: compares the time spent locating the pupil in each binarized eye and
+the position found by each pupil locator against the 'contours' locator.
+
+Usage: python benchmark.py detection video.avi [scale ...]
+       python benchmark.py pupil video.avi
+"""
+
+import sys
+import time
+import cv2
+import numpy as np
+from gaze_tracking import GazeTracking
+from gaze_tracking.pupil import Pupil
+
+
+def read_frames(path):
+    """Loads every frame of a video file in memory"""
+    video = cv2.VideoCapture(path)
+    frames = []
+    while True:
+        ok, frame = video.read()
+        if not ok:
+            break
+        frames.append(frame)
+    video.release()
+    return frames
+
+
+def run(gaze, frames):
+    """Refreshes the tracker with each frame.
+
+    Returns:
+        The latency of each frame (in seconds) and the eye landmarks found
+        in each frame (None when there was no face)
+    """
+    latencies = []
+    landmarks = []
+    for frame in frames:
+        start = time.perf_counter()
+        gaze.refresh(frame)
+        latencies.append(time.perf_counter() - start)
+
+        if gaze.eye_left is None:
+            landmarks.append(None)
+        else:
+            landmarks.append(np.vstack((gaze.eye_left.landmark_points, gaze.eye_right.landmark_points)))
+
+    return np.array(latencies), landmarks
+
+
+def landmark_error(landmarks, reference):
+    """Mean distance (in pixels) between the landmarks and the reference ones,
+    on the frames where both found a face"""
+    errors = [
+        np.mean(np.hypot(*(points - expected).T))
+        for points, expected in zip(landmarks, reference)
+        if points is not None and expected is not None
+    ]
+    return np.mean(errors) if errors else float('nan')
+
+
+def benchmark_detection(frames, scales):
+    """Prints the latency and the landmark error of each detection scale"""
+    reference_latencies, reference = run(GazeTracking(debug=True), frames)
+    print('{} frames'.format(len(reference)))
+    print('scale  median (ms)  p95 (ms)  faces  landmark error (px)')
+
+    for scale in [1.0] + scales:
+        if scale == 1.0:
+            latencies, landmarks = reference_latencies, reference
+        else:
+            latencies, landmarks = run(GazeTracking(detection_scale=scale, debug=True), frames)
+
+        print('{:5.2f}  {:11.1f}  {:8.1f}  {:5d}  {:19.2f}'.format(
+            scale,
+            np.median(latencies) * 1000,
+            np.percentile(latencies, 95) * 1000,
+            sum(points is not None for points in landmarks),
+            landmark_error(landmarks, reference),
+        ))
+
+
+def benchmark_pupil(frames):
+    """Prints the latency of each pupil locator, per eye, and the distance
+    between the pupils it finds and the ones found with 'contours'"""
+    gaze = GazeTracking(debug=True)
+    iris_frames = []
+    for frame in frames:
+        gaze.refresh(frame)
+        if gaze.eye_left is not None:
+            iris_frames += [gaze.eye_left.pupil.iris_frame, gaze.eye_right.pupil.iris_frame]
+
+    print('{} eyes'.format(len(iris_frames)))
+    print('locator      median (us)  p95 (us)  pupils  mean error (px)  max error (px)')
+
+    reference = [Pupil.locate(iris_frame, 'contours') for iris_frame in iris_frames]
+    for locator in Pupil.LOCATORS:
+        latencies = []
+        positions = []
+        for iris_frame in iris_frames:
+            start = time.perf_counter()
+            positions.append(Pupil.locate(iris_frame, locator))
+            latencies.append(time.perf_counter() - start)
+
+        errors = [
+            np.hypot(position[0] - expected[0], position[1] - expected[1])
+            for position, expected in zip(positions, reference)
+            if position is not None and expected is not None
+        ] or [float('nan')]
+        print('{:11s}  {:11.1f}  {:8.1f}  {:6d}  {:15.2f}  {:14.2f}'.format(
+            locator,
+            np.median(latencies) * 1e6,
+            np.percentile(latencies, 95) * 1e6,
+            sum(position is not None for position in positions),
+            np.mean(errors),
+            np.max(errors),
+        ))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3 or sys.argv[1] not in ('detection', 'pupil'):
+        sys.exit(__doc__)
+
+    frames = read_frames(sys.argv[2])
+    if sys.argv[1] == 'detection':
+        benchmark_detection(frames, [float(scale) for scale in sys.argv[3:]] or [0.5, 0.25])
+    else:
+        benchmark_pupil(frames)
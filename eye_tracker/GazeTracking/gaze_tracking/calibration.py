@@ -1,5 +1,6 @@
 from __future__ import division
 import cv2
+import numpy as np
 from .pupil import Pupil
 
 
@@ -7,13 +8,35 @@ class Calibration(object):
     """
     This class calibrates the pupil detection algorithm by finding the
     best binarization threshold value for the person and the webcam.
+
+    When adaptive, the threshold keeps following the lighting after the
+    calibration: it is re-evaluated every `interval` frames, or as soon as
+    the pupil is lost, and smoothed with an exponential moving average.
+    The threshold in use only changes once the average has moved by
+    `hysteresis` or more.
     """
 
-    def __init__(self):
+    def __init__(self, adaptive=False, interval=30, smoothing=0.2, hysteresis=3):
+        """
+        Arguments:
+            adaptive (bool): Keep updating the thresholds after the calibration
+            interval (int): Number of frames between two evaluations of a threshold
+            smoothing (float): Weight of a new evaluation in the moving average
+            hysteresis (float): Change of the average needed to change the threshold
+        """
         self.nb_frames = 20
+        self.thresholds = range(5, 100, 5)
         self.thresholds_left = []
         self.thresholds_right = []
 
+        self.adaptive = adaptive
+        self.interval = interval
+        self.smoothing = smoothing
+        self.hysteresis = hysteresis
+        self._averages = {}
+        self._current = {}
+        self._nb_frames_since_evaluation = {0: 0, 1: 0}
+
     def is_complete(self):
         """Returns true if the calibration is completed"""
         return len(self.thresholds_left) >= self.nb_frames and len(self.thresholds_right) >= self.nb_frames
@@ -24,6 +47,8 @@ class Calibration(object):
         Argument:
             side: Indicates whether it's the left eye (0) or the right eye (1)
         """
+        if side in self._current:
+            return self._current[side]
         if side == 0:
             return int(sum(self.thresholds_left) / len(self.thresholds_left))
         elif side == 1:
@@ -44,22 +69,37 @@ class Calibration(object):
         return nb_blacks / nb_pixels
 
     @staticmethod
-    def find_best_threshold(eye_frame):
+    def iris_sizes(eye_frame, thresholds):
+        """Returns the iris size (see iris_size) that each threshold gives.
+
+        The frame is filtered once; a pixel is black after binarization
+        if it is lower or equal to the threshold, so the number of black
+        pixels for every threshold is read from the cumulative histogram.
+
+        Arguments:
+            eye_frame (numpy.ndarray): Frame of the eye to be analyzed
+            thresholds (numpy.ndarray): Integer threshold values to evaluate
+        """
+        frame = Pupil.preprocess(eye_frame)[5:-5, 5:-5]
+        histogram = np.bincount(frame.ravel(), minlength=256)
+        nb_blacks = np.concatenate(([0], np.cumsum(histogram)))
+        return nb_blacks[np.clip(thresholds, -1, 255) + 1] / frame.size
+
+    @staticmethod
+    def find_best_threshold(eye_frame, thresholds=range(5, 100, 5)):
         """Calculates the optimal threshold to binarize the
         frame for the given eye.
 
-        Argument:
+        Arguments:
             eye_frame (numpy.ndarray): Frame of the eye to be analyzed
+            thresholds (list): Candidate integer threshold values
         """
         average_iris_size = 0.48
-        trials = {}
-
-        for threshold in range(5, 100, 5):
-            iris_frame = Pupil.image_processing(eye_frame, threshold)
-            trials[threshold] = Calibration.iris_size(iris_frame)
+        thresholds = np.asarray(thresholds)
+        trials = Calibration.iris_sizes(eye_frame, thresholds)
 
-        best_threshold, iris_size = min(trials.items(), key=(lambda p: abs(p[1] - average_iris_size)))
-        return best_threshold
+        best = np.argmin(np.abs(trials - average_iris_size))
+        return int(thresholds[best])
 
     def evaluate(self, eye_frame, side):
         """Improves calibration by taking into consideration the
@@ -69,9 +109,37 @@ class Calibration(object):
             eye_frame (numpy.ndarray): Frame of the eye
             side: Indicates whether it's the left eye (0) or the right eye (1)
         """
-        threshold = self.find_best_threshold(eye_frame)
+        threshold = self.find_best_threshold(eye_frame, self.thresholds)
 
         if side == 0:
             self.thresholds_left.append(threshold)
         elif side == 1:
             self.thresholds_right.append(threshold)
+
+    def track(self, eye_frame, side, pupil_located):
+        """Updates the threshold of an adaptive calibration once the initial
+        calibration is complete. Most frames only increment a counter.
+
+        Arguments:
+            eye_frame (numpy.ndarray): Frame of the eye
+            side: Indicates whether it's the left eye (0) or the right eye (1)
+            pupil_located (bool): Whether the pupil was found with the current threshold
+        """
+        if not self.adaptive or not self.is_complete():
+            return
+
+        self._nb_frames_since_evaluation[side] += 1
+        if pupil_located and self._nb_frames_since_evaluation[side] < self.interval:
+            return
+        self._nb_frames_since_evaluation[side] = 0
+
+        if side not in self._current:
+            self._current[side] = self.threshold(side)
+            self._averages[side] = self._current[side]
+
+        threshold = self.find_best_threshold(eye_frame, self.thresholds)
+        average = self._averages[side] + self.smoothing * (threshold - self._averages[side])
+        self._averages[side] = average
+
+        if abs(average - self._current[side]) >= self.hysteresis:
+            self._current[side] = int(round(average))
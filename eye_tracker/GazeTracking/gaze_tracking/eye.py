@@ -13,14 +13,14 @@ class Eye(object):
     LEFT_EYE_POINTS = [36, 37, 38, 39, 40, 41]
     RIGHT_EYE_POINTS = [42, 43, 44, 45, 46, 47]
 
-    def __init__(self, original_frame, landmarks, side, calibration):
+    def __init__(self, original_frame, landmarks, side, calibration, pupil_locator='contours'):
         self.frame = None
         self.origin = None
         self.center = None
         self.pupil = None
         self.landmark_points = None
 
-        self._analyze(original_frame, landmarks, side, calibration)
+        self._analyze(original_frame, landmarks, side, calibration, pupil_locator)
 
     @staticmethod
     def _middle_point(p1, p2):
@@ -46,13 +46,6 @@ class Eye(object):
         region = region.astype(np.int32)
         self.landmark_points = region
 
-        # Applying a mask to get only the eye
-        height, width = frame.shape[:2]
-        black_frame = np.zeros((height, width), np.uint8)
-        mask = np.full((height, width), 255, np.uint8)
-        cv2.fillPoly(mask, [region], (0, 0, 0))
-        eye = cv2.bitwise_not(black_frame, frame.copy(), mask=mask)
-
         # Cropping on the eye
         margin = 5
         min_x = np.min(region[:, 0]) - margin
@@ -60,7 +53,19 @@ class Eye(object):
         min_y = np.min(region[:, 1]) - margin
         max_y = np.max(region[:, 1]) + margin
 
-        self.frame = eye[min_y:max_y, min_x:max_x]
+        # Resolve the crop like slicing would, so that an eye at the border
+        # of the frame gives the same crop as slicing a full-size mask
+        height, width = frame.shape[:2]
+        start_x, stop_x, _ = slice(min_x, max_x).indices(width)
+        start_y, stop_y, _ = slice(min_y, max_y).indices(height)
+        crop = frame[start_y:stop_y, start_x:stop_x]
+
+        # Applying a mask to get only the eye, white everywhere else
+        mask = np.full(crop.shape[:2], 255, np.uint8)
+        if mask.size:
+            cv2.fillPoly(mask, [region - np.int32((start_x, start_y))], (0, 0, 0))
+
+        self.frame = np.bitwise_or(crop, mask)
         self.origin = (min_x, min_y)
 
         height, width = self.frame.shape[:2]
@@ -92,7 +97,7 @@ class Eye(object):
 
         return ratio
 
-    def _analyze(self, original_frame, landmarks, side, calibration):
+    def _analyze(self, original_frame, landmarks, side, calibration, pupil_locator):
         """Detects and isolates the eye in a new frame, sends data to the calibration
         and initializes Pupil object.
 
@@ -101,6 +106,7 @@ class Eye(object):
             landmarks (dlib.full_object_detection): Facial landmarks for the face region
             side: Indicates whether it's the left eye (0) or the right eye (1)
             calibration (calibration.Calibration): Manages the binarization threshold value
+            pupil_locator (str): How the pupil is located in the binarized eye (see Pupil.locate)
         """
         if side == 0:
             points = self.LEFT_EYE_POINTS
@@ -116,4 +122,5 @@ class Eye(object):
             calibration.evaluate(self.frame, side)
 
         threshold = calibration.threshold(side)
-        self.pupil = Pupil(self.frame, threshold)
+        self.pupil = Pupil(self.frame, threshold, pupil_locator)
+        calibration.track(self.frame, side, self.pupil.x is not None)
@@ -0,0 +1,43 @@
+class GazeResult(object):
+    """
+    This class holds what was found in a frame: the position of the
+    pupils, the direction of the gaze and the blinking ratio.
+    It only keeps numbers (no frames) and can't be modified.
+    """
+
+    __slots__ = ('pupil_left', 'pupil_right', 'horizontal_ratio', 'vertical_ratio', 'blinking')
+
+    def __init__(self, pupil_left=None, pupil_right=None, horizontal_ratio=None, vertical_ratio=None,
+                 blinking=None):
+        """
+        Arguments:
+            pupil_left (tuple): Coordinates (x,y) of the left pupil in the frame, or None
+            pupil_right (tuple): Coordinates (x,y) of the right pupil in the frame, or None
+            horizontal_ratio (float): Horizontal direction of the gaze, or None
+            vertical_ratio (float): Vertical direction of the gaze, or None
+            blinking (float): Width / height ratio of the eyes, or None
+        """
+        object.__setattr__(self, 'pupil_left', pupil_left)
+        object.__setattr__(self, 'pupil_right', pupil_right)
+        object.__setattr__(self, 'horizontal_ratio', horizontal_ratio)
+        object.__setattr__(self, 'vertical_ratio', vertical_ratio)
+        object.__setattr__(self, 'blinking', blinking)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('GazeResult is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError('GazeResult is immutable')
+
+    def __reduce__(self):
+        return (GazeResult, tuple(getattr(self, name) for name in self.__slots__))
+
+    def __repr__(self):
+        return 'GazeResult({})'.format(', '.join(
+            '{}={!r}'.format(name, getattr(self, name)) for name in self.__slots__
+        ))
+
+    @property
+    def located(self):
+        """True if both pupils have been located"""
+        return self.pupil_left is not None and self.pupil_right is not None
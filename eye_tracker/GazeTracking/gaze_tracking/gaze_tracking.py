@@ -1,9 +1,13 @@
 from __future__ import division
 import os
+import copy
 import cv2
 import dlib
+import numpy as np
 from .eye import Eye
 from .calibration import Calibration
+from .gaze_result import GazeResult
+from .pupil import Pupil
 
 
 class GazeTracking(object):
@@ -11,13 +15,56 @@ class GazeTracking(object):
     This class tracks the user's gaze.
     It provides useful information like the position of the eyes
     and pupils and allows to know if the eyes are open or closed
+
+    Each refresh produces a GazeResult. The Eye objects, with the frames of
+    the eyes, are only kept (in eye_left and eye_right) in debug mode.
+
+    The face detector can run on a downscaled copy of the frame
+    (`detection_scale`); the landmarks are still fitted at full resolution.
+
+    In tracking mode, the face found in the previous frame is reused and only
+    the landmark predictor runs on it. The full-frame face detection only runs
+    when the face is lost, when the landmarks stop looking like the detected
+    face, or every `detection_interval` frames.
     """
 
-    def __init__(self):
+    # Largest relative change of the landmarks' size (compared to the last
+    # detection) and of their position (compared to the previous frame)
+    # that is still accepted as the same face when tracking
+    TRACKING_TOLERANCE = 0.25
+
+    def __init__(self, tracking=False, detection_interval=10, tracking_padding=0.0, detection_scale=1.0,
+                 adaptive_threshold=False, pupil_locator='contours', debug=False):
+        """
+        Arguments:
+            tracking (bool): Reuse the previous face instead of detecting it in every frame
+            detection_interval (int): Maximum number of frames between two full detections
+            tracking_padding (float): Margin added around the tracked face, relative to its size
+            detection_scale (float): Scale of the image the face detector runs on (1.0 is full size)
+            adaptive_threshold (bool): Keep adjusting the pupil thresholds after the calibration
+            pupil_locator (str): 'contours' or 'dark_region' (see Pupil.locate)
+            debug (bool): Keep the Eye objects of the last frame in eye_left and eye_right
+        """
+        if pupil_locator not in Pupil.LOCATORS:
+            raise ValueError('Unknown pupil locator {!r}, expected one of {}'.format(pupil_locator, Pupil.LOCATORS))
+
         self.frame = None
+        self.result = GazeResult()
+        self.debug = debug
         self.eye_left = None
         self.eye_right = None
-        self.calibration = Calibration()
+        self.calibration = Calibration(adaptive=adaptive_threshold)
+        self.pupil_locator = pupil_locator
+
+        self.tracking = tracking
+        self.detection_interval = detection_interval
+        self.tracking_padding = tracking_padding
+        self.detection_scale = detection_scale
+        self.face = None
+        self._face_lost = False
+        self._face_size = None
+        self._face_center = None
+        self._frames_since_detection = 0
 
         # _face_detector is used to detect faces
         self._face_detector = dlib.get_frontal_face_detector()
@@ -27,54 +74,294 @@ class GazeTracking(object):
         model_path = os.path.abspath(os.path.join(cwd, "trained_models/shape_predictor_68_face_landmarks.dat"))
         self._predictor = dlib.shape_predictor(model_path)
 
+    @staticmethod
+    def _pupil_coords(eye):
+        """Returns the coordinates of the pupil of an eye in the frame,
+        or None if it hasn't been located"""
+        if eye.pupil.x is None or eye.pupil.y is None:
+            return None
+        return (int(eye.origin[0] + eye.pupil.x), int(eye.origin[1] + eye.pupil.y))
+
+    @staticmethod
+    def _gaze_ratio(eye_left, eye_right, axis):
+        """Returns the position of the pupils in their eye frames along
+        an axis (0 for horizontal, 1 for vertical), between 0.0 and 1.0
+        """
+        pupil_left = (eye_left.pupil.x, eye_left.pupil.y)[axis] / (eye_left.center[axis] * 2 - 10)
+        pupil_right = (eye_right.pupil.x, eye_right.pupil.y)[axis] / (eye_right.center[axis] * 2 - 10)
+        return (pupil_left + pupil_right) / 2
+
+    def _result(self, eye_left, eye_right):
+        """Summarizes what was found in the eyes of a frame
+
+        Arguments:
+            eye_left (Eye): Left eye
+            eye_right (Eye): Right eye
+        """
+        pupil_left = self._pupil_coords(eye_left)
+        pupil_right = self._pupil_coords(eye_right)
+
+        horizontal = vertical = None
+        if pupil_left is not None and pupil_right is not None:
+            horizontal = self._gaze_ratio(eye_left, eye_right, 0)
+            vertical = self._gaze_ratio(eye_left, eye_right, 1)
+
+        blinking = None
+        if eye_left.blinking is not None and eye_right.blinking is not None:
+            blinking = (eye_left.blinking + eye_right.blinking) / 2
+
+        return GazeResult(pupil_left, pupil_right, horizontal, vertical, blinking)
+
     @property
     def pupils_located(self):
         """Check that the pupils have been located"""
-        try:
-            int(self.eye_left.pupil.x)
-            int(self.eye_left.pupil.y)
-            int(self.eye_right.pupil.x)
-            int(self.eye_right.pupil.y)
-            return True
-        except Exception:
-            return False
+        return self.result.located
 
-    def _analyze(self):
-        """Detects the face and initialize Eye objects"""
-        frame = cv2.cvtColor(self.frame, cv2.COLOR_BGR2GRAY)
-        faces = self._face_detector(frame)
+    @staticmethod
+    def _landmarks_box(landmarks):
+        """Returns the center and the size of the box around facial landmarks
 
-        try:
-            landmarks = self._predictor(frame, faces[0])
-            self.eye_left = Eye(frame, landmarks, 0, self.calibration)
-            self.eye_right = Eye(frame, landmarks, 1, self.calibration)
+        Arguments:
+            landmarks (dlib.full_object_detection): Facial landmarks for the face region
+        """
+        points = np.array([(p.x, p.y) for p in landmarks.parts()], np.float64)
+        low = points.min(axis=0)
+        high = points.max(axis=0)
+        return (low + high) / 2, high - low
+
+    def _tracking_region(self, frame):
+        """Returns the region where the landmarks of the tracked face are searched
 
+        Arguments:
+            frame (numpy.ndarray): Grayscale frame
+        """
+        face = self.face
+        pad_x = int(round(face.width() * self.tracking_padding))
+        pad_y = int(round(face.height() * self.tracking_padding))
+        height, width = frame.shape[:2]
+        return dlib.rectangle(
+            max(face.left() - pad_x, 0),
+            max(face.top() - pad_y, 0),
+            min(face.right() + pad_x, width - 1),
+            min(face.bottom() + pad_y, height - 1),
+        )
+
+    def _detect_face(self, frame):
+        """Runs the face detector on the whole frame and fits the landmarks
+        of the first face found. Returns None if there is no face.
+
+        Arguments:
+            frame (numpy.ndarray): Grayscale frame
+        """
+        scale = self.detection_scale
+        if scale != 1.0:
+            small = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            faces = self._face_detector(small)
+        else:
+            faces = self._face_detector(frame)
+        self._frames_since_detection = 0
+        self._face_lost = False
+
+        try:
+            face = faces[0]
         except IndexError:
-            self.eye_left = None
-            self.eye_right = None
+            self.face = None
+            return None
+
+        if scale != 1.0:
+            # back to full resolution coordinates for the landmark predictor
+            face = dlib.rectangle(
+                int(round(face.left() / scale)), int(round(face.top() / scale)),
+                int(round(face.right() / scale)), int(round(face.bottom() / scale))
+            )
+        self.face = face
+
+        landmarks = self._predictor(frame, self.face)
+        self._face_center, self._face_size = self._landmarks_box(landmarks)
+        return landmarks
+
+    def _track_face(self, frame):
+        """Fits the landmarks on the face found in the previous frame.
+        Returns None if a full detection is needed instead.
+
+        Arguments:
+            frame (numpy.ndarray): Grayscale frame
+        """
+        if not self.tracking or self.face is None or self._face_lost:
+            return None
+        if self._frames_since_detection >= self.detection_interval:
+            return None
+
+        region = self._tracking_region(frame)
+        if region.is_empty():
+            return None
+
+        landmarks = self._predictor(frame, region)
+        center, size = self._landmarks_box(landmarks)
+
+        # The predictor always returns a shape, even when the face has moved
+        # away. A fit that doesn't have the size of the detected face, or that
+        # jumped too far, is not trusted.
+        tolerance = self.TRACKING_TOLERANCE
+        if np.any(np.abs(size / self._face_size - 1) > tolerance):
+            return None
+        if np.any(np.abs(center - self._face_center) > tolerance * self._face_size):
+            return None
+
+        # follow the head with the face rectangle
+        dx, dy = np.round(center - self._face_center).astype(int)
+        self.face = dlib.rectangle(
+            self.face.left() + dx, self.face.top() + dy,
+            self.face.right() + dx, self.face.bottom() + dy
+        )
+        self._face_center = center
+        self._frames_since_detection += 1
+        return landmarks
+
+    def _locate_eyes(self, frame, landmarks):
+        """Locates the eyes and the pupils. Returns the GazeResult of the frame
+        and the left and right Eye objects (None if there is no face)
+
+        Arguments:
+            frame (numpy.ndarray): Grayscale frame
+            landmarks (dlib.full_object_detection): Facial landmarks, or None
+        """
+        if landmarks is None:
+            return GazeResult(), None, None
+
+        eye_left = Eye(frame, landmarks, 0, self.calibration, self.pupil_locator)
+        eye_right = Eye(frame, landmarks, 1, self.calibration, self.pupil_locator)
+        result = self._result(eye_left, eye_right)
+
+        return result, eye_left, eye_right
+
+    def detect_landmarks(self, frame, gray=None, face_lost=False):
+        """First half of refresh(): finds the face in a frame, tracking it
+        from the previous frames if enabled, and fits the facial landmarks.
+
+        Together with analyze_landmarks(), this lets two threads work on
+        consecutive frames: this method only uses the face tracking state,
+        analyze_landmarks() only uses the calibration. Whether the eyes were
+        located is passed back with face_lost instead of being shared.
+
+        Arguments:
+            frame (numpy.ndarray): The frame to analyze, BGR or already grayscale
+            gray (numpy.ndarray): Buffer reused for the grayscale frame, if any
+            face_lost (bool): The eyes weren't located on a previous frame,
+                the face is detected again instead of being tracked
+
+        Returns:
+            The grayscale frame and the landmarks (None if there is no face)
+        """
+        if face_lost:
+            self._face_lost = True
+
+        if frame.ndim == 2:
+            gray = frame
+        else:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=gray)
+
+        landmarks = self._track_face(gray)
+        if landmarks is None:
+            landmarks = self._detect_face(gray)
+
+        return gray, landmarks
+
+    def analyze_landmarks(self, gray, landmarks):
+        """Second half of refresh(): locates the eyes and the pupils.
+        Doesn't change the current result nor the face tracking state.
+
+        Arguments:
+            gray (numpy.ndarray): Grayscale frame returned by detect_landmarks()
+            landmarks (dlib.full_object_detection): Landmarks returned by detect_landmarks()
+
+        Returns:
+            The GazeResult of the frame
+        """
+        return self._locate_eyes(gray, landmarks)[0]
+
+    def _analyze(self):
+        """Detects the face and the eyes, and stores the result"""
+        frame, landmarks = self.detect_landmarks(self.frame, face_lost=not self.result.located)
+        self.result, eye_left, eye_right = self._locate_eyes(frame, landmarks)
+
+        if self.debug:
+            self.eye_left, self.eye_right = eye_left, eye_right
 
     def refresh(self, frame):
         """Refreshes the frame and analyzes it.
 
         Arguments:
             frame (numpy.ndarray): The frame to analyze
+
+        Returns:
+            The GazeResult of the frame
         """
         self.frame = frame
         self._analyze()
+        return self.result
+
+    def analyze_batch(self, frames):
+        """Analyzes a sequence of frames without changing the state of the
+        tracker: the current frame and result, the face tracking and the
+        calibration are the same afterwards. Face tracking (if enabled)
+        starts over for the batch, and a copy of the calibration goes on
+        with its frames.
+
+        Arguments:
+            frames (list or numpy.ndarray): The frames to analyze, in order
+
+        Returns:
+            Arrays of the horizontal ratios, the vertical ratios and the
+            blinking ratios of the frames (NaN where they couldn't be
+            computed), and a boolean array of the frames where the pupils
+            were located
+        """
+        nb_frames = len(frames)
+        horizontal = np.full(nb_frames, np.nan)
+        vertical = np.full(nb_frames, np.nan)
+        blinking = np.full(nb_frames, np.nan)
+        located = np.zeros(nb_frames, bool)
+
+        tracked_face = (self.face, self._face_lost, self._face_size, self._face_center,
+                        self._frames_since_detection)
+        calibration = self.calibration
+        self.face = None
+        self.calibration = copy.deepcopy(calibration)
+
+        gray_buffer = None
+        result = GazeResult()
+        try:
+            for i, frame in enumerate(frames):
+                # the grayscale buffer is reused, Eye objects keep copies of their crops. A
+                # grayscale frame is returned as it is, it is not a buffer that can be written to
+                gray, landmarks = self.detect_landmarks(frame, gray_buffer, face_lost=not result.located)
+                if gray is not frame:
+                    gray_buffer = gray
+                result = self.analyze_landmarks(gray, landmarks)
+
+                if result.blinking is not None:
+                    blinking[i] = result.blinking
+                if result.located:
+                    located[i] = True
+                    horizontal[i] = result.horizontal_ratio
+                    vertical[i] = result.vertical_ratio
+        finally:
+            (self.face, self._face_lost, self._face_size, self._face_center,
+             self._frames_since_detection) = tracked_face
+            self.calibration = calibration
+
+        return horizontal, vertical, blinking, located
 
     def pupil_left_coords(self):
         """Returns the coordinates of the left pupil"""
         if self.pupils_located:
-            x = self.eye_left.origin[0] + self.eye_left.pupil.x
-            y = self.eye_left.origin[1] + self.eye_left.pupil.y
-            return (x, y)
+            return self.result.pupil_left
 
     def pupil_right_coords(self):
         """Returns the coordinates of the right pupil"""
         if self.pupils_located:
-            x = self.eye_right.origin[0] + self.eye_right.pupil.x
-            y = self.eye_right.origin[1] + self.eye_right.pupil.y
-            return (x, y)
+            return self.result.pupil_right
 
     def horizontal_ratio(self):
         """Returns a number between 0.0 and 1.0 that indicates the
@@ -82,9 +369,7 @@ class GazeTracking(object):
         the center is 0.5 and the extreme left is 1.0
         """
         if self.pupils_located:
-            pupil_left = self.eye_left.pupil.x / (self.eye_left.center[0] * 2 - 10)
-            pupil_right = self.eye_right.pupil.x / (self.eye_right.center[0] * 2 - 10)
-            return (pupil_left + pupil_right) / 2
+            return self.result.horizontal_ratio
 
     def vertical_ratio(self):
         """Returns a number between 0.0 and 1.0 that indicates the
@@ -92,9 +377,7 @@ class GazeTracking(object):
         the center is 0.5 and the extreme bottom is 1.0
         """
         if self.pupils_located:
-            pupil_left = self.eye_left.pupil.y / (self.eye_left.center[1] * 2 - 10)
-            pupil_right = self.eye_right.pupil.y / (self.eye_right.center[1] * 2 - 10)
-            return (pupil_left + pupil_right) / 2
+            return self.result.vertical_ratio
 
     def is_right(self):
         """Returns true if the user is looking to the right"""
@@ -114,8 +397,7 @@ class GazeTracking(object):
     def is_blinking(self):
         """Returns true if the user closes his eyes"""
         if self.pupils_located:
-            blinking_ratio = (self.eye_left.blinking + self.eye_right.blinking) / 2
-            return blinking_ratio > 3.8
+            return self.result.blinking > 3.8
 
     def annotated_frame(self):
         """Returns the main frame with pupils highlighted"""
@@ -8,14 +8,35 @@ class Pupil(object):
     the position of the pupil
     """
 
-    def __init__(self, eye_frame, threshold):
+    # Ways of locating the iris in the binarized frame, see locate()
+    LOCATORS = ('contours', 'dark_region')
+
+    def __init__(self, eye_frame, threshold, locator='contours'):
         self.iris_frame = None
         self.threshold = threshold
+        self.locator = locator
         self.x = None
         self.y = None
 
         self.detect_iris(eye_frame)
 
+    @staticmethod
+    def preprocess(eye_frame):
+        """Smooths the eye frame and erodes it, which is the part of the iris
+        isolation that doesn't depend on the threshold
+
+        Arguments:
+            eye_frame (numpy.ndarray): Frame containing an eye and nothing else
+
+        Returns:
+            The filtered frame, ready to be binarized
+        """
+        kernel = np.ones((3, 3), np.uint8)
+        new_frame = cv2.bilateralFilter(eye_frame, 10, 15, 15)
+        new_frame = cv2.erode(new_frame, kernel, iterations=3)
+
+        return new_frame
+
     @staticmethod
     def image_processing(eye_frame, threshold):
         """Performs operations on the eye frame to isolate the iris
@@ -27,13 +48,53 @@ class Pupil(object):
         Returns:
             A frame with a single element representing the iris
         """
-        kernel = np.ones((3, 3), np.uint8)
-        new_frame = cv2.bilateralFilter(eye_frame, 10, 15, 15)
-        new_frame = cv2.erode(new_frame, kernel, iterations=3)
+        new_frame = Pupil.preprocess(eye_frame)
         new_frame = cv2.threshold(new_frame, threshold, 255, cv2.THRESH_BINARY)[1]
 
         return new_frame
 
+    @staticmethod
+    def locate(iris_frame, locator='contours'):
+        """Estimates the position of the pupil as the centroid of the iris.
+
+        With 'contours', every contour of the binarized frame is found and
+        the iris is the second largest one (the largest one is the white
+        area around it). With 'dark_region', the iris is the largest hole
+        in the white areas, told apart from the outer contours by the sign
+        of its oriented area, without building the contour hierarchy or
+        sorting the contours. Both trace the same polygon, so they give the
+        same centroid when the iris is the second largest contour.
+
+        Arguments:
+            iris_frame (numpy.ndarray): Binarized frame (see image_processing)
+            locator (str): One of LOCATORS
+
+        Returns:
+            The (x, y) position of the pupil, or None if there is no iris
+        """
+        if locator == 'dark_region':
+            contours = cv2.findContours(iris_frame, cv2.RETR_LIST, cv2.CHAIN_APPROX_NONE)[-2]
+            # the holes of the white areas have a positive oriented area, the outer contours
+            # a negative one
+            areas = [cv2.contourArea(contour, True) for contour in contours]
+            if not areas or max(areas) <= 0:
+                return None
+            iris = contours[areas.index(max(areas))]
+        elif locator == 'contours':
+            contours, _ = cv2.findContours(iris_frame, cv2.RETR_TREE, cv2.CHAIN_APPROX_NONE)[-2:]
+            contours = sorted(contours, key=cv2.contourArea)
+            if len(contours) < 2:
+                return None
+            iris = contours[-2]
+        else:
+            raise ValueError('Unknown pupil locator {!r}, expected one of {}'.format(locator, Pupil.LOCATORS))
+
+        moments = cv2.moments(iris)
+        try:
+            return (int(moments['m10'] / moments['m00']), int(moments['m01'] / moments['m00']))
+        except ZeroDivisionError:
+            return None
+
     def detect_iris(self, eye_frame):
         """Detects the iris and estimates the position of the iris by
         calculating the centroid.
@@ -43,12 +104,6 @@ class Pupil(object):
         """
         self.iris_frame = self.image_processing(eye_frame, self.threshold)
 
-        contours, _ = cv2.findContours(self.iris_frame, cv2.RETR_TREE, cv2.CHAIN_APPROX_NONE)[-2:]
-        contours = sorted(contours, key=cv2.contourArea)
-
-        try:
-            moments = cv2.moments(contours[-2])
-            self.x = int(moments['m10'] / moments['m00'])
-            self.y = int(moments['m01'] / moments['m00'])
-        except (IndexError, ZeroDivisionError):
-            pass
+        position = self.locate(self.iris_frame, self.locator)
+        if position is not None:
+            self.x, self.y = position
@@ -0,0 +1,138 @@
+import numpy as np
+import cv2
+
+from gaze_tracking.calibration import Calibration
+from gaze_tracking.pupil import Pupil
+
+
+def eye_frames():
+    """Grayscale eyes: a dark iris on a lighter eye, white around it as
+    Eye._isolate leaves it, plus uniform and gradient frames where many
+    thresholds tie"""
+    random_state = np.random.RandomState(0)
+    frames = []
+    for _ in range(60):
+        height, width = random_state.randint(20, 60), random_state.randint(40, 120)
+        frame = np.full((height, width), 255, np.uint8)
+        cv2.ellipse(frame, (width // 2, height // 2), (width // 2 - 5, height // 2 - 5), 0, 0, 360,
+                    int(random_state.randint(60, 200)), -1)
+        center = (int(random_state.uniform(0.3, 0.7) * width), height // 2)
+        cv2.circle(frame, center, random_state.randint(3, height // 3), int(random_state.randint(0, 60)), -1)
+        noise = random_state.randint(-20, 20, frame.shape)
+        frames.append(np.clip(frame + noise, 0, 255).astype(np.uint8))
+    frames.append(np.full((30, 50), 40, np.uint8))
+    frames.append(np.full((30, 50), 255, np.uint8))
+    frames.append(np.tile(np.arange(0, 200, 4, dtype=np.uint8), (30, 1)))
+    return frames
+
+
+def old_best_threshold(eye_frame, thresholds):
+    """find_best_threshold as it was: binarize and measure the iris for
+    each threshold, the first closest one wins"""
+    trials = {}
+    for threshold in thresholds:
+        iris_frame = Pupil.image_processing(eye_frame, threshold)
+        trials[threshold] = Calibration.iris_size(iris_frame)
+    return min(trials.items(), key=(lambda p: abs(p[1] - 0.48)))[0]
+
+
+def test_iris_sizes():
+    thresholds = np.arange(0, 256)
+    for frame in eye_frames()[::10]:
+        sizes = Calibration.iris_sizes(frame, thresholds)
+        expected = [Calibration.iris_size(Pupil.image_processing(frame, threshold)) for threshold in thresholds]
+        assert np.array_equal(sizes, expected)
+
+
+def test_find_best_threshold():
+    for frame in eye_frames():
+        thresholds = range(5, 100, 5)
+        assert Calibration.find_best_threshold(frame) == old_best_threshold(frame, thresholds)
+        assert Calibration.find_best_threshold(frame, thresholds) == old_best_threshold(frame, thresholds)
+
+        thresholds = range(1, 150)
+        assert Calibration.find_best_threshold(frame, thresholds) == old_best_threshold(frame, thresholds)
+
+
+def tracking_calibration(evaluations, **kwargs):
+    """Adaptive calibration whose threshold evaluations return the given
+    values in turn, and record the frames they were given"""
+    calibration = Calibration(adaptive=True, **kwargs)
+    calibration.evaluated = []
+
+    def find_best_threshold(eye_frame, thresholds):
+        calibration.evaluated.append(eye_frame)
+        return evaluations.pop(0)
+
+    calibration.find_best_threshold = find_best_threshold
+    return calibration
+
+
+def complete(calibration, left=40, right=60):
+    calibration.thresholds_left = [left] * calibration.nb_frames
+    calibration.thresholds_right = [right] * calibration.nb_frames
+
+
+def test_track_not_adaptive():
+    calibration = Calibration()
+    complete(calibration)
+    calibration.find_best_threshold = None
+    for _ in range(100):
+        calibration.track(None, 0, False)
+    assert calibration.threshold(0) == 40
+
+
+def test_track_before_complete():
+    calibration = tracking_calibration([], interval=2)
+    calibration.thresholds_left = [40] * (calibration.nb_frames - 1)
+    calibration.thresholds_right = [60] * calibration.nb_frames
+    for _ in range(10):
+        calibration.track(None, 0, False)
+        calibration.track(None, 1, True)
+    assert calibration.evaluated == []
+    assert calibration._nb_frames_since_evaluation == {0: 0, 1: 0}
+    assert calibration.threshold(1) == 60
+
+
+def test_track_interval():
+    calibration = tracking_calibration([40] * 10, interval=5)
+    complete(calibration)
+    for frame in range(12):
+        calibration.track(frame, 0, True)
+    # the 5th and 10th frames since the calibration
+    assert calibration.evaluated == [4, 9]
+
+    # a lost pupil is evaluated right away and restarts the count
+    calibration.track(12, 0, False)
+    for frame in range(13, 18):
+        calibration.track(frame, 0, True)
+    assert calibration.evaluated == [4, 9, 12, 17]
+
+    # the other eye has its own count
+    calibration.track('right', 1, True)
+    assert calibration.evaluated == [4, 9, 12, 17]
+
+
+def test_track_moving_average():
+    calibration = tracking_calibration([50, 50, 50, 30], interval=1, smoothing=0.2, hysteresis=3)
+    complete(calibration)
+
+    calibration.track(None, 0, True)
+    assert calibration._averages[0] == 42
+    assert calibration.threshold(0) == 40
+
+    # moved by 3.6 from the threshold in use
+    calibration.track(None, 0, True)
+    assert np.isclose(calibration._averages[0], 43.6)
+    assert calibration.threshold(0) == 44
+
+    # 44.88 and then 41.904 stay within the hysteresis of 44
+    calibration.track(None, 0, True)
+    assert np.isclose(calibration._averages[0], 44.88)
+    assert calibration.threshold(0) == 44
+    calibration.track(None, 0, True)
+    assert np.isclose(calibration._averages[0], 41.904)
+    assert calibration.threshold(0) == 44
+
+    # the right eye keeps its calibrated threshold
+    assert calibration.threshold(1) == 60
@@ -0,0 +1,89 @@
+import numpy as np
+from numpy.testing import assert_array_equal
+import cv2
+
+from gaze_tracking.eye import Eye
+
+# Grayscale frames, as Eye receives them from GazeTracking
+random_state = np.random.RandomState(0)
+frames = [
+    random_state.randint(0, 256, (48, 64)).astype(np.uint8),
+    np.tile(np.arange(64, dtype=np.uint8) * 4, (48, 1)),
+    np.full((48, 64), 7, np.uint8),
+]
+
+EYE_POINTS = Eye.LEFT_EYE_POINTS
+EYE_SHAPE = np.array([(0, 4), (4, 1), (9, 1), (13, 4), (9, 6), (4, 6)])
+
+
+class Point(object):
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+class Landmarks(object):
+    """Stands in for dlib.full_object_detection"""
+
+    def __init__(self, region):
+        self.points = dict(zip(EYE_POINTS, region))
+
+    def part(self, point):
+        return Point(*self.points[point])
+
+
+def isolate_full_frame(frame, region):
+    """Eye._isolate as it was before cropping first: mask the whole frame,
+    then slice the eye window out of it"""
+    height, width = frame.shape[:2]
+    black_frame = np.zeros((height, width), np.uint8)
+    mask = np.full((height, width), 255, np.uint8)
+    cv2.fillPoly(mask, [region], (0, 0, 0))
+    eye = cv2.bitwise_not(black_frame, frame.copy(), mask=mask)
+
+    margin = 5
+    min_x = np.min(region[:, 0]) - margin
+    max_x = np.max(region[:, 0]) + margin
+    min_y = np.min(region[:, 1]) - margin
+    max_y = np.max(region[:, 1]) + margin
+
+    return eye[min_y:max_y, min_x:max_x], (min_x, min_y)
+
+
+def check_isolate(frame, offset):
+    region = (EYE_SHAPE + offset).astype(np.int32)
+    expected_frame, expected_origin = isolate_full_frame(frame, region)
+
+    eye = Eye.__new__(Eye)
+    eye._isolate(frame, Landmarks(region), EYE_POINTS)
+
+    assert_array_equal(eye.frame, expected_frame)
+    assert eye.frame.shape == expected_frame.shape
+    assert eye.frame.dtype == expected_frame.dtype
+    assert eye.origin == expected_origin
+    assert eye.center == (expected_frame.shape[1] / 2, expected_frame.shape[0] / 2)
+    assert_array_equal(eye.landmark_points, region)
+
+
+def test_isolate_inside():
+    for frame in frames:
+        for offset in [(20, 20), (6, 6), (45, 36)]:
+            check_isolate(frame, offset)
+
+
+def test_isolate_border():
+    # polygons touching or crossing each border of the frame
+    for frame in frames:
+        for offset in [(0, 20), (-3, 20), (51, 20), (55, 20),
+                       (20, 0), (20, -2), (20, 42), (20, 45),
+                       (0, 0), (-4, -3), (51, 42), (56, 44)]:
+            check_isolate(frame, offset)
+
+
+def test_isolate_empty_crop():
+    # polygons partly or fully outside the frame: the eye window is an empty
+    # slice, or wraps around like slicing with negative bounds does
+    for frame in frames:
+        for offset in [(-10, 20), (20, -8), (70, 20), (20, 60),
+                       (-20, -20), (100, 100)]:
+            check_isolate(frame, offset)
@@ -0,0 +1,248 @@
+import math
+
+import numpy as np
+import cv2
+import dlib
+
+from gaze_tracking import GazeTracking
+
+
+class Scene(object):
+    """A synthetic face, with a stub face detector and a stub landmark
+    predictor that always fit the face where it is in the scene"""
+
+    EYES = ((0.3, 0.4), (0.7, 0.4))
+
+    def __init__(self, left=100, top=60, size=120):
+        self.left = left
+        self.top = top
+        self.size = size
+        self.gaze = (0, 0)
+        self.eyes_open = True
+        self.detections = 0
+        self.predictions = 0
+
+    def landmarks_points(self):
+        size = self.size
+        # the jaw, brows, nose and mouth are on the circle inscribed in the face
+        angles = np.linspace(0, 2 * math.pi, 56, endpoint=False)
+        outline = [(self.left + size / 2 * (1 + math.cos(a)), self.top + size / 2 * (1 + math.sin(a)))
+                   for a in angles]
+        eyes = []
+        for x, y in self.EYES:
+            cx, cy = self.left + x * size, self.top + y * size
+            w, h = 0.2 * size, 0.1 * size
+            eyes += [(cx - w / 2, cy), (cx - w / 6, cy - h / 2), (cx + w / 6, cy - h / 2),
+                     (cx + w / 2, cy), (cx + w / 6, cy + h / 2), (cx - w / 6, cy + h / 2)]
+        points = outline[:36] + eyes + outline[36:]
+        return [(int(round(x)), int(round(y))) for x, y in points]
+
+    def render(self, color=False):
+        frame = np.full((300, 400), 120, np.uint8)
+        if self.eyes_open:
+            for x, y in self.EYES:
+                center = (int(self.left + x * self.size), int(self.top + y * self.size))
+                axes = (int(0.1 * self.size), int(0.05 * self.size))
+                cv2.ellipse(frame, center, axes, 0, 0, 360, 230, -1)
+                iris = (center[0] + self.gaze[0], center[1] + self.gaze[1])
+                cv2.circle(frame, iris, int(0.04 * self.size), 0, -1)
+        if color:
+            return cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+        return frame
+
+    def rectangle(self):
+        return dlib.rectangle(self.left, self.top, self.left + self.size - 1, self.top + self.size - 1)
+
+    def detect(self, frame):
+        self.detections += 1
+        return [self.rectangle()]
+
+    def predict(self, frame, rectangle):
+        self.predictions += 1
+        points = dlib.points([dlib.point(x, y) for x, y in self.landmarks_points()])
+        return dlib.full_object_detection(rectangle, points)
+
+
+def gaze_tracker(scene, **kwargs):
+    """GazeTracking running on the stubs of a scene, without the landmark model"""
+    shape_predictor = dlib.shape_predictor
+    dlib.shape_predictor = lambda path: None
+    try:
+        gaze = GazeTracking(**kwargs)
+    finally:
+        dlib.shape_predictor = shape_predictor
+    gaze._face_detector = scene.detect
+    gaze._predictor = scene.predict
+    return gaze
+
+
+def calibration_state(calibration):
+    return (list(calibration.thresholds_left), list(calibration.thresholds_right), dict(calibration._averages),
+            dict(calibration._current), dict(calibration._nb_frames_since_evaluation))
+
+
+def tracking_state(gaze):
+    face = gaze.face and (gaze.face.left(), gaze.face.top(), gaze.face.right(), gaze.face.bottom())
+    return (face, gaze._face_lost, gaze._frames_since_detection)
+
+
+def tracking_state_of(scene):
+    rectangle = scene.rectangle()
+    return (rectangle.left(), rectangle.top(), rectangle.right(), rectangle.bottom())
+
+
+def batch_frames(scene):
+    frames = []
+    for i in range(30):
+        scene.gaze = (i % 5 - 2, i % 3 - 1)
+        scene.eyes_open = i % 7 != 3
+        frames.append(scene.render(color=i % 2 == 0))
+    scene.gaze = (0, 0)
+    scene.eyes_open = True
+    return frames
+
+
+def test_analyze_batch_matches_refresh():
+    scene = Scene()
+    gaze = gaze_tracker(scene, tracking=True, detection_interval=4, adaptive_threshold=True)
+    reference = gaze_tracker(scene, tracking=True, detection_interval=4, adaptive_threshold=True)
+    frames = batch_frames(scene)
+
+    horizontal, vertical, blinking, located = gaze.analyze_batch(frames)
+
+    results = [reference.refresh(frame) for frame in frames]
+    assert located.tolist() == [result.located for result in results]
+    assert located.sum() > 20
+    for i, result in enumerate(results):
+        if result.located:
+            assert horizontal[i] == result.horizontal_ratio
+            assert vertical[i] == result.vertical_ratio
+        else:
+            assert np.isnan(horizontal[i]) and np.isnan(vertical[i])
+        assert blinking[i] == result.blinking
+
+
+def test_analyze_batch_state():
+    scene = Scene()
+    gaze = gaze_tracker(scene, tracking=True, adaptive_threshold=True)
+    for _ in range(25):
+        gaze.refresh(scene.render())
+    frame, result = gaze.frame, gaze.result
+    calibration = calibration_state(gaze.calibration)
+    tracking = tracking_state(gaze)
+    assert gaze.calibration.is_complete()
+
+    gaze.analyze_batch(batch_frames(scene))
+
+    assert gaze.frame is frame
+    assert gaze.result is result
+    assert calibration_state(gaze.calibration) == calibration
+    assert tracking_state(gaze) == tracking
+
+
+def test_analyze_batch_keeps_frames():
+    # a grayscale frame followed by color ones must not be used as the
+    # grayscale buffer of the next frames
+    scene = Scene()
+    gaze = gaze_tracker(scene)
+    frames = batch_frames(scene)[1:]
+    frames = frames[:1] + [scene.render(color=True)] + frames[1:]
+    copies = [frame.copy() for frame in frames]
+
+    gaze.analyze_batch(frames)
+
+    for frame, original in zip(frames, copies):
+        assert np.array_equal(frame, original)
+
+
+def test_tracking_disabled():
+    scene = Scene()
+    gaze = gaze_tracker(scene)
+    for _ in range(5):
+        gaze.detect_landmarks(scene.render())
+    assert scene.detections == 5
+
+
+def test_tracking_detection_interval():
+    scene = Scene()
+    gaze = gaze_tracker(scene, tracking=True, detection_interval=3)
+    detections = []
+    for _ in range(10):
+        gaze.detect_landmarks(scene.render())
+        detections.append(scene.detections)
+    # a detection, then 3 tracked frames
+    assert detections == [1, 1, 1, 1, 2, 2, 2, 2, 3, 3]
+    assert scene.predictions == 10
+
+
+def test_tracking_follows_face():
+    scene = Scene()
+    gaze = gaze_tracker(scene, tracking=True, detection_interval=100)
+    gaze.detect_landmarks(scene.render())
+    for _ in range(5):
+        scene.left += 3
+        scene.top -= 2
+        gray, landmarks = gaze.detect_landmarks(scene.render())
+        assert landmarks.part(36).x == scene.landmarks_points()[36][0]
+        assert tracking_state(gaze)[0] == tracking_state_of(scene)
+    assert scene.detections == 1
+
+
+def test_tracking_tolerance():
+    # the tolerance is a quarter of the face size, 30 px
+    scene = Scene()
+    gaze = gaze_tracker(scene, tracking=True, detection_interval=100)
+    gaze.detect_landmarks(scene.render())
+
+    scene.left += 25
+    gaze.detect_landmarks(scene.render())
+    assert scene.detections == 1
+
+    # a jump from the previous frame
+    scene.left += 35
+    gaze.detect_landmarks(scene.render())
+    assert scene.detections == 2
+    assert tracking_state(gaze)[0] == tracking_state_of(scene)
+
+    # a change of size from the last detection, not from the previous frame
+    scene.size = 140
+    gaze.detect_landmarks(scene.render())
+    assert scene.detections == 2
+    scene.size = 160
+    gaze.detect_landmarks(scene.render())
+    assert scene.detections == 3
+    scene.size = 100
+    gaze.detect_landmarks(scene.render())
+    assert scene.detections == 4
+
+
+def test_tracking_face_lost():
+    scene = Scene()
+    gaze = gaze_tracker(scene, tracking=True, detection_interval=100)
+    gaze.detect_landmarks(scene.render())
+    gaze.detect_landmarks(scene.render(), face_lost=True)
+    assert scene.detections == 2
+    gaze.detect_landmarks(scene.render())
+    assert scene.detections == 2
+
+
+def test_tracking_refresh_face_lost():
+    # the eyes aren't located in a frame, the face is detected again in the next one
+    scene = Scene()
+    gaze = gaze_tracker(scene, tracking=True, detection_interval=100)
+    for _ in range(3):
+        gaze.refresh(scene.render())
+        assert gaze.pupils_located
+    assert scene.detections == 1
+
+    scene.eyes_open = False
+    gaze.refresh(scene.render())
+    assert not gaze.pupils_located
+    assert scene.detections == 1
+
+    scene.eyes_open = True
+    gaze.refresh(scene.render())
+    assert gaze.pupils_located
+    assert scene.detections == 2
+    gaze.refresh(scene.render())
+    assert scene.detections == 2
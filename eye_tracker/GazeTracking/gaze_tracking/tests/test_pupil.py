@@ -0,0 +1,63 @@
+import numpy as np
+import cv2
+
+from gaze_tracking.pupil import Pupil
+
+
+def iris_frame(random_state, nb_specks=0):
+    """Binarized eye: white, with a dark rotated ellipse for the iris and
+    optionally dark and white specks"""
+    height, width = random_state.randint(30, 120), random_state.randint(50, 200)
+    frame = np.full((height, width), 255, np.uint8)
+    center = (int(random_state.uniform(0.3, 0.7) * width), int(random_state.uniform(0.3, 0.7) * height))
+    axes = (random_state.randint(3, width // 4), random_state.randint(3, height // 3))
+    cv2.ellipse(frame, center, axes, random_state.uniform(0, 180), 0, 360, 0, -1)
+    for _ in range(nb_specks):
+        speck = (random_state.randint(0, width), random_state.randint(0, height))
+        cv2.circle(frame, speck, random_state.randint(0, 3), int(random_state.choice([0, 255])), -1)
+    # the eye frame is white around the eye (see Eye._isolate)
+    frame[[0, -1], :] = 255
+    frame[:, [0, -1]] = 255
+    return frame
+
+
+def check_locators(frames):
+    for frame in frames:
+        assert Pupil.locate(frame, 'dark_region') == Pupil.locate(frame, 'contours')
+
+
+def test_locate_ellipses():
+    random_state = np.random.RandomState(0)
+    check_locators([iris_frame(random_state) for _ in range(500)])
+
+
+def test_locate_specks():
+    random_state = np.random.RandomState(1)
+    check_locators([iris_frame(random_state, nb_specks) for nb_specks in range(0, 100, 5) for _ in range(20)])
+
+
+def test_locate_eye_frames():
+    # grayscale eyes through the whole binarization, with the white margin
+    # Eye._isolate leaves around the eye, wider than what the erosion takes
+    random_state = np.random.RandomState(2)
+    for _ in range(100):
+        frame = cv2.copyMakeBorder(iris_frame(random_state), 5, 5, 5, 5, cv2.BORDER_CONSTANT, value=255)
+        noise = random_state.randint(0, 40, frame.shape)
+        eye_frame = np.clip(np.where(frame, 200, 30) + noise, 0, 255).astype(np.uint8)
+        for threshold in (20, 50, 80, 120):
+            check_locators([Pupil.image_processing(eye_frame, threshold)])
+
+
+def test_locate_no_iris():
+    frame = np.full((30, 50), 255, np.uint8)
+    assert Pupil.locate(frame, 'dark_region') is None
+    assert Pupil.locate(frame, 'contours') is None
+
+
+def test_locate_split_white():
+    # a dark band across the frame is not a hole: 'contours' takes the smaller
+    # white side for the iris, 'dark_region' finds no pupil
+    frame = np.full((30, 50), 255, np.uint8)
+    frame[:, 20:30] = 0
+    assert Pupil.locate(frame, 'contours') is not None
+    assert Pupil.locate(frame, 'dark_region') is None
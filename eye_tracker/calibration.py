@@ -5,9 +5,17 @@ import queue
 import numpy as np
 import pandas as pd
 import multiprocessing as mp
+from multiprocessing import resource_tracker, shared_memory
+
+# columns of the calibration data, one row per step: measured gaze ratios, then the dot state
+COLUMNS = ['x_ratios', 'y_ratios', 'x', 'y', 'vx', 'vy', 'ax', 'ay']
+
+# calibration data files are chosen by extension, in any case: .npy files hold a record array with
+# a float64 field per column and are memory-mapped when loaded, other files are CSV with an index column
+DATA_DTYPE = np.dtype([(column, '<f8') for column in COLUMNS])
 
 class Calibration:
-    def __init__(self, dt, period, total_loops, screen_width, screen_height, gaze_tracker, collect_data=True, file_name=None, use_mp=True):
+    def __init__(self, dt, period, total_loops, screen_width, screen_height, gaze_tracker, collect_data=True, file_name=None, use_mp=True, workers=None, share_grayscale=False):
         if not collect_data and not file_name:
             raise Exception('Calibration must either collect data or load data.')
         
@@ -17,18 +25,13 @@ class Calibration:
         self.file_name = file_name
         self.use_mp = use_mp
 
-        self.x_ratios = []
-        self.y_ratios = []
-
         if self.file_name:
             data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'calibration_data')
             if not os.path.exists(data_dir) or not os.path.isdir(data_dir):
                 os.mkdir(data_dir)
 
             self.file_path = os.path.join(data_dir, self.file_name)
-            if os.path.exists(self.file_path):
-                self.file = pd.read_csv(self.file_path)
-            elif not collect_data:
+            if not collect_data and not os.path.exists(self.file_path):
                 raise Exception('File {} cannot be found.'.format(file_name))
         
         if collect_data:
@@ -38,42 +41,77 @@ class Calibration:
             steps_per_loop = int(period / dt)
             self.total_steps = steps_per_loop * total_loops * 2
 
-            self.t = [(s + 1) * dt for s in range(self.total_steps)]
-            def x(t): return (screen_width / 2) * math.sin(t * ((2 * math.pi) / period)) + (screen_width / 2)
-            def y(t): return (screen_height / 2) * math.sin(t * ((2 * math.pi) / period)) + (screen_height / 2)
-            def vx(t): return ((screen_width * math.pi) / period) * math.cos(t * ((2 * math.pi) / period))
-            def vy(t): return ((screen_height * math.pi) / period) * math.cos(t * ((2 * math.pi) / period))
-            def ax(t): return ((-2 * screen_width * (math.pi ** 2)) / (period ** 2)) * math.sin(t * ((2 * math.pi) / period))
-            def ay(t): return ((-2 * screen_height * (math.pi ** 2)) / (period ** 2)) * math.sin(t * ((2 * math.pi) / period))
-
-            self.x = [x(self.t[s]) if s < self.total_steps / 2 else (screen_width / 2) for s in range(self.total_steps)]
-            self.y = [y(self.t[s]) if s >= self.total_steps / 2 else (screen_height / 2) for s in range(self.total_steps)]
-            self.vx = [vx(self.t[s]) if s < self.total_steps / 2 else 0 for s in range(self.total_steps)]
-            self.vy = [vy(self.t[s]) if s >= self.total_steps / 2 else 0 for s in range(self.total_steps)]
-            self.ax = [ax(self.t[s]) if s < self.total_steps / 2 else 0 for s in range(self.total_steps)]
-            self.ay = [ay(self.t[s]) if s >= self.total_steps / 2 else 0 for s in range(self.total_steps)]
+            # the dot moves along x during the first half of the sequence, then along y
+            self.t = np.arange(1, self.total_steps + 1) * dt
+            sin = np.sin(self.t * ((2 * math.pi) / period))
+            cos = np.cos(self.t * ((2 * math.pi) / period))
+            moving_x = np.arange(self.total_steps) < self.total_steps / 2
+            moving_y = ~moving_x
+
+            # ratios are NaN until their frame has been analyzed
+            data = np.full((self.total_steps, len(COLUMNS)), np.nan)
+            data[:, 2] = np.where(moving_x, (screen_width / 2) * sin + (screen_width / 2), screen_width / 2)
+            data[:, 3] = np.where(moving_y, (screen_height / 2) * sin + (screen_height / 2), screen_height / 2)
+            data[:, 4] = np.where(moving_x, ((screen_width * math.pi) / period) * cos, 0)
+            data[:, 5] = np.where(moving_y, ((screen_height * math.pi) / period) * cos, 0)
+            data[:, 6] = np.where(moving_x, ((-2 * screen_width * (math.pi ** 2)) / (period ** 2)) * sin, 0)
+            data[:, 7] = np.where(moving_y, ((-2 * screen_height * (math.pi ** 2)) / (period ** 2)) * sin, 0)
+
+            # loaded data goes after the collected data
+            if self.file_name and os.path.exists(self.file_path):
+                data = np.vstack((data, self._load_data()))
+            self._set_data(data)
 
             self.step = 0
             self.done = False
 
+            # results are consumed in step order while the dot is still moving (the workers can
+            # return them out of order): missing ratios are filled, the bounds and the sums
+            # needed by get_kalman_parameters() are updated, so the model is ready at the last step
+            self.pending_ratios = {}
+            self.next_ratio = 0
+            self.num_missing = np.zeros(2, dtype=int)
+            self._start_statistics(self.total_steps)
+
             if use_mp:
+                # leave a core to the capture and render loop
+                self.workers = workers or max(mp.cpu_count() - 1, 1)
+                self.share_grayscale = share_grayscale
                 self.ratio_buffer = mp.Queue()
-                self.frame_buffer = mp.JoinableQueue()
+                self.frame_buffer = mp.Queue()
+
+                # frames go through a ring of slots in shared memory, allocated on the first
+                # frame, and only slot indices go through the queues. A slot is taken from
+                # free_slots before being written and given back by the worker that read it,
+                # so update() blocks while the workers are behind.
+                self.frame_memory = None
+                self.frame_slots = []
+                self.free_slots = mp.Queue()
+                for slot in range(2 * self.workers + 1):
+                    self.free_slots.put(slot)
+
+                # start the resource tracker before the workers so that they all share it, a forked
+                # worker would otherwise start its own one, which unlinks the frame memory when the
+                # worker exits (https://bugs.python.org/issue39959)
+                resource_tracker.ensure_running()
+
                 self.frame_readers = []
-                for p in range(mp.cpu_count()):
-                    self.frame_readers.append(mp.Process(target=self._read_frames, daemon=True))
+                for p in range(self.workers):
+                    self.frame_readers.append(mp.Process(
+                        target=_read_frames,
+                        args=(self.gaze_tracker, self.frame_buffer, self.ratio_buffer, self.free_slots),
+                        daemon=True
+                    ))
                     self.frame_readers[p].start()
         else:
             self.done = True
-            self.x = []
-            self.y = []
-            self.vx = []
-            self.vy = []
-            self.ax = []
-            self.ay = []
-            self._process_data()
+            self._set_data(self._load_data())
+            self._start_statistics(0)
+            self._finish()
 
     def __del__(self):
+        if self.collect_data and self.use_mp:
+            self._cleanup_frame_readers()
         if self.collect_data and self.file_name:
             self._save_data()
 
@@ -81,8 +119,7 @@ class Calibration:
         if not self.collect_data:
             raise Exception('Calibration is not setup to collect data.')
 
-        x = self.x[self.step]
-        y = self.y[self.step]
+        x, y = self.states[self.step, :2]
         return x, y
 
     def update(self, frame):
@@ -94,58 +131,43 @@ class Calibration:
             return
 
         if self.use_mp:
-            self.frame_buffer.put_nowait((self.step, frame))
+            if self.share_grayscale:
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            if self.frame_memory is None:
+                self._allocate_frame_slots(frame)
+            if frame.shape != self.frame_layout[1]:
+                raise Exception('Frame shape changed during calibration.')
+
+            slot = self._take_free_slot()
+            self.frame_slots[slot][...] = frame
+            self.frame_buffer.put((self.step, slot, self.frame_layout))
+            self._receive_ratios()
         else:
             self.gaze_tracker.refresh(frame)
             if not self.gaze_tracker.pupils_located:
-                self.x_ratios.append(None)
-                self.y_ratios.append(None)
+                self.pending_ratios[self.step] = (None, None)
             else:
                 # invert horizontal ratio to match pixel coordinate convention
                 # i.e. we want a small horizontal ratio to map to the left side of the screen
-                self.x_ratios.append(1 - self.gaze_tracker.horizontal_ratio())
-                self.y_ratios.append(self.gaze_tracker.vertical_ratio())
+                self.pending_ratios[self.step] = (1 - self.gaze_tracker.horizontal_ratio(), self.gaze_tracker.vertical_ratio())
+            self._consume_ratios()
 
         self.step += 1
         if self.step == self.total_steps:
-            self.done = True
             if self.use_mp:
-                self.frame_buffer.join()
-                ratios = []
-                while len(ratios) < self.total_steps:
-                    try:
-                        ratios.append(self.ratio_buffer.get_nowait())
-                    except queue.Empty:
-                        continue
+                # only the frames still being analyzed are waited for
+                while self.next_ratio < self.total_steps:
+                    self._receive_ratios(timeout=0.1)
                 self._cleanup_frame_readers()
-                ratios.sort()
-                ratios = [r[1] for r in ratios]
-                ratios = list(map(list, zip(*ratios)))
-                self.x_ratios = ratios[0]
-                self.y_ratios = ratios[1]
-            self._fill_missing_ratios()
-            self._process_data()
+            self._finish()
 
     def get_measurements(self):
         if self.collect_data and not self.done:
             raise Exception('Calibration must be done before get_measurements() is called.')
-        return list(zip(self.x_measurements, self.y_measurements))
+        return self.measurements
 
     def get_kalman_parameters(self):
-        assert len(self.x_measurements) == len(self.y_measurements)
-        Z = np.array([self.x_measurements, self.y_measurements])
-        length = len(self.x_measurements)
-
-        X = np.array([self.x, self.y, self.vx, self.vy, self.ax, self.ay])
-        X1 = X[:, :-1]
-        X2 = X[:, 1:]        
-
-        A = np.dot(np.dot(X2, X1.T), np.linalg.inv(np.dot(X1, X1.T)))
-        H = np.dot(np.dot(Z, X.T), np.linalg.inv(np.dot(X, X.T)))
-        W = np.dot(np.subtract(X2, np.dot(A, X1)), np.subtract(X2, np.dot(A, X1)).T) / (length - 1)
-        Q = np.dot(np.subtract(Z, np.dot(H, X)), np.subtract(Z, np.dot(H, X)).T) / (length)
-
-        return A, H, W, Q
+        return self.A, self.H, self.W, self.Q
 
     def transform(self, x, y):
         if not self.done:
@@ -156,79 +178,117 @@ class Calibration:
         y = y * self.screen_height
         return x, y
 
-    def _read_frames(self):
+    def _take_free_slot(self):
+        # a worker that died never gives its slot back, so don't wait for it forever
         while True:
             try:
-                step, frame = self.frame_buffer.get_nowait()
-                self.gaze_tracker.refresh(frame)
-                if not self.gaze_tracker.pupils_located:
-                    self.ratio_buffer.put_nowait((step, (None, None)))
-                else:
-                    # invert horizontal ratio to match pixel coordinate convention
-                    # i.e. we want a small horizontal ratio to map to the left side of the screen
-                    self.ratio_buffer.put_nowait((
-                        step,
-                        (1 - self.gaze_tracker.horizontal_ratio(),
-                        self.gaze_tracker.vertical_ratio())
-                    ))
-                self.frame_buffer.task_done()
+                return self.free_slots.get(timeout=0.1)
             except queue.Empty:
-                continue
-    
-    def _process_data(self):
-        if self.file_name and os.path.exists(self.file_path):
-            self._load_data()
-        self._set_bounds()
-        self._transform_all()
-
-    def _fill_missing_ratios(self):
-        num_x_missing = 0
-        num_y_missing = 0
-
-        prev_x = self.screen_width / 2
-        for r in range(len(self.x_ratios)):
-            if self.x_ratios[r] is None:
-                num_x_missing += 1
-                self.x_ratios[r] = prev_x
-            else:
-                prev_x = self.x_ratios[r]
+                self._check_frame_readers()
 
-        prev_y = self.screen_height /2
-        for r in range(len(self.y_ratios)):
-            if self.y_ratios[r] is None:
-                num_y_missing += 1
-                self.y_ratios[r] = prev_y
-            else:
-                prev_y = self.y_ratios[r]
+    def _check_frame_readers(self):
+        for p in self.frame_readers:
+            if not p.is_alive():
+                raise Exception('Calibration worker {} died (exit code {}).'.format(p.pid, p.exitcode))
+
+    # timeout: seconds to wait for a result if none is ready, the workers are checked after it
+    def _receive_ratios(self, timeout=None):
+        try:
+            step, ratios = self.ratio_buffer.get(timeout is not None, timeout)
+            self.pending_ratios[step] = ratios
+            while True:
+                step, ratios = self.ratio_buffer.get_nowait()
+                self.pending_ratios[step] = ratios
+        except queue.Empty:
+            if timeout is not None:
+                self._check_frame_readers()
+        self._consume_ratios()
+
+    def _consume_ratios(self):
+        # the ratios received for the next steps, up to the first one still being analyzed
+        start = self.next_ratio
+        while self.next_ratio in self.pending_ratios:
+            self.next_ratio += 1
+        if self.next_ratio == start:
+            return
+        R = np.array([self.pending_ratios.pop(step) for step in range(start, self.next_ratio)], dtype=float)
+
+        # fill missing ratios (None, so NaN) with the previous ones
+        missing = np.isnan(R)
+        if missing.any():
+            previous = self.ratios[start - 1] if start else (self.screen_width / 2, self.screen_height / 2)
+            self.num_missing += missing.sum(axis=0)
+            R = _forward_fill(R, previous)
+        self.ratios[start:self.next_ratio] = R
 
-        print('x: {}/{}'.format(self.total_steps - num_x_missing, self.total_steps))
-        print('y: {}/{}'.format(self.total_steps - num_y_missing, self.total_steps))
+        self._add_ratios(self.ratios[start:self.next_ratio], self.states[start:self.next_ratio])
 
     def _load_data(self):
-        self.x_ratios += self.file['x_ratios'].to_list()
-        self.y_ratios += self.file['y_ratios'].to_list()
-        self.x += self.file['x'].to_list()
-        self.y += self.file['y'].to_list()
-        self.vx += self.file['vx'].to_list()
-        self.vy += self.file['vy'].to_list()
-        self.ax += self.file['ax'].to_list()
-        self.ay += self.file['ay'].to_list()
-
-    def _set_bounds(self):
-        self.x_min = np.nanmin(self.x_ratios)
-        self.x_max = np.nanmax(self.x_ratios)
-        self.y_min = np.nanmin(self.y_ratios)
-        self.y_max = np.nanmax(self.y_ratios)
-
-    def _transform_all(self):
-        assert len(self.x_ratios) == len(self.y_ratios)
-        length = len(self.x_ratios)
-        self.x_measurements = [0] * length
-        self.y_measurements = [0] * length
-        for i in range(length):
-            x, y = self.transform(self.x_ratios[i], self.y_ratios[i])
-            self.x_measurements[i] = x
-            self.y_measurements[i] = y
+        return load_calibration_data(self.file_path)
+
+    def _set_data(self, data):
+        self.data = data
+        self.ratios = data[:, :2]
+        self.states = data[:, 2:]
+
+    def _start_statistics(self, first_loaded):
+        # the dot trajectory (with the loaded one appended) is known before the first frame,
+        # so the state transition model can be fit right away. The states are linearly
+        # dependent (x + ax / k and y + ay / k are constant), so XX' and X1X1' are singular
+        # and the fits use their pseudo-inverse.
+        X = self.states.T
+        X1 = X[:, :-1]
+        X2 = X[:, 1:]
+        self.A = np.dot(np.dot(X2, X1.T), np.linalg.pinv(np.dot(X1, X1.T)))
+        self.W = np.dot(np.subtract(X2, np.dot(self.A, X1)), np.subtract(X2, np.dot(self.A, X1)).T) / (X.shape[1] - 1)
+
+        self.XX = np.dot(X, X.T)
+        self.X_sum = np.sum(X, axis=1)
+
+        # sums over the ratios R seen so far, the measurements are an affine map of the ratios
+        # that is only known once the bounds are, see _finish()
+        self.ratio_count = 0
+        self.R_sum = np.zeros(2)
+        self.RR = np.zeros((2, 2))
+        self.RX = np.zeros((2, 6))
+        self.ratio_min = np.full(2, np.inf)
+        self.ratio_max = np.full(2, -np.inf)
+
+        if first_loaded < len(self.data):
+            self._add_ratios(self.ratios[first_loaded:], self.states[first_loaded:])
+
+    def _add_ratios(self, R, X):
+        # R: ratios of n steps (n, 2), X: matching states (n, 6)
+        self.ratio_count += len(R)
+        self.R_sum += R.sum(axis=0)
+        self.RR += np.dot(R.T, R)
+        self.RX += np.dot(R.T, X)
+        # fmin and fmax ignore NaN
+        self.ratio_min = np.fmin(self.ratio_min, np.fmin.reduce(R, axis=0))
+        self.ratio_max = np.fmax(self.ratio_max, np.fmax.reduce(R, axis=0))
+
+    def _finish(self):
+        self.done = True
+        if self.collect_data:
+            print('x: {}/{}'.format(self.total_steps - self.num_missing[0], self.total_steps))
+            print('y: {}/{}'.format(self.total_steps - self.num_missing[1], self.total_steps))
+        assert self.ratio_count == len(self.data)
+        self.x_min, self.y_min = self.ratio_min
+        self.x_max, self.y_max = self.ratio_max
+
+        # Z = a * R + b, per axis, as in transform()
+        a = np.array([self.screen_width / (self.x_max - self.x_min), self.screen_height / (self.y_max - self.y_min)])
+        b = -a * self.ratio_min
+        aR_sum = a * self.R_sum
+        ZX = a[:, None] * self.RX + np.outer(b, self.X_sum)
+        ZZ = np.outer(a, a) * self.RR + np.outer(aR_sum, b) + np.outer(b, aR_sum) + self.ratio_count * np.outer(b, b)
+
+        # least squares fit of Z = HX and covariance of the residuals Z - HX, from the sums
+        self.H = np.dot(ZX, np.linalg.pinv(self.XX))
+        HXZ = np.dot(self.H, ZX.T)
+        self.Q = (ZZ - HXZ - HXZ.T + np.dot(np.dot(self.H, self.XX), self.H.T)) / self.ratio_count
+
+        self.measurements = np.column_stack(self.transform(self.ratios[:, 0], self.ratios[:, 1]))
 
     def _save_data(self):
         if not self.done:
@@ -245,25 +305,99 @@ class Calibration:
                 print('Data will not be saved.')
                 return
         
-        pd.DataFrame({
-            'x_ratios': self.x_ratios,
-            'y_ratios': self.y_ratios,
-            'x': self.x,
-            'y': self.y,
-            'vx': self.vx,
-            'vy': self.vy,
-            'ax': self.ax,
-            'ay': self.ay,
-        }).to_csv(self.file_path)
+        save_calibration_data(self.file_path, self.data)
+
+    def _allocate_frame_slots(self, frame):
+        nb_slots = 2 * self.workers + 1
+        self.frame_memory = shared_memory.SharedMemory(create=True, size=nb_slots * frame.nbytes)
+        self.frame_layout = (self.frame_memory.name, frame.shape, frame.dtype.str, nb_slots)
+        self.frame_slots = _frame_slots(self.frame_memory, frame.shape, frame.dtype, nb_slots)
 
     def _cleanup_frame_readers(self):
-        if not self.use_mp:
+        if not self.use_mp or not self.frame_readers:
             return
 
+        # one sentinel per worker, each worker exits after taking one
+        for p in self.frame_readers:
+            self.frame_buffer.put(None)
         for p in self.frame_readers:
-            p.kill()
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+        self.frame_readers = []
         self.frame_buffer.close()
         self.ratio_buffer.close()
+        self.free_slots.close()
+
+        if self.frame_memory is not None:
+            self.frame_slots = []
+            self.frame_memory.close()
+            self.frame_memory.unlink()
+            self.frame_memory = None
+
+# (n, len(COLUMNS)) float array of the rows of a calibration data file, a read-only view
+# on the file for .npy files
+def load_calibration_data(path):
+    if os.path.splitext(path)[1].lower() == '.npy':
+        records = np.load(path, mmap_mode='r')
+        if records.dtype != DATA_DTYPE or records.ndim != 1:
+            raise Exception('File {} does not hold calibration data.'.format(path))
+        return records.view(np.float64).reshape(len(records), len(COLUMNS))
+    return pd.read_csv(path, float_precision='round_trip')[COLUMNS].to_numpy(dtype=float)
+
+def save_calibration_data(path, data):
+    if os.path.splitext(path)[1].lower() == '.npy':
+        records = np.empty(len(data), DATA_DTYPE)
+        records.view(np.float64).reshape(len(data), len(COLUMNS))[...] = data
+        # np.save() would add .npy to a path ending with .NPY
+        with open(path, 'wb') as f:
+            np.save(f, records)
+    else:
+        pd.DataFrame(data, columns=COLUMNS).to_csv(path)
+
+# replaces the NaN in each column of values (n, k) with the last number above them,
+# or with previous (k,) for the ones at the top
+def _forward_fill(values, previous):
+    values = np.vstack((previous, values))
+    rows = np.where(np.isnan(values), 0, np.arange(len(values))[:, None])
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    return values[rows, np.arange(values.shape[1])][1:]
+
+def _frame_slots(memory, shape, dtype, nb_slots):
+    dtype = np.dtype(dtype)
+    nbytes = int(np.prod(shape)) * dtype.itemsize
+    return [np.ndarray(shape, dtype, buffer=memory.buf, offset=slot * nbytes) for slot in range(nb_slots)]
+
+# runs in each worker process, on the worker's own copy of the gaze tracker
+def _read_frames(gaze_tracker, frame_buffer, ratio_buffer, free_slots):
+    memory = None
+    for step, slot, (name, shape, dtype, nb_slots) in iter(frame_buffer.get, None):
+        if memory is None:
+            # only the calibration that created the memory unlinks it
+            memory = shared_memory.SharedMemory(name=name)
+            frame_slots = _frame_slots(memory, shape, dtype, nb_slots)
+
+        # the frame is read in place, the slot is given back once it has been analyzed
+        try:
+            gaze_tracker.refresh(frame_slots[slot])
+            if not gaze_tracker.pupils_located:
+                ratios = (None, None)
+            else:
+                # invert horizontal ratio to match pixel coordinate convention
+                # i.e. we want a small horizontal ratio to map to the left side of the screen
+                ratios = (1 - gaze_tracker.horizontal_ratio(), gaze_tracker.vertical_ratio())
+        except Exception as error:
+            # the step is missing, like a frame without pupils, the calibration doesn't wait for it
+            print('WARNING: calibration frame {} not analyzed: {!r}'.format(step, error))
+            ratios = (None, None)
+        free_slots.put(slot)
+        ratio_buffer.put((step, ratios))
+
+    if memory is not None:
+        # views on the shared memory have to be gone before it can be closed
+        gaze_tracker.frame = None
+        frame_slots = None
+        memory.close()
 
 def calibration_step(dt, sequence, camera, window):
     x, y = sequence.get_position()
@@ -4,14 +4,18 @@ import pyautogui
 from eye_tracker.pykalman.pykalman import KalmanFilter
 from eye_tracker.GazeTracking.gaze_tracking import GazeTracking
 from eye_tracker.calibration import Calibration, calibration_step, render_dot
+from eye_tracker.pipeline import CursorPipeline
 from utils.bufferless_video_capture import BufferlessVideoCapture
 
 class EyeTracker:
-    def __init__(self, window, collect_data=True, calibration_file=None, use_mp=True):
+    def __init__(self, window, collect_data=True, calibration_file=None, use_mp=True, tracking=True,
+                 adaptive_threshold=True, pipelined=False):
         self.window = window
         self.collect_data = collect_data
+        self.pipelined = pipelined
+        self.pipeline = None
 
-        self.gaze_tracker = GazeTracking()
+        self.gaze_tracker = GazeTracking(tracking=tracking, adaptive_threshold=adaptive_threshold)
         self.camera = BufferlessVideoCapture(0, 800, 600, 30)
         self.calibration = Calibration(
             0.04, 
@@ -26,6 +30,8 @@ class EyeTracker:
         )
 
     def __del__(self):
+        if self.pipeline:
+            self.pipeline.stop()
         self.calibration.__del__()
 
     def calibrate(self):
@@ -57,13 +63,18 @@ class EyeTracker:
         )
 
         measurements = self.calibration.get_measurements()
-        means, covariances = self.kf.filter(measurements)
-        self.mean = means[-1]
-        self.covariance = covariances[-1]
+        mean, covariance = self.kf.filter(measurements, timesteps=-1)
+        self.cursor_filter = self.kf.online(mean, covariance, steady_state=True)
+
+        if self.pipelined:
+            self.pipeline = CursorPipeline(self.camera, self.gaze_tracker, self.calibration, self.cursor_filter)
+            self.pipeline.start()
 
     def get_cursor(self):
         if not self.calibration.done:
             raise Exception('Calibration must be done before get_cursor() is called.')
+        if self.pipeline:
+            return self.pipeline.get()
         frame = self.camera.read()
         self.gaze_tracker.refresh(frame)
         if not self.gaze_tracker.pupils_located:
@@ -71,12 +82,21 @@ class EyeTracker:
         x = 1 - self.gaze_tracker.horizontal_ratio()
         y = self.gaze_tracker.vertical_ratio()
         x, y = self.calibration.transform(x, y)
-        self.mean, self.covariance = self.kf.filter_update(self.mean, self.covariance, (x, y))
-        x = int(self.mean[0])
-        y = int(self.mean[1])
+        mean = self.cursor_filter.push((x, y))
+        x = int(mean[0])
+        y = int(mean[1])
         return x, y
 
+    def get_latency(self):
+        # mean and 95th percentile of the capture to cursor latency, in seconds
+        if not self.pipeline:
+            return None, None
+        return self.pipeline.latency()
+
     def update_cursor(self, x, y):
         if not self.calibration.done:
             raise Exception('Calibration must be done before update_cursor() is called.')
-        self.mean, self.covariance = self.kf.filter_update(self.mean, self.covariance, (x, y))
\ No newline at end of file
+        if self.pipeline:
+            self.pipeline.correct(x, y)
+            return
+        self.cursor_filter.push((x, y))
\ No newline at end of file
@@ -0,0 +1,169 @@
+import time
+import queue
+import threading
+import numpy as np
+from collections import deque
+
+# Live cursor pipeline: capture -> face and landmarks -> pupils and calibration -> Kalman filter.
+# Each stage runs in its own thread and hands its output to the next one through a
+# single-slot queue, so a frame can be filtered while the next ones are being analyzed.
+# Every item carries the time its frame was captured (time.monotonic(), from the camera).
+# The face tracking state of the gaze tracker is only used by the detection stage and its
+# pupil calibration by the analysis stage; lost eyes are sent back to detection in lost_faces.
+# A stage that fails stops the pipeline and get() raises its exception.
+class CursorPipeline:
+    def __init__(self, camera, gaze_tracker, calibration, cursor_filter, latency_window=300):
+        self.camera = camera
+        self.gaze_tracker = gaze_tracker
+        self.calibration = calibration
+        self.cursor_filter = cursor_filter
+
+        self.frames = queue.Queue(maxsize=1)
+        self.landmarks = queue.Queue(maxsize=1)
+        self.measurements = queue.Queue(maxsize=1)
+        self.cursors = queue.Queue(maxsize=1)
+        self.corrections = queue.Queue()
+        self.lost_faces = queue.Queue()
+
+        # end-to-end latencies (capture to get()) of the last frames, in seconds
+        self.latencies = deque(maxlen=latency_window)
+
+        self.error = None
+        self.running = threading.Event()
+        self.threads = [
+            threading.Thread(target=self._run, args=(stage,), daemon=True)
+            for stage in (self._capture, self._detect, self._analyze, self._filter)
+        ]
+
+    def start(self):
+        self.running.set()
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self, timeout=1):
+        # every stage waits at most 0.1s before seeing it should stop, then finishes its frame
+        self.running.clear()
+        deadline = time.monotonic() + timeout
+        for thread in self.threads:
+            thread.join(timeout=max(deadline - time.monotonic(), 0))
+        stopped = not any(thread.is_alive() for thread in self.threads)
+        if not stopped:
+            print('WARNING: cursor pipeline stages still running after {}s.'.format(timeout))
+        return stopped
+
+    def get(self):
+        while True:
+            if self.error is not None:
+                raise self.error
+            if not self.running.is_set():
+                raise Exception('Cursor pipeline is not running.')
+            try:
+                timestamp, cursor = self.cursors.get(timeout=0.1)
+                break
+            except queue.Empty:
+                continue
+        self.latencies.append(time.monotonic() - timestamp)
+        return cursor
+
+    def correct(self, x, y):
+        # applied by the filter stage, before its next measurement
+        self.corrections.put((x, y))
+
+    def latency(self):
+        if not self.latencies:
+            return None, None
+        latencies = np.array(self.latencies)
+        return np.mean(latencies), np.percentile(latencies, 95)
+
+    def _run(self, stage):
+        try:
+            stage()
+        except Exception as error:
+            self.error = error
+        finally:
+            self.running.clear()
+
+    def _get(self, source):
+        while self.running.is_set():
+            try:
+                return source.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return None
+
+    def _put(self, sink, item):
+        while self.running.is_set():
+            try:
+                sink.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _put_latest(self, sink, item):
+        # never wait on the consumer, replace what it hasn't taken yet
+        while self.running.is_set():
+            try:
+                sink.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    sink.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def _capture(self):
+        while self.running.is_set():
+            try:
+                frame = self.camera.read(record=True, timeout=0.1)
+            except queue.Empty:
+                continue
+            self._put_latest(self.frames, (frame.timestamp, frame.image))
+
+    def _detect(self):
+        while self.running.is_set():
+            item = self._get(self.frames)
+            if item is None:
+                return
+            timestamp, frame = item
+            face_lost = False
+            while True:
+                try:
+                    self.lost_faces.get_nowait()
+                    face_lost = True
+                except queue.Empty:
+                    break
+            gray, landmarks = self.gaze_tracker.detect_landmarks(frame, face_lost=face_lost)
+            self._put(self.landmarks, (timestamp, gray, landmarks))
+
+    def _analyze(self):
+        while self.running.is_set():
+            item = self._get(self.landmarks)
+            if item is None:
+                return
+            timestamp, gray, landmarks = item
+            result = self.gaze_tracker.analyze_landmarks(gray, landmarks)
+            if not result.located:
+                self.lost_faces.put(timestamp)
+                self._put(self.measurements, (timestamp, None))
+                continue
+            # invert horizontal ratio to match pixel coordinate convention
+            x = 1 - result.horizontal_ratio
+            y = result.vertical_ratio
+            self._put(self.measurements, (timestamp, self.calibration.transform(x, y)))
+
+    def _filter(self):
+        while self.running.is_set():
+            item = self._get(self.measurements)
+            if item is None:
+                return
+            timestamp, measurement = item
+            while True:
+                try:
+                    self.cursor_filter.push(self.corrections.get_nowait())
+                except queue.Empty:
+                    break
+            if measurement is None:
+                self._put_latest(self.cursors, (timestamp, (None, None)))
+                continue
+            mean = self.cursor_filter.push(measurement)
+            self._put_latest(self.cursors, (timestamp, (int(mean[0]), int(mean[1]))))
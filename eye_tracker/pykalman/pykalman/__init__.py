@@ -14,6 +14,7 @@ __all__ = [
     "KalmanFilter",
     "AdditiveUnscentedKalmanFilter",
     "UnscentedKalmanFilter",
+    "backend",
     "datasets",
     "sqrt"
 ]
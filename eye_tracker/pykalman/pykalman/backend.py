@@ -0,0 +1,562 @@
+'''
+=================
+Compiled Backends
+=================
+
+This module contains compiled versions of the predict/correct recursions used
+by :class:`pykalman.KalmanFilter` and the square root filters in
+:mod:`pykalman.sqrt`.  The recursions are dominated by interpreter overhead
+on the small matrices typical of tracking problems, so they are compiled with
+`numba <https://numba.pydata.org>`_ when it is installed.
+
+A backend is chosen with the `backend` argument of the filters, or else with
+the ``PYKALMAN_BACKEND`` environment variable.  Valid values are ``'numpy'``
+(the default) and ``'numba'``.  If numba is requested but cannot be imported,
+the pure NumPy implementation is used instead.
+
+The public functions here take the same arguments as the NumPy functions
+they replace; the kernels behind them take time-varying parameters stacked
+along their first axis and a boolean `missing` array in place of masked
+observations.
+'''
+import os
+import warnings
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+if numba is not None:
+    # compilation is deferred until each kernel's first call
+    _jit = numba.njit(cache=True)
+else:
+    def _jit(function):
+        return function
+
+
+BACKENDS = ('numpy', 'numba')
+BACKEND_ENVIRONMENT_VARIABLE = 'PYKALMAN_BACKEND'
+
+
+def get_backend(backend=None):
+    """Resolve which backend to run the filtering recursions with
+
+    Parameters
+    ----------
+    backend : string or None
+        one of `BACKENDS`.  If None, the ``PYKALMAN_BACKEND`` environment
+        variable is used, defaulting to ``'numpy'``.
+
+    Returns
+    -------
+    backend : string
+        ``'numba'`` if requested and numba is importable, ``'numpy'``
+        otherwise
+    """
+    if backend is None:
+        backend = os.environ.get(BACKEND_ENVIRONMENT_VARIABLE, 'numpy')
+    backend = backend.lower()
+    if backend not in BACKENDS:
+        raise ValueError(
+            "backend must be one of %s, not '%s'" % (BACKENDS, backend)
+        )
+    if backend == 'numba' and numba is None:
+        warnings.warn("numba is not installed; falling back to the numpy "
+                      + "backend")
+        backend = 'numpy'
+    return backend
+
+
+def _stack(X, n_timesteps, ndims=2):
+    """Stack the final `ndims` dimensions of `X` for `n_timesteps` time steps
+    into the C-contiguous float64 array the kernels expect"""
+    X = np.asarray(X, dtype=np.float64)
+    if len(X.shape) == ndims:
+        X = np.broadcast_to(X, (n_timesteps,) + X.shape)
+    return np.ascontiguousarray(X[:n_timesteps])
+
+
+def _as_array(X):
+    return np.ascontiguousarray(X, dtype=np.float64)
+
+
+def _split_observations(observations):
+    """Split (possibly masked) observations into values and a missing flag"""
+    missing = np.any(np.ma.getmaskarray(observations), axis=1)
+    observations = np.ma.filled(
+        np.ma.asarray(observations, dtype=np.float64), 0.0
+    )
+    return (np.ascontiguousarray(observations), missing)
+
+
+def filter(transition_matrices, observation_matrices, transition_covariance,
+           observation_covariance, transition_offsets, observation_offsets,
+           initial_state_mean, initial_state_covariance, observations):
+    """Compiled :func:`pykalman.standard._filter`"""
+    n_timesteps = observations.shape[0]
+    (observations, missing) = _split_observations(observations)
+    return _filter(
+        _stack(transition_matrices, n_timesteps - 1),
+        _stack(transition_covariance, n_timesteps - 1),
+        _stack(transition_offsets, n_timesteps - 1, ndims=1),
+        _stack(observation_matrices, n_timesteps),
+        _stack(observation_covariance, n_timesteps),
+        _stack(observation_offsets, n_timesteps, ndims=1),
+        _as_array(initial_state_mean), _as_array(initial_state_covariance),
+        observations, missing
+    )
+
+
+def smooth(transition_matrices, filtered_state_means,
+           filtered_state_covariances, predicted_state_means,
+           predicted_state_covariances):
+    """Compiled :func:`pykalman.standard._smooth`"""
+    n_timesteps = filtered_state_means.shape[0]
+    return _smooth(
+        _stack(transition_matrices, n_timesteps - 1),
+        _as_array(filtered_state_means), _as_array(filtered_state_covariances),
+        _as_array(predicted_state_means),
+        _as_array(predicted_state_covariances)
+    )
+
+
+def cholesky_filter(transition_matrices, observation_matrices,
+                    transition_covariance2, observation_covariance2,
+                    transition_offsets, observation_offsets,
+                    initial_state_mean, initial_state_covariance2,
+                    observations):
+    """Compiled :func:`pykalman.sqrt.cholesky._filter`, given the lower
+    Cholesky factors of the covariance matrices"""
+    n_timesteps = observations.shape[0]
+    (observations, missing) = _split_observations(observations)
+    return _cholesky_filter(
+        _stack(transition_matrices, n_timesteps - 1),
+        _as_array(transition_covariance2),
+        _stack(transition_offsets, n_timesteps - 1, ndims=1),
+        _stack(observation_matrices, n_timesteps),
+        _as_array(observation_covariance2),
+        _stack(observation_offsets, n_timesteps, ndims=1),
+        _as_array(initial_state_mean), _as_array(initial_state_covariance2),
+        observations, missing
+    )
+
+
+def bierman_filter(transition_matrices, observation_matrices,
+                   transition_covariance, observation_covariance,
+                   transition_offsets, observation_offsets,
+                   initial_state_mean, initial_state_U, initial_state_D,
+                   observations):
+    """Compiled :func:`pykalman.sqrt.bierman._filter`, given decorrelated
+    observations and the UDU' decomposition of the initial state covariance
+
+    Returns
+    -------
+    predicted_state_means, predicted_state_Us, predicted_state_Ds, \
+    filtered_state_means, filtered_state_Us, filtered_state_Ds
+        see :func:`_bierman_filter`
+    """
+    n_timesteps = observations.shape[0]
+    (observations, missing) = _split_observations(observations)
+    return _bierman_filter(
+        _stack(transition_matrices, n_timesteps - 1),
+        _as_array(transition_covariance),
+        _stack(transition_offsets, n_timesteps - 1, ndims=1),
+        _stack(observation_matrices, n_timesteps),
+        _as_array(np.diag(observation_covariance)),
+        _stack(observation_offsets, n_timesteps, ndims=1),
+        _as_array(initial_state_mean), _as_array(initial_state_U),
+        _as_array(initial_state_D), observations, missing
+    )
+
+
+###############################################################################
+# Kernels.  These are written in the subset of Python numba can compile, and
+# are only ever called when numba is available.  Matrix products are written
+# out as loops, which beats BLAS calls at these sizes and works on transposed
+# views.
+@_jit
+def _dot(A, B):
+    out = np.zeros((A.shape[0], B.shape[1]))
+    for i in range(A.shape[0]):
+        for k in range(A.shape[1]):
+            a = A[i, k]
+            for j in range(B.shape[1]):
+                out[i, j] += a * B[k, j]
+    return out
+
+
+@_jit
+def _dot_vector(A, x):
+    out = np.zeros(A.shape[0])
+    for i in range(A.shape[0]):
+        for k in range(A.shape[1]):
+            out[i] += A[i, k] * x[k]
+    return out
+
+
+@_jit
+def _filter(transition_matrices, transition_covariances, transition_offsets,
+            observation_matrices, observation_covariances,
+            observation_offsets, initial_state_mean, initial_state_covariance,
+            observations, missing):
+    """Kalman Filter recursion
+
+    Parameters
+    ----------
+    transition_matrices, transition_covariances : [n_timesteps-1, n_dim_state,
+    n_dim_state] arrays
+    transition_offsets : [n_timesteps-1, n_dim_state] array
+    observation_matrices : [n_timesteps, n_dim_obs, n_dim_state] array
+    observation_covariances : [n_timesteps, n_dim_obs, n_dim_obs] array
+    observation_offsets : [n_timesteps, n_dim_obs] array
+    initial_state_mean : [n_dim_state] array
+    initial_state_covariance : [n_dim_state, n_dim_state] array
+    observations : [n_timesteps, n_dim_obs] array
+    missing : [n_timesteps] array of bool
+
+    Returns
+    -------
+    predicted_state_means, predicted_state_covariances, kalman_gains, \
+    filtered_state_means, filtered_state_covariances
+        see :func:`pykalman.standard._filter`
+    """
+    n_timesteps, n_dim_obs = observations.shape
+    n_dim_state = initial_state_mean.shape[0]
+
+    predicted_state_means = np.zeros((n_timesteps, n_dim_state))
+    predicted_state_covariances = np.zeros(
+        (n_timesteps, n_dim_state, n_dim_state)
+    )
+    kalman_gains = np.zeros((n_timesteps, n_dim_state, n_dim_obs))
+    filtered_state_means = np.zeros((n_timesteps, n_dim_state))
+    filtered_state_covariances = np.zeros(
+        (n_timesteps, n_dim_state, n_dim_state)
+    )
+
+    for t in range(n_timesteps):
+        if t == 0:
+            predicted_state_means[t] = initial_state_mean
+            predicted_state_covariances[t] = initial_state_covariance
+        else:
+            transition_matrix = transition_matrices[t - 1]
+            predicted_state_means[t] = (
+                _dot_vector(transition_matrix, filtered_state_means[t - 1])
+                + transition_offsets[t - 1]
+            )
+            predicted_state_covariances[t] = (
+                _dot(_dot(transition_matrix, filtered_state_covariances[t - 1]),
+                     transition_matrix.T)
+                + transition_covariances[t - 1]
+            )
+
+        if missing[t]:
+            filtered_state_means[t] = predicted_state_means[t]
+            filtered_state_covariances[t] = predicted_state_covariances[t]
+            continue
+
+        observation_matrix = observation_matrices[t]
+        state_observation_covariance = _dot(predicted_state_covariances[t],
+                                            observation_matrix.T)
+        predicted_observation_covariance = (
+            _dot(observation_matrix, state_observation_covariance)
+            + observation_covariances[t]
+        )
+        kalman_gain = _dot(state_observation_covariance,
+                           np.linalg.pinv(predicted_observation_covariance))
+        innovation = (
+            observations[t]
+            - _dot_vector(observation_matrix, predicted_state_means[t])
+            - observation_offsets[t]
+        )
+
+        kalman_gains[t] = kalman_gain
+        filtered_state_means[t] = (
+            predicted_state_means[t] + _dot_vector(kalman_gain, innovation)
+        )
+        filtered_state_covariances[t] = (
+            predicted_state_covariances[t]
+            - _dot(kalman_gain, _dot(observation_matrix,
+                                     predicted_state_covariances[t]))
+        )
+
+    return (predicted_state_means, predicted_state_covariances, kalman_gains,
+            filtered_state_means, filtered_state_covariances)
+
+
+@_jit
+def _smooth(transition_matrices, filtered_state_means,
+            filtered_state_covariances, predicted_state_means,
+            predicted_state_covariances):
+    """Kalman Smoother recursion
+
+    Parameters
+    ----------
+    transition_matrices : [n_timesteps-1, n_dim_state, n_dim_state] array
+    filtered_state_means, filtered_state_covariances, predicted_state_means, \
+    predicted_state_covariances
+        see :func:`pykalman.standard._smooth`
+
+    Returns
+    -------
+    smoothed_state_means, smoothed_state_covariances, kalman_smoothing_gains
+        see :func:`pykalman.standard._smooth`
+    """
+    n_timesteps, n_dim_state = filtered_state_means.shape
+
+    smoothed_state_means = np.zeros((n_timesteps, n_dim_state))
+    smoothed_state_covariances = np.zeros((n_timesteps, n_dim_state,
+                                           n_dim_state))
+    kalman_smoothing_gains = np.zeros((max(n_timesteps - 1, 0), n_dim_state,
+                                       n_dim_state))
+
+    smoothed_state_means[-1] = filtered_state_means[-1]
+    smoothed_state_covariances[-1] = filtered_state_covariances[-1]
+
+    for t in range(n_timesteps - 2, -1, -1):
+        kalman_smoothing_gain = _dot(
+            _dot(filtered_state_covariances[t], transition_matrices[t].T),
+            np.linalg.pinv(predicted_state_covariances[t + 1])
+        )
+        smoothed_state_means[t] = (
+            filtered_state_means[t]
+            + _dot_vector(kalman_smoothing_gain,
+                          smoothed_state_means[t + 1]
+                          - predicted_state_means[t + 1])
+        )
+        smoothed_state_covariances[t] = (
+            filtered_state_covariances[t]
+            + _dot(_dot(kalman_smoothing_gain,
+                        smoothed_state_covariances[t + 1]
+                        - predicted_state_covariances[t + 1]),
+                   kalman_smoothing_gain.T)
+        )
+        kalman_smoothing_gains[t] = kalman_smoothing_gain
+
+    return (smoothed_state_means, smoothed_state_covariances,
+            kalman_smoothing_gains)
+
+
+@_jit
+def _cholesky_filter(transition_matrices, transition_covariance2,
+                     transition_offsets, observation_matrices,
+                     observation_covariance2, observation_offsets,
+                     initial_state_mean, initial_state_covariance2,
+                     observations, missing):
+    """Square root (Cholesky) Kalman Filter recursion
+
+    Parameters
+    ----------
+    transition_matrices : [n_timesteps-1, n_dim_state, n_dim_state] array
+    transition_covariance2 : [n_dim_state, n_dim_state] array
+        lower Cholesky factor of the transition covariance
+    transition_offsets : [n_timesteps-1, n_dim_state] array
+    observation_matrices : [n_timesteps, n_dim_obs, n_dim_state] array
+    observation_covariance2 : [n_dim_obs, n_dim_obs] array
+        lower Cholesky factor of the observation covariance
+    observation_offsets : [n_timesteps, n_dim_obs] array
+    initial_state_mean : [n_dim_state] array
+    initial_state_covariance2 : [n_dim_state, n_dim_state] array
+        lower Cholesky factor of the initial state covariance
+    observations : [n_timesteps, n_dim_obs] array
+    missing : [n_timesteps] array of bool
+
+    Returns
+    -------
+    predicted_state_means, predicted_state_covariance2s, \
+    filtered_state_means, filtered_state_covariance2s
+        see :func:`pykalman.sqrt.cholesky._filter`
+    """
+    n_timesteps, n_dim_obs = observations.shape
+    n_dim_state = initial_state_mean.shape[0]
+
+    predicted_state_means = np.zeros((n_timesteps, n_dim_state))
+    predicted_state_covariance2s = np.zeros(
+        (n_timesteps, n_dim_state, n_dim_state)
+    )
+    filtered_state_means = np.zeros((n_timesteps, n_dim_state))
+    filtered_state_covariance2s = np.zeros(
+        (n_timesteps, n_dim_state, n_dim_state)
+    )
+
+    for t in range(n_timesteps):
+        if t == 0:
+            predicted_state_means[t] = initial_state_mean
+            predicted_state_covariance2s[t] = initial_state_covariance2
+        else:
+            transition_matrix = transition_matrices[t - 1]
+            predicted_state_means[t] = (
+                _dot_vector(transition_matrix, filtered_state_means[t - 1])
+                + transition_offsets[t - 1]
+            )
+            # [S_{k|k-1}^T; 0] = T_1 [ S_{k-1|k-1}^T A^T; Q^{1/2}^T ]
+            M = np.zeros((2 * n_dim_state, n_dim_state))
+            M[:n_dim_state] = _dot(
+                transition_matrix, filtered_state_covariance2s[t - 1]
+            ).T
+            M[n_dim_state:] = transition_covariance2.T
+            R = np.linalg.qr(M)[1]
+            predicted_state_covariance2s[t] = R[:n_dim_state, :n_dim_state].T
+
+        if missing[t]:
+            filtered_state_means[t] = predicted_state_means[t]
+            filtered_state_covariance2s[t] = predicted_state_covariance2s[t]
+            continue
+
+        # M = [    R^{1/2}^{T},            0;
+        #      (C S_{t|t-1})^T,  S_{t|t-1}^T]
+        observation_matrix = observation_matrices[t]
+        M = np.zeros((n_dim_obs + n_dim_state, n_dim_obs + n_dim_state))
+        M[:n_dim_obs, :n_dim_obs] = observation_covariance2.T
+        M[n_dim_obs:, :n_dim_obs] = _dot(
+            observation_matrix, predicted_state_covariance2s[t]
+        ).T
+        M[n_dim_obs:, n_dim_obs:] = predicted_state_covariance2s[t].T
+        S = np.linalg.qr(M)[1]
+        kalman_gain = S[:n_dim_obs, n_dim_obs:].T
+        N = np.ascontiguousarray(S[:n_dim_obs, :n_dim_obs].T)
+
+        innovation = (
+            observations[t]
+            - _dot_vector(observation_matrix, predicted_state_means[t])
+            - observation_offsets[t]
+        )
+        filtered_state_means[t] = (
+            predicted_state_means[t]
+            + _dot_vector(kalman_gain,
+                          _dot_vector(np.linalg.pinv(N), innovation))
+        )
+        filtered_state_covariance2s[t] = S[n_dim_obs:, n_dim_obs:].T
+
+    return (predicted_state_means, predicted_state_covariance2s,
+            filtered_state_means, filtered_state_covariance2s)
+
+
+@_jit
+def _udu(M):
+    """UDU' decomposition; see :func:`pykalman.sqrt.bierman.udu`"""
+    n = M.shape[0]
+    M = np.triu(M)
+    U = np.eye(n)
+    d = np.zeros(n)
+    for j in range(n, 1, -1):
+        d[j - 1] = M[j - 1, j - 1]
+        if d[j - 1] > 0:
+            alpha = 1.0 / d[j - 1]
+        else:
+            alpha = 0.0
+        for k in range(1, j):
+            beta = M[k - 1, j - 1]
+            U[k - 1, j - 1] = alpha * beta
+            M[0:k, k - 1] = M[0:k, k - 1] - beta * U[0:k, j - 1]
+    d[0] = M[0, 0]
+    return (U, d)
+
+
+@_jit
+def _bierman_filter(transition_matrices, transition_covariance,
+                    transition_offsets, observation_matrices,
+                    observation_variances, observation_offsets,
+                    initial_state_mean, initial_state_U, initial_state_D,
+                    observations, missing):
+    """Bierman (UDU') Kalman Filter recursion on decorrelated observations
+
+    Parameters
+    ----------
+    transition_matrices : [n_timesteps-1, n_dim_state, n_dim_state] array
+    transition_covariance : [n_dim_state, n_dim_state] array
+    transition_offsets : [n_timesteps-1, n_dim_state] array
+    observation_matrices : [n_timesteps, n_dim_obs, n_dim_state] array
+    observation_variances : [n_dim_obs] array
+        variance of each (decorrelated) observation coordinate
+    observation_offsets : [n_timesteps, n_dim_obs] array
+    initial_state_mean : [n_dim_state] array
+    initial_state_U, initial_state_D : [n_dim_state, n_dim_state] and \
+    [n_dim_state] arrays
+        UDU' decomposition of the initial state covariance
+    observations : [n_timesteps, n_dim_obs] array
+    missing : [n_timesteps] array of bool
+
+    Returns
+    -------
+    predicted_state_means : [n_timesteps, n_dim_state] array
+    predicted_state_Us, predicted_state_Ds : [n_timesteps, n_dim_state, \
+    n_dim_state] and [n_timesteps, n_dim_state] arrays
+        UDU' decompositions of the predicted state covariances
+    filtered_state_means : [n_timesteps, n_dim_state] array
+    filtered_state_Us, filtered_state_Ds : [n_timesteps, n_dim_state, \
+    n_dim_state] and [n_timesteps, n_dim_state] arrays
+        UDU' decompositions of the filtered state covariances
+    """
+    n_timesteps, n_dim_obs = observations.shape
+    n_dim_state = initial_state_mean.shape[0]
+
+    predicted_state_means = np.zeros((n_timesteps, n_dim_state))
+    predicted_state_Us = np.zeros((n_timesteps, n_dim_state, n_dim_state))
+    predicted_state_Ds = np.zeros((n_timesteps, n_dim_state))
+    filtered_state_means = np.zeros((n_timesteps, n_dim_state))
+    filtered_state_Us = np.zeros((n_timesteps, n_dim_state, n_dim_state))
+    filtered_state_Ds = np.zeros((n_timesteps, n_dim_state))
+
+    for t in range(n_timesteps):
+        if t == 0:
+            predicted_state_means[t] = initial_state_mean
+            predicted_state_Us[t] = initial_state_U
+            predicted_state_Ds[t] = initial_state_D
+        else:
+            transition_matrix = transition_matrices[t - 1]
+            predicted_state_means[t] = (
+                _dot_vector(transition_matrix, filtered_state_means[t - 1])
+                + transition_offsets[t - 1]
+            )
+            U = filtered_state_Us[t - 1]
+            covariance = _dot(U * filtered_state_Ds[t - 1], U.T)
+            (predicted_state_Us[t], predicted_state_Ds[t]) = _udu(
+                _dot(_dot(transition_matrix, covariance), transition_matrix.T)
+                + transition_covariance
+            )
+
+        mean = predicted_state_means[t].copy()
+        U = predicted_state_Us[t].copy()
+        D = predicted_state_Ds[t].copy()
+        if not missing[t]:
+            # one scalar update per (decorrelated) observation coordinate
+            for i in range(n_dim_obs):
+                h = observation_matrices[t, i]
+                R = observation_variances[i]
+
+                f = _dot_vector(U.T, h)
+                g = D * f
+                alpha = np.dot(f, g) + R
+
+                U_bar = np.zeros((n_dim_state, n_dim_state))
+                D_bar = np.zeros(n_dim_state)
+                k = np.zeros(n_dim_state)
+                gamma = R + g[0] * f[0]
+                D_bar[0] = D[0] * R / gamma
+                k[0] = g[0]
+                U_bar[0, 0] = 1
+                for j in range(1, n_dim_state):
+                    previous_gamma = gamma
+                    gamma = gamma + g[j] * f[j]
+                    D_bar[j] = D[j] * previous_gamma / gamma
+                    U_bar[:, j] = U[:, j] - (f[j] / previous_gamma) * k
+                    k = k + g[j] * U[:, j]
+                U = U_bar
+                D = D_bar
+
+                predicted_observation_mean = (
+                    np.dot(h, mean) + observation_offsets[t, i]
+                )
+                mean = mean + (k / alpha) * (
+                    observations[t, i] - predicted_observation_mean
+                )
+
+        filtered_state_means[t] = mean
+        filtered_state_Us[t] = U
+        filtered_state_Ds[t] = D
+
+    return (predicted_state_means, predicted_state_Us, predicted_state_Ds,
+            filtered_state_means, filtered_state_Us, filtered_state_Ds)
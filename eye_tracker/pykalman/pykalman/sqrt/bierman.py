@@ -12,6 +12,8 @@ import warnings
 import numpy as np
 from scipy import linalg
 
+from .. import backend as compiled
+from ..backend import get_backend
 from ..standard import _arg_or_default, _determine_dimensionality, \
     _last_dims, _loglikelihoods, _smooth, _smooth_pair, _em, KalmanFilter, DIM
 from ..utils import array1d, array2d, check_random_state, \
@@ -325,7 +327,8 @@ def _filter_correct(observation_matrix, observation_covariance,
 
 def _filter(transition_matrices, observation_matrices, transition_covariance,
             observation_covariance, transition_offsets, observation_offsets,
-            initial_state_mean, initial_state_covariance, observations):
+            initial_state_mean, initial_state_covariance, observations,
+            backend=None):
     """Apply the Kalman Filter
 
     Calculate posterior distribution over hidden states given observations up
@@ -357,6 +360,9 @@ def _filter(transition_matrices, observation_matrices, transition_covariance,
         observations from times [0...n_timesteps-1].  If `observations` is a
         masked array and any of `observations[t]` is masked, then
         `observations[t]` will be treated as a missing observation.
+    backend : string, optional
+        backend to run the recursion with, as accepted by
+        :func:`pykalman.backend.get_backend`
 
     Returns
     -------
@@ -401,6 +407,27 @@ def _filter(transition_matrices, observation_matrices, transition_covariance,
         )
     )
 
+    if get_backend(backend) == 'numba':
+        (predicted_state_means, predicted_state_Us, predicted_state_Ds,
+         filtered_state_means, filtered_state_Us, filtered_state_Ds) = (
+            compiled.bierman_filter(
+                transition_matrices, observation_matrices,
+                transition_covariance, observation_covariance,
+                transition_offsets, observation_offsets, initial_state_mean,
+                initial_state_covariance.U, initial_state_covariance.D,
+                observations
+            )
+        )
+        for t in range(n_timesteps):
+            predicted_state_covariances[t] = UDU_decomposition(
+                predicted_state_Us[t], predicted_state_Ds[t]
+            )
+            filtered_state_covariances[t] = UDU_decomposition(
+                filtered_state_Us[t], filtered_state_Ds[t]
+            )
+        return (predicted_state_means, predicted_state_covariances,
+                filtered_state_means, filtered_state_covariances)
+
     for t in range(n_timesteps):
         if t == 0:
             predicted_state_means[t] = initial_state_mean
@@ -527,7 +554,7 @@ class BiermanKalmanFilter(KalmanFilter):
                 transition_covariance, observation_covariance,
                 transition_offsets, observation_offsets,
                 initial_state_mean, initial_state_covariance,
-                Z
+                Z, backend=self.backend
             )
         )
 
@@ -706,7 +733,8 @@ class BiermanKalmanFilter(KalmanFilter):
                 transition_matrices, observation_matrices,
                 transition_covariance, observation_covariance,
                 transition_offsets, observation_offsets,
-                initial_state_mean, initial_state_covariance, Z
+                initial_state_mean, initial_state_covariance, Z,
+                backend=self.backend
             )
         )
 
@@ -722,7 +750,7 @@ class BiermanKalmanFilter(KalmanFilter):
             _smooth(
                 transition_matrices, filtered_state_means,
                 filtered_state_covariances, predicted_state_means,
-                predicted_state_covariances
+                predicted_state_covariances, backend=self.backend
             )[:2]
         )
         return (smoothed_state_means, smoothed_state_covariances)
@@ -797,7 +825,7 @@ class BiermanKalmanFilter(KalmanFilter):
                     self.transition_covariance, self.observation_covariance,
                     self.transition_offsets, self.observation_offsets,
                     self.initial_state_mean, self.initial_state_covariance,
-                    Z
+                    Z, backend=self.backend
                 )
             )
 
@@ -815,7 +843,7 @@ class BiermanKalmanFilter(KalmanFilter):
                 _smooth(
                     self.transition_matrices, filtered_state_means,
                     filtered_state_covariances, predicted_state_means,
-                    predicted_state_covariances
+                    predicted_state_covariances, backend=self.backend
                 )
             )
 
@@ -866,7 +894,7 @@ class BiermanKalmanFilter(KalmanFilter):
                 transition_covariance, observation_covariance,
                 transition_offsets, observation_offsets,
                 initial_state_mean, initial_state_covariance,
-                Z
+                Z, backend=self.backend
             )
         )
 
@@ -11,6 +11,8 @@ import warnings
 import numpy as np
 from scipy import linalg
 
+from .. import backend as compiled
+from ..backend import get_backend
 from ..standard import _arg_or_default, _determine_dimensionality, \
     _last_dims, _loglikelihoods, _smooth, _smooth_pair, _em, KalmanFilter, DIM
 from ..utils import array1d, array2d, check_random_state, \
@@ -178,7 +180,8 @@ def _filter_correct(observation_matrix, observation_covariance2,
 
 def _filter(transition_matrices, observation_matrices, transition_covariance,
             observation_covariance, transition_offsets, observation_offsets,
-            initial_state_mean, initial_state_covariance, observations):
+            initial_state_mean, initial_state_covariance, observations,
+            backend=None):
     """Apply the Kalman Filter
 
     Calculate posterior distribution over hidden states given observations up
@@ -211,6 +214,9 @@ def _filter(transition_matrices, observation_matrices, transition_covariance,
         observations from times [0...n_timesteps-1].  If `observations` is a
         masked array and any of `observations[t]` is masked, then
         `observations[t]` will be treated as a missing observation.
+    backend : string, optional
+        backend to run the recursion with, as accepted by
+        :func:`pykalman.backend.get_backend`
 
     Returns
     -------
@@ -245,6 +251,13 @@ def _filter(transition_matrices, observation_matrices, transition_covariance,
     observation_covariance2 = linalg.cholesky(observation_covariance, lower=True)
     initial_state_covariance2 = linalg.cholesky(initial_state_covariance, lower=True)
 
+    if get_backend(backend) == 'numba':
+        return compiled.cholesky_filter(
+            transition_matrices, observation_matrices, transition_covariance2,
+            observation_covariance2, transition_offsets, observation_offsets,
+            initial_state_mean, initial_state_covariance2, observations
+        )
+
     for t in range(n_timesteps):
         if t == 0:
             predicted_state_means[t] = initial_state_mean
@@ -371,7 +384,7 @@ class CholeskyKalmanFilter(KalmanFilter):
                 transition_covariance, observation_covariance,
                 transition_offsets, observation_offsets,
                 initial_state_mean, initial_state_covariance,
-                Z
+                Z, backend=self.backend
             )
         )
 
@@ -541,7 +554,8 @@ class CholeskyKalmanFilter(KalmanFilter):
                 transition_matrices, observation_matrices,
                 transition_covariance, observation_covariance,
                 transition_offsets, observation_offsets,
-                initial_state_mean, initial_state_covariance, Z
+                initial_state_mean, initial_state_covariance, Z,
+                backend=self.backend
             )
         )
 
@@ -557,7 +571,7 @@ class CholeskyKalmanFilter(KalmanFilter):
             _smooth(
                 transition_matrices, filtered_state_means,
                 filtered_state_covariances, predicted_state_means,
-                predicted_state_covariances
+                predicted_state_covariances, backend=self.backend
             )[:2]
         )
         return (smoothed_state_means, smoothed_state_covariances)
@@ -632,7 +646,7 @@ class CholeskyKalmanFilter(KalmanFilter):
                     self.transition_covariance, self.observation_covariance,
                     self.transition_offsets, self.observation_offsets,
                     self.initial_state_mean, self.initial_state_covariance,
-                    Z
+                    Z, backend=self.backend
                 )
             )
 
@@ -650,7 +664,7 @@ class CholeskyKalmanFilter(KalmanFilter):
                 _smooth(
                     self.transition_matrices, filtered_state_means,
                     filtered_state_covariances, predicted_state_means,
-                    predicted_state_covariances
+                    predicted_state_covariances, backend=self.backend
                 )
             )
 
@@ -701,7 +715,7 @@ class CholeskyKalmanFilter(KalmanFilter):
                 transition_covariance, observation_covariance,
                 transition_offsets, observation_offsets,
                 initial_state_mean, initial_state_covariance,
-                Z
+                Z, backend=self.backend
             )
         )
 
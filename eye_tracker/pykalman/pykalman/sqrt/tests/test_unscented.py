@@ -113,6 +113,43 @@ def test_additive_smoother():
     )
 
 
+def test_additive_vectorized():
+    A = np.array([[1, 1], [0, 1]])
+    C = np.array([[0.5, -0.3]])
+    check_additive_vectorized(lambda X: X.dot(A.T), lambda X: X.dot(C.T))
+
+    # with one observation dimension, g may return a 1-D array holding one
+    # value per sigma point
+    check_additive_vectorized(lambda X: X.dot(A.T), lambda X: X.dot(C[0]))
+
+
+def check_additive_vectorized(f, g):
+    '''Check that propagating all sigma points at once changes nothing'''
+    expected = build_unscented_filter(AdditiveUnscentedKalmanFilter)
+    actual = AdditiveUnscentedKalmanFilter(
+        f, g,
+        expected.transition_covariance, expected.observation_covariance,
+        expected.initial_state_mean, expected.initial_state_covariance,
+        random_state=0, vectorized=True
+    )
+    Z = ma.array([0, 1, 2, 3], mask=[True, False, False, False])
+
+    for method in ['filter', 'smooth']:
+        (mu_expected, sigma_expected) = getattr(expected, method)(Z)
+        (mu_actual, sigma_actual) = getattr(actual, method)(Z)
+        assert_array_almost_equal(mu_actual, mu_expected)
+        assert_array_almost_equal(sigma_actual, sigma_expected)
+
+    (mu_expected, sigma_expected) = (
+        expected.filter_update(mu_expected[0], sigma_expected[0], Z[1])
+    )
+    (mu_actual, sigma_actual) = (
+        actual.filter_update(mu_actual[0], sigma_actual[0], Z[1])
+    )
+    assert_array_almost_equal(mu_actual, mu_expected)
+    assert_array_almost_equal(sigma_actual, sigma_expected)
+
+
 def test_cholupdate():
     M = np.array([[1, 0.2], [0.2, 0.8]])
     x = np.array([[0.3, 0.5], [0.01, 0.09]])
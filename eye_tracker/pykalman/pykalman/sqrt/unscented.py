@@ -25,7 +25,7 @@ from ..utils import array1d, array2d, check_random_state
 
 from ..standard import _last_dims, _arg_or_default
 from ..unscented import AdditiveUnscentedKalmanFilter as AUKF, \
-    SigmaPoints, Moments
+    SigmaPoints, Moments, _cholesky, _propagate, _sigma_weights
 
 
 def _reconstruct_covariances(covariance2s):
@@ -181,9 +181,7 @@ def moments2points(moments, alpha=None, beta=None, kappa=None):
     # just because I saw it in the MATLAB implementation
     sigma2 = sigma2.T
 
-    # Calculate scaling factor for all off-center points
-    lamda = (alpha * alpha) * (n_dim + kappa) - n_dim
-    c = n_dim + lamda
+    (weights_mean, weights_cov, c) = _sigma_weights(n_dim, alpha, beta, kappa)
 
     # calculate the sigma points; that is,
     #   mu
@@ -194,17 +192,11 @@ def moments2points(moments, alpha=None, beta=None, kappa=None):
     points[:, 1:(n_dim + 1)] += sigma2 * np.sqrt(c)
     points[:, (n_dim + 1):] -= sigma2 * np.sqrt(c)
 
-    # Calculate weights
-    weights_mean = np.ones(2 * n_dim + 1)
-    weights_mean[0] = lamda / c
-    weights_mean[1:] = 0.5 / c
-    weights_cov = np.copy(weights_mean)
-    weights_cov[0] = lamda / c + (1 - alpha * alpha + beta)
-
     return SigmaPoints(points.T, weights_mean, weights_cov)
 
 
-def _unscented_transform(points, f=None, points_noise=None, sigma2_noise=None):
+def _unscented_transform(points, f=None, points_noise=None, sigma2_noise=None,
+                         vectorized=False):
     '''Apply the Unscented Transform.
 
     Parameters
@@ -217,6 +209,9 @@ def _unscented_transform(points, f=None, points_noise=None, sigma2_noise=None):
         points representing noise to pass through `f`, if any.
     sigma2_noise : [n_dim_2, n_dim_2] array
         square root of covariance matrix for additive noise
+    vectorized : bool
+        if True, f takes all points (and noise points) at once and returns the
+        transformed points, one per row
 
     Returns
     =======
@@ -227,20 +222,13 @@ def _unscented_transform(points, f=None, points_noise=None, sigma2_noise=None):
     sigma2_pred : [n_dim_2, n_dim_2] array
         R s.t. R' R = empirical covariance
     '''
-    n_points, n_dim_state = points.points.shape
     (points, weights_mean, weights_covariance) = points
 
-    # propagate points through f.  Each column is a sample point
+    # propagate points through f, making each row a predicted point
     if f is not None:
-        if points_noise is None:
-            points_pred = [f(points[i]) for i in range(n_points)]
-        else:
-            points_pred = [f(points[i], points_noise[i]) for i in range(n_points)]
+        points_pred = _propagate(f, points, points_noise, vectorized)
     else:
-        points_pred = points
-
-    # make each row a predicted point
-    points_pred = np.vstack(points_pred)
+        points_pred = np.vstack(points)
     points_pred = SigmaPoints(points_pred, weights_mean, weights_covariance)
 
     # calculate approximate mean, covariance
@@ -310,7 +298,7 @@ def _unscented_correct(cross_sigma, moments_pred, obs_moments_pred, z):
 
 def unscented_filter_predict(transition_function, points_state,
                              points_transition=None,
-                             sigma2_transition=None):
+                             sigma2_transition=None, vectorized=False):
     """Predict next state distribution
 
     Using the sigma points representing the state at time t given observations
@@ -330,6 +318,8 @@ def unscented_filter_predict(transition_function, points_state,
     sigma_transition : [n_dim_state, n_dim_state] array
         covariance corresponding to additive noise in transitioning from time
         step t to t+1, if available. If not, assumes noise is not additive.
+    vectorized : bool
+        whether `transition_function` transforms all sigma points in one call
 
     Returns
     -------
@@ -346,7 +336,8 @@ def unscented_filter_predict(transition_function, points_state,
     (points_pred, moments_pred) = (
         _unscented_transform(
             points_state, transition_function,
-            points_noise=points_transition, sigma2_noise=sigma2_transition
+            points_noise=points_transition, sigma2_noise=sigma2_transition,
+            vectorized=vectorized
         )
     )
     return (points_pred, moments_pred)
@@ -355,7 +346,7 @@ def unscented_filter_predict(transition_function, points_state,
 def unscented_filter_correct(observation_function, moments_pred,
                              points_pred, observation,
                              points_observation=None,
-                             sigma2_observation=None):
+                             sigma2_observation=None, vectorized=False):
     """Integrate new observation to correct state estimates
 
     Parameters
@@ -376,6 +367,8 @@ def unscented_filter_correct(observation_function, moments_pred,
     sigma_observation : [n_dim_obs, n_dim_obs] array
         covariance matrix corresponding to additive noise in observation at
         time t+1, if available. If missing, noise is assumed to be non-linear.
+    vectorized : bool
+        whether `observation_function` transforms all sigma points in one call
 
     Returns
     -------
@@ -387,7 +380,8 @@ def unscented_filter_correct(observation_function, moments_pred,
     (obs_points_pred, obs_moments_pred) = (
         _unscented_transform(
             points_pred, observation_function,
-            points_noise=points_observation, sigma2_noise=sigma2_observation
+            points_noise=points_observation, sigma2_noise=sigma2_observation,
+            vectorized=vectorized
         )
     )
 
@@ -403,7 +397,7 @@ def unscented_filter_correct(observation_function, moments_pred,
     return moments_filt
 
 
-def _additive_unscented_filter(mu_0, sigma_0, f, g, Q, R, Z):
+def _additive_unscented_filter(mu_0, sigma_0, f, g, Q, R, Z, vectorized=False):
     '''Apply the Unscented Kalman Filter with additive noise
 
     Parameters
@@ -423,6 +417,8 @@ def _additive_unscented_filter(mu_0, sigma_0, f, g, Q, R, Z):
     R : [n_dim_state, n_dim_state] array
         observation covariance matrix
 
+    vectorized : bool
+        whether `f` and `g` transform all sigma points in one call
     Returns
     -------
     mu_filt : [T, n_dim_state] array
@@ -460,7 +456,8 @@ def _additive_unscented_filter(mu_0, sigma_0, f, g, Q, R, Z):
             transition_function = _last_dims(f, t - 1, ndims=1)[0]
             (_, moments_pred) = (
                 unscented_filter_predict(
-                    transition_function, points_state, sigma2_transition=Q2
+                    transition_function, points_state, sigma2_transition=Q2,
+                    vectorized=vectorized
                 )
             )
             points_pred = moments2points(moments_pred)
@@ -469,13 +466,13 @@ def _additive_unscented_filter(mu_0, sigma_0, f, g, Q, R, Z):
         observation_function = _last_dims(g, t, ndims=1)[0]
         mu_filt[t], sigma2_filt[t] = unscented_filter_correct(
             observation_function, moments_pred, points_pred,
-            Z[t], sigma2_observation=R2
+            Z[t], sigma2_observation=R2, vectorized=vectorized
         )
 
     return (mu_filt, sigma2_filt)
 
 
-def _additive_unscented_smoother(mu_filt, sigma2_filt, f, Q):
+def _additive_unscented_smoother(mu_filt, sigma2_filt, f, Q, vectorized=False):
     '''Apply the Unscented Kalman Filter assuming additiven noise
 
     Parameters
@@ -492,6 +489,8 @@ def _additive_unscented_smoother(mu_filt, sigma2_filt, f, Q):
     Q : [n_dim_state, n_dim_state] array
         transition covariance matrix
 
+    vectorized : bool
+        whether `f` transforms all sigma points in one call
     Returns
     -------
     mu_smooth : [T, n_dim_state] array
@@ -521,7 +520,8 @@ def _additive_unscented_smoother(mu_filt, sigma2_filt, f, Q):
         # compute E[x_{t+1} | z_{0:t}], Var(x_{t+1} | z_{0:t})
         transition_function = _last_dims(f, t, ndims=1)[0]
         (points_pred, moments_pred) = (
-            _unscented_transform(points_state, transition_function, sigma2_noise=Q2)
+            _unscented_transform(points_state, transition_function,
+                                 sigma2_noise=Q2, vectorized=vectorized)
         )
 
         # Calculate Cov(x_{t+1}, x_t | z_{0:t-1})
@@ -635,7 +635,7 @@ class AdditiveUnscentedKalmanFilter(AUKF):
                 initial_state_mean, initial_state_covariance,
                 transition_functions, observation_functions,
                 transition_covariance, observation_covariance,
-                Z
+                Z, vectorized=self.vectorized
             )
         )
 
@@ -731,8 +731,12 @@ class AdditiveUnscentedKalmanFilter(AUKF):
 
         # preprocess covariance matrices
         filtered_state_covariance2 = linalg.cholesky(filtered_state_covariance)
-        transition_covariance2 = linalg.cholesky(transition_covariance)
-        observation_covariance2 = linalg.cholesky(observation_covariance)
+        transition_covariance2 = _cholesky(
+            transition_covariance, self._cholesky_cache
+        )
+        observation_covariance2 = _cholesky(
+            observation_covariance, self._cholesky_cache
+        )
 
         # make sigma points
         moments_state = Moments(filtered_state_mean, filtered_state_covariance2)
@@ -742,7 +746,8 @@ class AdditiveUnscentedKalmanFilter(AUKF):
         (_, moments_pred) = (
             unscented_filter_predict(
                 transition_function, points_state,
-                sigma2_transition=transition_covariance2
+                sigma2_transition=transition_covariance2,
+                vectorized=self.vectorized
             )
         )
         points_pred = moments2points(moments_pred)
@@ -751,7 +756,8 @@ class AdditiveUnscentedKalmanFilter(AUKF):
         (next_filtered_state_mean, next_filtered_state_covariance2) = (
             unscented_filter_correct(
                 observation_function, moments_pred, points_pred,
-                observation, sigma2_observation=observation_covariance2
+                observation, sigma2_observation=observation_covariance2,
+                vectorized=self.vectorized
             )
         )
 
@@ -796,13 +802,14 @@ class AdditiveUnscentedKalmanFilter(AUKF):
                 initial_state_mean, initial_state_covariance,
                 transition_functions, observation_functions,
                 transition_covariance, observation_covariance,
-                Z
+                Z, vectorized=self.vectorized
             )
         )
         (smoothed_state_means, sigma2_smooth) = (
             _additive_unscented_smoother(
                 filtered_state_means, sigma2_filt,
-                transition_functions, transition_covariance
+                transition_functions, transition_covariance,
+                vectorized=self.vectorized
             )
         )
 
@@ -6,13 +6,17 @@ Inference for Linear-Gaussian Systems
 This module implements the Kalman Filter, Kalman Smoother, and
 EM Algorithm for Linear-Gaussian state space models
 """
+import time
 import warnings
 
 import numpy as np
 from scipy import linalg
 
+from . import backend as compiled
+from .backend import get_backend
 from .utils import array1d, array2d, check_random_state, \
-    get_params, log_multivariate_normal_density, preprocess_arguments
+    get_params, log_multivariate_normal_density, \
+    batch_log_multivariate_normal_density, preprocess_arguments
 
 # Dimensionality of each Kalman Filter parameter for a single time step
 DIM = {
@@ -40,6 +44,14 @@ def _arg_or_default(arg, default, dim, name):
     return result
 
 
+def _check_method(method):
+    if method not in ('sequential', 'scan'):
+        raise ValueError(
+            "method must be one of 'sequential' or 'scan', not {0}"
+            .format(method)
+        )
+
+
 def _determine_dimensionality(variables, default):
     """Derive the dimensionality of the state space
 
@@ -141,34 +153,37 @@ def _loglikelihoods(observation_matrices, observation_offsets,
     """
     n_timesteps = observations.shape[0]
     loglikelihoods = np.zeros(n_timesteps)
-    for t in range(n_timesteps):
-        observation = observations[t]
-        if not np.any(np.ma.getmask(observation)):
-            observation_matrix = _last_dims(observation_matrices, t)
-            observation_offset = _last_dims(observation_offsets, t, ndims=1)
-            predicted_state_mean = _last_dims(
-                predicted_state_means, t, ndims=1
-            )
-            predicted_state_covariance = _last_dims(
-                predicted_state_covariances, t
-            )
 
-            predicted_observation_mean = (
-                np.dot(observation_matrix,
-                       predicted_state_mean)
-                + observation_offset
-            )
-            predicted_observation_covariance = (
-                np.dot(observation_matrix,
-                       np.dot(predicted_state_covariance,
-                              observation_matrix.T))
-                + observation_covariance
-            )
-            loglikelihoods[t] = log_multivariate_normal_density(
-                observation[np.newaxis, :],
-                predicted_observation_mean[np.newaxis, :],
-                predicted_observation_covariance[np.newaxis, :, :]
-            )
+    # evaluate every observed time step in a single batched call
+    observed = np.logical_not(
+        np.any(np.ma.getmaskarray(observations), axis=1)
+    )
+    if np.any(observed):
+        observation_matrices = np.asarray(observation_matrices)
+        observation_offsets = np.asarray(observation_offsets)
+        if observation_matrices.ndim == 3:
+            observation_matrices = observation_matrices[observed]
+        if observation_offsets.ndim == 2:
+            observation_offsets = observation_offsets[observed]
+        predicted_state_means = predicted_state_means[observed]
+        predicted_state_covariances = predicted_state_covariances[observed]
+
+        predicted_observation_means = (
+            np.einsum('...ij,...j->...i', observation_matrices,
+                      predicted_state_means)
+            + observation_offsets
+        )
+        predicted_observation_covariances = (
+            np.matmul(observation_matrices,
+                      np.matmul(predicted_state_covariances,
+                                np.swapaxes(observation_matrices, -1, -2)))
+            + observation_covariance
+        )
+        loglikelihoods[observed] = batch_log_multivariate_normal_density(
+            np.ma.getdata(observations)[observed],
+            predicted_observation_means,
+            predicted_observation_covariances
+        )
     return loglikelihoods
 
 
@@ -254,34 +269,86 @@ def _filter_correct(observation_matrix, observation_covariance,
         covariance of state at time t given observations from times
         [0...t]
     """
+    return _filter_correct_loglikelihood(
+        observation_matrix, observation_covariance, observation_offset,
+        predicted_state_mean, predicted_state_covariance, observation,
+        compute_loglikelihood=False
+    )[:3]
+
+
+def _filter_correct_loglikelihood(observation_matrix, observation_covariance,
+                                  observation_offset, predicted_state_mean,
+                                  predicted_state_covariance, observation,
+                                  compute_loglikelihood=True):
+    r"""Correct a predicted state and score the observation that caused it
+
+    Same as :func:`_filter_correct`, but also returns the log likelihood of
+    `observation` given observations from times [0...t-1].  The innovation
+    covariance is factored once with a Cholesky decomposition, and that
+    factorization is shared by the Kalman gain and the log likelihood.  If the
+    innovation covariance is not symmetric positive definite, the Kalman gain
+    falls back on its pseudo-inverse.
+
+    Parameters
+    ----------
+    observation_matrix, observation_covariance, observation_offset, \
+    predicted_state_mean, predicted_state_covariance, observation
+        see :func:`_filter_correct`
+    compute_loglikelihood : bool, optional
+        if False, the log likelihood is not computed and the Kalman gain is
+        solved with an LU decomposition of the innovation covariance, which
+        needs neither symmetry nor positive definiteness.  It falls back on
+        the pseudo-inverse if the innovation covariance is singular.
+
+    Returns
+    -------
+    kalman_gain, corrected_state_mean, corrected_state_covariance
+        see :func:`_filter_correct`
+    loglikelihood : float or None
+        log probability density of `observation` given observations from
+        times [0...t-1], 0 if `observation` is missing, or None if
+        `compute_loglikelihood` is False
+    """
     if not np.any(np.ma.getmask(observation)):
-        predicted_observation_mean = (
-            np.dot(observation_matrix,
-                   predicted_state_mean)
-            + observation_offset
+        innovation = (
+            np.asarray(observation)
+            - np.dot(observation_matrix, predicted_state_mean)
+            - observation_offset
         )
+        state_observation_covariance = np.dot(predicted_state_covariance,
+                                              observation_matrix.T)
         predicted_observation_covariance = (
-            np.dot(observation_matrix,
-                   np.dot(predicted_state_covariance,
-                          observation_matrix.T))
+            np.dot(observation_matrix, state_observation_covariance)
             + observation_covariance
         )
 
-        kalman_gain = (
-            np.dot(predicted_state_covariance,
-                   np.dot(observation_matrix.T,
-                          linalg.pinv(predicted_observation_covariance)))
-        )
+        if compute_loglikelihood:
+            kalman_gain, loglikelihood = _gain_loglikelihood(
+                state_observation_covariance,
+                predicted_observation_covariance, innovation
+            )
+        else:
+            loglikelihood = None
+            # K S = P H'  <=>  S' K' = H P'
+            try:
+                kalman_gain = linalg.solve(
+                    predicted_observation_covariance.T,
+                    state_observation_covariance.T
+                ).T
+            except linalg.LinAlgError:
+                kalman_gain = np.dot(
+                    state_observation_covariance,
+                    linalg.pinv(predicted_observation_covariance)
+                )
 
         corrected_state_mean = (
             predicted_state_mean
-            + np.dot(kalman_gain, observation - predicted_observation_mean)
+            + np.dot(kalman_gain, innovation)
         )
         corrected_state_covariance = (
             predicted_state_covariance
             - np.dot(kalman_gain,
-                     np.dot(observation_matrix,
-                            predicted_state_covariance))
+                     np.dot(observation_matrix, predicted_state_covariance))
         )
     else:
         n_dim_state = predicted_state_covariance.shape[0]
@@ -290,14 +357,71 @@ def _filter_correct(observation_matrix, observation_covariance,
 
         corrected_state_mean = predicted_state_mean
         corrected_state_covariance = predicted_state_covariance
+        loglikelihood = 0.0 if compute_loglikelihood else None
 
     return (kalman_gain, corrected_state_mean,
-            corrected_state_covariance)
+            corrected_state_covariance, loglikelihood)
+
+
+def _gain_loglikelihood(state_observation_covariance,
+                        predicted_observation_covariance, innovation):
+    """Kalman gain and log likelihood from one Cholesky factorization
+
+    Parameters
+    ----------
+    state_observation_covariance : [n_dim_state, n_dim_obs] array
+        predicted state covariance times the transposed observation matrix
+    predicted_observation_covariance : [n_dim_obs, n_dim_obs] array
+        covariance of the innovation
+    innovation : [n_dim_obs] array
+        observation minus its predicted mean
+
+    Returns
+    -------
+    kalman_gain : [n_dim_state, n_dim_obs] array
+        Kalman gain matrix
+    loglikelihood : float
+        log probability density of the innovation
+    """
+    n_dim_obs = len(innovation)
+    try:
+        factor = linalg.cho_factor(predicted_observation_covariance,
+                                   lower=True)
+    except linalg.LinAlgError:
+        factor = None
+
+    if factor is not None:
+        log_det = 2 * np.sum(np.log(np.diagonal(factor[0])))
+        loglikelihood = -0.5 * (
+            np.dot(innovation, linalg.cho_solve(factor, innovation))
+            + n_dim_obs * np.log(2 * np.pi) + log_det
+        )
+    else:
+        loglikelihood = log_multivariate_normal_density(
+            innovation[np.newaxis, :],
+            np.zeros((1, n_dim_obs)),
+            predicted_observation_covariance[np.newaxis, :, :]
+        )[0, 0]
+
+    # the factor only reflects the lower triangle, so covariances which
+    # EM has left asymmetric are inverted in full instead
+    if factor is not None and np.allclose(
+            predicted_observation_covariance,
+            predicted_observation_covariance.T, rtol=1e-10, atol=0):
+        kalman_gain = linalg.cho_solve(
+            factor, state_observation_covariance.T
+        ).T
+    else:
+        kalman_gain = np.dot(state_observation_covariance,
+                             linalg.pinv(predicted_observation_covariance))
+
+    return kalman_gain, loglikelihood
 
 
 def _filter(transition_matrices, observation_matrices, transition_covariance,
             observation_covariance, transition_offsets, observation_offsets,
-            initial_state_mean, initial_state_covariance, observations):
+            initial_state_mean, initial_state_covariance, observations,
+            backend=None):
     """Apply the Kalman Filter
 
     Calculate posterior distribution over hidden states given observations up
@@ -330,6 +454,9 @@ def _filter(transition_matrices, observation_matrices, transition_covariance,
         observations from times [0...n_timesteps-1].  If `observations` is a
         masked array and any of `observations[t]` is masked, then
         `observations[t]` will be treated as a missing observation.
+    backend : string, optional
+        backend to run the recursion with, as accepted by
+        :func:`pykalman.backend.get_backend`
 
     Returns
     -------
@@ -348,6 +475,13 @@ def _filter(transition_matrices, observation_matrices, transition_covariance,
         `filtered_state_covariances[t]` = covariance of hidden state at time t
         given observations from times [0...t]
     """
+    if get_backend(backend) == 'numba':
+        return compiled.filter(
+            transition_matrices, observation_matrices, transition_covariance,
+            observation_covariance, transition_offsets, observation_offsets,
+            initial_state_mean, initial_state_covariance, observations
+        )
+
     n_timesteps = observations.shape[0]
     n_dim_state = len(initial_state_mean)
     n_dim_obs = observations.shape[1]
@@ -362,36 +496,215 @@ def _filter(transition_matrices, observation_matrices, transition_covariance,
         (n_timesteps, n_dim_state, n_dim_state)
     )
 
+    for (t, state) in enumerate(
+            _filter_iter(
+                transition_matrices, observation_matrices,
+                transition_covariance, observation_covariance,
+                transition_offsets, observation_offsets,
+                initial_state_mean, initial_state_covariance, observations,
+                compute_loglikelihood=False
+            )):
+        (predicted_state_means[t], predicted_state_covariances[t],
+         kalman_gains[t], filtered_state_means[t],
+         filtered_state_covariances[t], _) = state
+
+    return (predicted_state_means, predicted_state_covariances,
+            kalman_gains, filtered_state_means,
+            filtered_state_covariances)
+
+
+def _filter_iter(transition_matrices, observation_matrices,
+                 transition_covariance, observation_covariance,
+                 transition_offsets, observation_offsets,
+                 initial_state_mean, initial_state_covariance, observations,
+                 compute_loglikelihood=True):
+    """Apply the Kalman Filter one time step at a time
+
+    This is the filter recursion behind :func:`_filter`, which stores what it
+    yields.  The results for each time step are yielded as soon as they are
+    available and only the most recent state is retained.
+
+    Parameters
+    ----------
+    transition_matrices, observation_matrices, transition_covariance, \
+    observation_covariance, transition_offsets, observation_offsets, \
+    initial_state_mean, initial_state_covariance, observations
+        see :func:`_filter`
+    compute_loglikelihood : bool, optional
+        if False, the log likelihoods are not computed and None is yielded
+        in their place
+
+    Yields
+    ------
+    predicted_state_mean : [n_dim_state] array
+        mean of hidden state at time t given observations from times
+        [0...t-1]
+    predicted_state_covariance : [n_dim_state, n_dim_state] array
+        covariance of hidden state at time t given observations from times
+        [0...t-1]
+    kalman_gain : [n_dim_state, n_dim_obs] array
+        Kalman gain matrix for time t
+    filtered_state_mean : [n_dim_state] array
+        mean of hidden state at time t given observations from times [0...t]
+    filtered_state_covariance : [n_dim_state, n_dim_state] array
+        covariance of hidden state at time t given observations from times
+        [0...t]
+    loglikelihood : float or None
+        log probability density of the observation at time t given
+        observations from times [0...t-1], 0 if it is missing, or None if
+        `compute_loglikelihood` is False
+    """
+    n_timesteps = observations.shape[0]
+
     for t in range(n_timesteps):
         if t == 0:
-            predicted_state_means[t] = initial_state_mean
-            predicted_state_covariances[t] = initial_state_covariance
+            predicted_state_mean = initial_state_mean
+            predicted_state_covariance = initial_state_covariance
         else:
             transition_matrix = _last_dims(transition_matrices, t - 1)
-            transition_covariance = _last_dims(transition_covariance, t - 1)
+            transition_covariance_t = _last_dims(transition_covariance, t - 1)
             transition_offset = _last_dims(transition_offsets, t - 1, ndims=1)
-            predicted_state_means[t], predicted_state_covariances[t] = (
+            predicted_state_mean, predicted_state_covariance = (
                 _filter_predict(
                     transition_matrix,
-                    transition_covariance,
+                    transition_covariance_t,
                     transition_offset,
-                    filtered_state_means[t - 1],
-                    filtered_state_covariances[t - 1]
+                    filtered_state_mean,
+                    filtered_state_covariance
                 )
             )
 
         observation_matrix = _last_dims(observation_matrices, t)
-        observation_covariance = _last_dims(observation_covariance, t)
+        observation_covariance_t = _last_dims(observation_covariance, t)
         observation_offset = _last_dims(observation_offsets, t, ndims=1)
-        (kalman_gains[t], filtered_state_means[t],
-         filtered_state_covariances[t]) = (
-            _filter_correct(observation_matrix,
-                observation_covariance,
+        (kalman_gain, filtered_state_mean, filtered_state_covariance,
+         loglikelihood) = (
+            _filter_correct_loglikelihood(observation_matrix,
+                observation_covariance_t,
                 observation_offset,
-                predicted_state_means[t],
-                predicted_state_covariances[t],
-                observations[t]
+                predicted_state_mean,
+                predicted_state_covariance,
+                observations[t],
+                compute_loglikelihood=compute_loglikelihood
+            )
+        )
+
+        yield (predicted_state_mean, predicted_state_covariance,
+               kalman_gain, filtered_state_mean, filtered_state_covariance,
+               loglikelihood)
+
+
+def _filter_batch(transition_matrices, observation_matrices,
+                  transition_covariance, observation_covariance,
+                  transition_offsets, observation_offsets,
+                  initial_state_mean, initial_state_covariance, observations):
+    """Apply the Kalman Filter to many independent sequences at once
+
+    Same as :func:`_filter`, but every time step is applied to all sequences
+    with batched matrix products instead of one sequence at a time.  All
+    sequences share the same model parameters.
+
+    Parameters
+    ----------
+    transition_matrices, observation_matrices, transition_covariance, \
+    observation_covariance, transition_offsets, observation_offsets, \
+    initial_state_mean, initial_state_covariance
+        see :func:`_filter`
+    observations : [n_sequences, n_timesteps, n_dim_obs] array
+        observations from times [0...n_timesteps-1] for each sequence.  If
+        `observations` is a masked array and any of `observations[i, t]` is
+        masked, then `observations[i, t]` will be treated as a missing
+        observation.
+
+    Returns
+    -------
+    predicted_state_means : [n_sequences, n_timesteps, n_dim_state] array
+        `predicted_state_means[i, t]` = mean of hidden state at time t given
+        observations from times [0...t-1] of sequence i
+    predicted_state_covariances : [n_sequences, n_timesteps, n_dim_state, \
+    n_dim_state] array
+        `predicted_state_covariances[i, t]` = covariance of hidden state at
+        time t given observations from times [0...t-1] of sequence i
+    kalman_gains : [n_sequences, n_timesteps, n_dim_state, n_dim_obs] array
+        `kalman_gains[i, t]` = Kalman gain matrix for time t of sequence i
+    filtered_state_means : [n_sequences, n_timesteps, n_dim_state] array
+        `filtered_state_means[i, t]` = mean of hidden state at time t given
+        observations from times [0...t] of sequence i
+    filtered_state_covariances : [n_sequences, n_timesteps, n_dim_state, \
+    n_dim_state] array
+        `filtered_state_covariances[i, t]` = covariance of hidden state at
+        time t given observations from times [0...t] of sequence i
+    """
+    n_sequences, n_timesteps, n_dim_obs = observations.shape
+    n_dim_state = len(initial_state_mean)
+
+    predicted_state_means = np.zeros((n_sequences, n_timesteps, n_dim_state))
+    predicted_state_covariances = np.zeros(
+        (n_sequences, n_timesteps, n_dim_state, n_dim_state)
+    )
+    kalman_gains = np.zeros((n_sequences, n_timesteps, n_dim_state, n_dim_obs))
+    filtered_state_means = np.zeros((n_sequences, n_timesteps, n_dim_state))
+    filtered_state_covariances = np.zeros(
+        (n_sequences, n_timesteps, n_dim_state, n_dim_state)
+    )
+
+    # a time step is missing if any of its components is masked
+    missing = np.any(np.ma.getmaskarray(observations), axis=2)
+    values = np.ma.filled(observations, 0.0)
+
+    for t in range(n_timesteps):
+        if t == 0:
+            predicted_state_means[:, t] = initial_state_mean
+            predicted_state_covariances[:, t] = initial_state_covariance
+        else:
+            transition_matrix = _last_dims(transition_matrices, t - 1)
+            transition_covariance_t = _last_dims(transition_covariance, t - 1)
+            transition_offset = _last_dims(transition_offsets, t - 1, ndims=1)
+            predicted_state_means[:, t] = (
+                np.einsum('ij,sj->si', transition_matrix,
+                          filtered_state_means[:, t - 1])
+                + transition_offset
+            )
+            predicted_state_covariances[:, t] = (
+                np.matmul(np.matmul(transition_matrix,
+                                    filtered_state_covariances[:, t - 1]),
+                          transition_matrix.T)
+                + transition_covariance_t
             )
+
+        observation_matrix = _last_dims(observation_matrices, t)
+        observation_covariance_t = _last_dims(observation_covariance, t)
+        observation_offset = _last_dims(observation_offsets, t, ndims=1)
+        predicted_state_mean = predicted_state_means[:, t]
+        predicted_state_covariance = predicted_state_covariances[:, t]
+
+        predicted_observation_mean = (
+            np.einsum('ij,sj->si', observation_matrix, predicted_state_mean)
+            + observation_offset
+        )
+        predicted_observation_covariance = (
+            np.matmul(np.matmul(observation_matrix,
+                                predicted_state_covariance),
+                      observation_matrix.T)
+            + observation_covariance_t
+        )
+        kalman_gain = np.matmul(
+            np.matmul(predicted_state_covariance, observation_matrix.T),
+            np.linalg.pinv(predicted_observation_covariance)
+        )
+        kalman_gain[missing[:, t]] = 0
+        kalman_gains[:, t] = kalman_gain
+
+        filtered_state_means[:, t] = (
+            predicted_state_mean
+            + np.einsum('sij,sj->si', kalman_gain,
+                        values[:, t] - predicted_observation_mean)
+        )
+        filtered_state_covariances[:, t] = (
+            predicted_state_covariance
+            - np.matmul(kalman_gain,
+                        np.matmul(observation_matrix,
+                                  predicted_state_covariance))
         )
 
     return (predicted_state_means, predicted_state_covariances,
@@ -399,6 +712,89 @@ def _filter(transition_matrices, observation_matrices, transition_covariance,
             filtered_state_covariances)
 
 
+def _steady_state(transition_matrix, observation_matrix,
+                  transition_covariance, observation_covariance,
+                  initial_state_covariance, n_iter=1000, tol=1e-10):
+    r"""Calculate the steady-state Kalman gain of a time-invariant model
+
+    Solve the discrete algebraic Riccati equation
+
+    .. math::
+
+        P = A (P - P C^T (C P C^T + R)^{-1} C P) A^T + Q
+
+    for the limiting predicted state covariance :math:`P`.  If the direct
+    solver fails (e.g. the model is not stabilizable), the Riccati recursion
+    is instead iterated from `initial_state_covariance` until it converges.
+
+    Parameters
+    ----------
+    transition_matrix : [n_dim_state, n_dim_state] array
+        state transition matrix
+    observation_matrix : [n_dim_obs, n_dim_state] array
+        observation matrix
+    transition_covariance : [n_dim_state, n_dim_state] array
+        covariance matrix for state transitions
+    observation_covariance : [n_dim_obs, n_dim_obs] array
+        covariance matrix for observations
+    initial_state_covariance : [n_dim_state, n_dim_state] array
+        starting point for the fallback Riccati recursion
+    n_iter : int, optional
+        maximum number of iterations of the fallback Riccati recursion
+    tol : float, optional
+        convergence tolerance of the fallback Riccati recursion
+
+    Returns
+    -------
+    kalman_gain : [n_dim_state, n_dim_obs] array
+        steady-state Kalman gain
+    predicted_state_covariance : [n_dim_state, n_dim_state] array
+        steady-state covariance of state at time t given observations from
+        times [0...t-1]
+    filtered_state_covariance : [n_dim_state, n_dim_state] array
+        steady-state covariance of state at time t given observations from
+        times [0...t]
+    """
+    try:
+        predicted_state_covariance = linalg.solve_discrete_are(
+            transition_matrix.T, observation_matrix.T,
+            transition_covariance, observation_covariance
+        )
+    except (linalg.LinAlgError, ValueError):
+        predicted_state_covariance = initial_state_covariance
+        for i in range(n_iter):
+            (_, _, filtered_state_covariance) = _filter_correct(
+                observation_matrix, observation_covariance,
+                np.zeros(observation_matrix.shape[0]),
+                np.zeros(transition_matrix.shape[0]),
+                predicted_state_covariance,
+                np.zeros(observation_matrix.shape[0])
+            )
+            next_predicted_state_covariance = (
+                np.dot(transition_matrix,
+                       np.dot(filtered_state_covariance,
+                              transition_matrix.T))
+                + transition_covariance
+            )
+            converged = np.allclose(
+                next_predicted_state_covariance, predicted_state_covariance,
+                rtol=0, atol=tol
+            )
+            predicted_state_covariance = next_predicted_state_covariance
+            if converged:
+                break
+
+    (kalman_gain, _, filtered_state_covariance) = _filter_correct(
+        observation_matrix, observation_covariance,
+        np.zeros(observation_matrix.shape[0]),
+        np.zeros(transition_matrix.shape[0]),
+        predicted_state_covariance,
+        np.zeros(observation_matrix.shape[0])
+    )
+    return (kalman_gain, predicted_state_covariance,
+            filtered_state_covariance)
+
+
 def _smooth_update(transition_matrix, filtered_state_mean,
                    filtered_state_covariance, predicted_state_mean,
                    predicted_state_covariance, next_smoothed_state_mean,
@@ -469,7 +865,7 @@ def _smooth_update(transition_matrix, filtered_state_mean,
 
 def _smooth(transition_matrices, filtered_state_means,
             filtered_state_covariances, predicted_state_means,
-            predicted_state_covariances):
+            predicted_state_covariances, backend=None):
     """Apply the Kalman Smoother
 
     Estimate the hidden state at time for each time step given all
@@ -492,6 +888,9 @@ def _smooth(transition_matrices, filtered_state_means,
     predicted_state_covariances : [n_timesteps, n_dim_state, n_dim_state] array
         `predicted_state_covariances[t]` = covariance of state estimate for
         time t given observations from times [0...t-1]
+    backend : string, optional
+        backend to run the recursion with, as accepted by
+        :func:`pykalman.backend.get_backend`
 
     Returns
     -------
@@ -504,6 +903,13 @@ def _smooth(transition_matrices, filtered_state_means,
     kalman_smoothing_gains : [n_timesteps-1, n_dim_state, n_dim_state] array
         Kalman Smoothing correction matrices for times [0...n_timesteps-2]
     """
+    if get_backend(backend) == 'numba':
+        return compiled.smooth(
+            transition_matrices, filtered_state_means,
+            filtered_state_covariances, predicted_state_means,
+            predicted_state_covariances
+        )
+
     n_timesteps, n_dim_state = filtered_state_means.shape
 
     smoothed_state_means = np.zeros((n_timesteps, n_dim_state))
@@ -533,6 +939,303 @@ def _smooth(transition_matrices, filtered_state_means,
             kalman_smoothing_gains)
 
 
+def _stack_dims(X, n_timesteps, ndims=2):
+    """Stack the final dimensions of `X` for `n_timesteps` time steps
+
+    Vectorized counterpart of :func:`_last_dims`.
+
+    Parameters
+    ----------
+    X : array with at least dimension `ndims`
+    n_timesteps : int
+        number of time steps to stack
+    ndims : int, optional
+        number of dimensions in the array desired per time step
+
+    Returns
+    -------
+    Y : array with dimension `ndims` + 1
+        `Y[t]` = `_last_dims(X, t, ndims)` for t in [0...n_timesteps-1]
+    """
+    X = np.asarray(X)
+    if len(X.shape) == ndims + 1:
+        return X[:n_timesteps]
+    elif len(X.shape) == ndims:
+        return np.broadcast_to(X, (n_timesteps,) + X.shape)
+    else:
+        raise ValueError(("X only has %d dimensions when %d" +
+                " or more are required") % (len(X.shape), ndims))
+
+
+def _transpose(X):
+    """Transpose the final two dimensions of a stack of matrices"""
+    return np.swapaxes(X, -1, -2)
+
+
+def _associative_scan(operator, elems, reverse=False):
+    """Compute all prefix "sums" of `elems` under an associative `operator`
+
+    The scan recurses on pairwise combinations of neighbouring elements, so
+    only :math:`O(\\log T)` calls to `operator` are made, each of which
+    operates on a whole stack of elements at once.
+
+    Parameters
+    ----------
+    operator : function
+        associative binary operator taking two tuples of arrays, each stacked
+        along their first axis, and returning their combination
+    elems : tuple of arrays
+        elements to scan over, stacked along their first axis
+    reverse : bool, optional
+        if True, compute suffix instead of prefix combinations, i.e. result
+        `t` combines elements [t...T-1] instead of [0...t]
+
+    Returns
+    -------
+    result : tuple of arrays
+        `result[t]` = `elems[0] op elems[1] op ... op elems[t]`
+    """
+    if reverse:
+        flipped = tuple(e[::-1] for e in elems)
+        result = _associative_scan(
+            lambda later, earlier: operator(earlier, later), flipped
+        )
+        return tuple(r[::-1] for r in result)
+
+    n_elems = elems[0].shape[0]
+    if n_elems < 2:
+        return elems
+
+    # combine neighbouring pairs and scan over the pairs
+    reduced = operator(
+        tuple(e[0:-1:2] for e in elems),
+        tuple(e[1::2] for e in elems)
+    )
+    odd = _associative_scan(operator, reduced)
+
+    # fill in the remaining (even) positions
+    if n_elems % 2 == 0:
+        even = operator(
+            tuple(o[:-1] for o in odd),
+            tuple(e[2::2] for e in elems)
+        )
+    else:
+        even = operator(odd, tuple(e[2::2] for e in elems))
+
+    result = []
+    for (e, ev, o) in zip(elems, even, odd):
+        r = np.empty_like(e)
+        r[0] = e[0]
+        r[2::2] = ev
+        r[1::2] = o
+        result.append(r)
+    return tuple(result)
+
+
+def _filter_scan_operator(elems1, elems2):
+    """Combine two stacks of Kalman Filter scan elements
+
+    Each element :math:`(A, b, C, \\eta, J)` parameterizes the conditional
+    distribution :math:`P(x_t | x_s, z_{s+1:t})` and the information about
+    :math:`x_s` carried by :math:`z_{s+1:t}`.  `elems1` must precede `elems2`
+    in time.
+    """
+    (A1, b1, C1, eta1, J1) = elems1
+    (A2, b2, C2, eta2, J2) = elems2
+    n_dim_state = A1.shape[-1]
+    I = np.eye(n_dim_state)
+
+    M = np.linalg.inv(I + np.matmul(C1, J2))
+    N = np.linalg.inv(I + np.matmul(J2, C1))
+    A2M = np.matmul(A2, M)
+    A1T_N = np.matmul(_transpose(A1), N)
+
+    A = np.matmul(A2M, A1)
+    b = (
+        np.einsum('tij,tj->ti', A2M, b1 + np.einsum('tij,tj->ti', C1, eta2))
+        + b2
+    )
+    C = np.matmul(np.matmul(A2M, C1), _transpose(A2)) + C2
+    eta = (
+        np.einsum('tij,tj->ti', A1T_N,
+                  eta2 - np.einsum('tij,tj->ti', J2, b1))
+        + eta1
+    )
+    J = np.matmul(np.matmul(A1T_N, J2), A1) + J1
+    return (A, b, C, eta, J)
+
+
+def _smooth_scan_operator(elems1, elems2):
+    """Combine two stacks of Kalman Smoother scan elements
+
+    Each element :math:`(E, g, L)` parameterizes the conditional distribution
+    :math:`P(x_s | x_t, z_{0:T-1})`.  `elems1` must precede `elems2` in time.
+    """
+    (E1, g1, L1) = elems1
+    (E2, g2, L2) = elems2
+
+    E = np.matmul(E1, E2)
+    g = np.einsum('tij,tj->ti', E1, g2) + g1
+    L = np.matmul(np.matmul(E1, L2), _transpose(E1)) + L1
+    return (E, g, L)
+
+
+def _filter_scan(transition_matrices, observation_matrices,
+                 transition_covariance, observation_covariance,
+                 transition_offsets, observation_offsets,
+                 initial_state_mean, initial_state_covariance, observations):
+    """Apply the Kalman Filter with a parallel prefix scan
+
+    Produces the same estimates as :func:`_filter`, but instead of looping
+    over time steps each time step is turned into an element of an
+    associative operator and all filtered distributions are computed with
+    :func:`_associative_scan`.  See [1]_ for details.
+
+    Parameters
+    ----------
+    transition_matrices, observation_matrices, transition_covariance, \
+    observation_covariance, transition_offsets, observation_offsets, \
+    initial_state_mean, initial_state_covariance, observations
+        see :func:`_filter`
+
+    Returns
+    -------
+    filtered_state_means : [n_timesteps, n_dim_state] array
+        `filtered_state_means[t]` = mean of hidden state at time t given
+        observations from times [0...t]
+    filtered_state_covariances : [n_timesteps, n_dim_state, n_dim_state] array
+        `filtered_state_covariances[t]` = covariance of hidden state at time t
+        given observations from times [0...t]
+
+    References
+    ----------
+    .. [1] Särkkä, Simo and García-Fernández, Ángel F. "Temporal
+       Parallelization of Bayesian Smoothers." IEEE Transactions on
+       Automatic Control 66(1), 2021.
+    """
+    n_timesteps, n_dim_obs = observations.shape
+    n_dim_state = len(initial_state_mean)
+    I = np.eye(n_dim_state)
+
+    missing = np.any(np.ma.getmaskarray(observations), axis=1)
+    values = np.ma.filled(observations, 0.0)
+
+    H = _stack_dims(observation_matrices, n_timesteps)
+    R = _stack_dims(observation_covariance, n_timesteps)
+    d = _stack_dims(observation_offsets, n_timesteps, ndims=1)
+
+    A = np.zeros((n_timesteps, n_dim_state, n_dim_state))
+    b = np.zeros((n_timesteps, n_dim_state))
+    C = np.zeros((n_timesteps, n_dim_state, n_dim_state))
+    eta = np.zeros((n_timesteps, n_dim_state))
+    J = np.zeros((n_timesteps, n_dim_state, n_dim_state))
+
+    # the first element is the initial state corrected by the first
+    # observation
+    (_, b[0], C[0]) = _filter_correct(
+        H[0], R[0], d[0], initial_state_mean, initial_state_covariance,
+        observations[0]
+    )
+
+    # every other element describes a transition followed by a correction
+    if n_timesteps > 1:
+        F = _stack_dims(transition_matrices, n_timesteps - 1)
+        Q = _stack_dims(transition_covariance, n_timesteps - 1)
+        c = _stack_dims(transition_offsets, n_timesteps - 1, ndims=1)
+        H, R, d = H[1:], R[1:], d[1:]
+        HT = _transpose(H)
+        observed = ~missing[1:]
+
+        S_inv = np.linalg.pinv(np.matmul(np.matmul(H, Q), HT) + R)
+        K = np.matmul(np.matmul(Q, HT), S_inv)
+        K[~observed] = 0
+        I_KH = I - np.matmul(K, H)
+        HF = np.matmul(H, F)
+        HFT_S_inv = np.matmul(_transpose(HF), S_inv)
+        HFT_S_inv[~observed] = 0
+
+        A[1:] = np.matmul(I_KH, F)
+        b[1:] = (
+            np.einsum('tij,tj->ti', I_KH, c)
+            + np.einsum('tij,tj->ti', K, values[1:] - d)
+        )
+        C[1:] = np.matmul(I_KH, Q)
+        eta[1:] = np.einsum(
+            'tij,tj->ti', HFT_S_inv,
+            values[1:] - np.einsum('tij,tj->ti', H, c) - d
+        )
+        J[1:] = np.matmul(HFT_S_inv, HF)
+
+    (_, filtered_state_means, filtered_state_covariances, _, _) = (
+        _associative_scan(_filter_scan_operator, (A, b, C, eta, J))
+    )
+    return (filtered_state_means, filtered_state_covariances)
+
+
+def _smooth_scan(transition_matrices, transition_covariance,
+                 transition_offsets, filtered_state_means,
+                 filtered_state_covariances):
+    """Apply the Kalman Smoother with a parallel prefix scan
+
+    Produces the same estimates as :func:`_smooth`, but computes all smoothed
+    distributions with a reversed :func:`_associative_scan` instead of a
+    backwards loop over time steps.
+
+    Parameters
+    ----------
+    transition_matrices : [n_timesteps-1, n_dim_state, n_dim_state] or \
+    [n_dim_state, n_dim_state] array
+        `transition_matrices[t]` = transition matrix from time t to t+1
+    transition_covariance : [n_timesteps-1, n_dim_state, n_dim_state] or \
+    [n_dim_state, n_dim_state] array
+        `transition_covariance[t]` = covariance of transition from time t to
+        t+1
+    transition_offsets : [n_timesteps-1, n_dim_state] or [n_dim_state] array
+        `transition_offsets[t]` = offset of transition from time t to t+1
+    filtered_state_means : [n_timesteps, n_dim_state] array
+        `filtered_state_means[t]` = mean state estimate for time t given
+        observations from times [0...t]
+    filtered_state_covariances : [n_timesteps, n_dim_state, n_dim_state] array
+        `filtered_state_covariances[t]` = covariance of state estimate for time
+        t given observations from times [0...t]
+
+    Returns
+    -------
+    smoothed_state_means : [n_timesteps, n_dim_state]
+        mean of hidden state distributions for times [0...n_timesteps-1] given
+        all observations
+    smoothed_state_covariances : [n_timesteps, n_dim_state, n_dim_state] array
+        covariance matrix of hidden state distributions for times
+        [0...n_timesteps-1] given all observations
+    """
+    n_timesteps, n_dim_state = filtered_state_means.shape
+
+    E = np.zeros((n_timesteps, n_dim_state, n_dim_state))
+    g = np.array(filtered_state_means, dtype=np.float64)
+    L = np.array(filtered_state_covariances, dtype=np.float64)
+
+    if n_timesteps > 1:
+        F = _stack_dims(transition_matrices, n_timesteps - 1)
+        Q = _stack_dims(transition_covariance, n_timesteps - 1)
+        c = _stack_dims(transition_offsets, n_timesteps - 1, ndims=1)
+        m = filtered_state_means[:-1]
+        P = filtered_state_covariances[:-1]
+
+        P_FT = np.matmul(P, _transpose(F))
+        E[:-1] = np.matmul(
+            P_FT, np.linalg.pinv(np.matmul(F, P_FT) + Q)
+        )
+        g[:-1] = m - np.einsum(
+            'tij,tj->ti', E[:-1], np.einsum('tij,tj->ti', F, m) + c
+        )
+        L[:-1] = P - np.matmul(E[:-1], _transpose(P_FT))
+
+    (_, smoothed_state_means, smoothed_state_covariances) = (
+        _associative_scan(_smooth_scan_operator, (E, g, L), reverse=True)
+    )
+    return (smoothed_state_means, smoothed_state_covariances)
+
+
 def _smooth_pair(smoothed_state_covariances, kalman_smoothing_gain):
     r"""Calculate pairwise covariance between hidden states
 
@@ -886,35 +1589,300 @@ def _em_transition_offset(transition_matrices, smoothed_state_means):
     if n_timesteps > 1:
         return (1.0 / (n_timesteps - 1)) * transition_offset
     else:
-        return np.zeros(n_dim_state)
+        return np.zeros(n_dim_state)
+
+
+def _em_observation_offset(observation_matrices, smoothed_state_means,
+                           observations):
+    r"""Apply the EM algorithm to parameter `observation_offset`
+
+    Maximize expected log likelihood of observations with respect to the
+    observation offset `observation_offset`.
+
+    .. math::
+
+        d = \frac{1}{T} \sum_{t=0}^{T-1} z_t - C_{t} \mathbb{E}[x_{t}]
+    """
+    n_timesteps, n_dim_obs = observations.shape
+    observation_offset = np.zeros(n_dim_obs)
+    n_obs = 0
+    for t in range(n_timesteps):
+        if not np.any(np.ma.getmask(observations[t])):
+            observation_matrix = _last_dims(observation_matrices, t)
+            observation_offset += (
+                observations[t]
+                - np.dot(observation_matrix, smoothed_state_means[t])
+            )
+            n_obs += 1
+    if n_obs > 0:
+        return (1.0 / n_obs) * observation_offset
+    else:
+        return observation_offset
+
+
+def _em_statistics(transition_matrices, observation_matrices,
+                   transition_covariance, observation_covariance,
+                   transition_offsets, observation_offsets,
+                   initial_state_mean, initial_state_covariance,
+                   observations):
+    r"""Run the E-step of the EM algorithm in a single filter/smoother sweep
+
+    Rather than materializing smoothed means, covariances, smoothing gains and
+    pairwise covariances for all time steps (as :func:`_smooth` and
+    :func:`_smooth_pair` do), the sufficient statistics required by the M-step
+    are accumulated during the backward smoothing pass.  Only the filtered
+    means and covariances from the forward pass are stored; predicted
+    distributions are recomputed on the way back.  The log likelihood of all
+    observations is accumulated during the forward pass.
+
+    The backward pass needs the filtered distribution of every time step, so
+    memory is still :math:`O(T n^2)` for `T` time steps and `n` state
+    dimensions, with a smaller constant than :func:`_smooth` followed by
+    :func:`_smooth_pair`.
+
+    Parameters
+    ----------
+    transition_matrices, observation_matrices, transition_covariance, \
+    observation_covariance, transition_offsets, observation_offsets, \
+    initial_state_mean, initial_state_covariance, observations
+        see :func:`_filter`
+
+    Returns
+    -------
+    statistics : dict
+        sums over time of the smoothed moments
+        (:math:`\sum_t \mathbb{E}[x_t x_t^T]`,
+        :math:`\sum_t \mathbb{E}[x_{t+1} x_t^T]`, and so on) needed by
+        :func:`_em_from_statistics`
+    loglikelihood : float
+        log likelihood of all observations under the current parameters
+    """
+    n_timesteps, n_dim_obs = observations.shape
+    n_dim_state = len(initial_state_mean)
+
+    # forward pass
+    filtered_state_means = np.zeros((n_timesteps, n_dim_state))
+    filtered_state_covariances = np.zeros(
+        (n_timesteps, n_dim_state, n_dim_state)
+    )
+    loglikelihood = 0.0
+    for (t, state) in enumerate(
+            _filter_iter(
+                transition_matrices, observation_matrices,
+                transition_covariance, observation_covariance,
+                transition_offsets, observation_offsets,
+                initial_state_mean, initial_state_covariance, observations
+            )):
+        (_, _, _, filtered_state_means[t], filtered_state_covariances[t],
+         observation_loglikelihood) = state
+        loglikelihood += observation_loglikelihood
+
+    stats = {
+        # sums over t in [0...n_timesteps-2]
+        'x0': np.zeros(n_dim_state),
+        'x0x0': np.zeros((n_dim_state, n_dim_state)),
+        'b0': np.zeros((n_dim_state, n_dim_state)),
+        # sums over t in [1...n_timesteps-1]
+        'x1': np.zeros(n_dim_state),
+        'x1x1': np.zeros((n_dim_state, n_dim_state)),
+        'b1': np.zeros((n_dim_state, n_dim_state)),
+        # sums over t in [1...n_timesteps-1] of pairs (x_t, x_{t-1})
+        'x1x0': np.zeros((n_dim_state, n_dim_state)),
+        'bb': np.zeros((n_dim_state, n_dim_state)),
+        # sums over observed t in [0...n_timesteps-1]
+        'n_obs': 0,
+        'd': np.zeros(n_dim_obs),
+        'z': np.zeros(n_dim_obs),
+        'zz': np.zeros((n_dim_obs, n_dim_obs)),
+        'zx': np.zeros((n_dim_obs, n_dim_state)),
+        'x': np.zeros(n_dim_state),
+        'xx': np.zeros((n_dim_state, n_dim_state)),
+        'n_timesteps': n_timesteps,
+    }
+
+    def accumulate_observation(t, mean, xx):
+        if not np.any(np.ma.getmask(observations[t])):
+            z = (np.asarray(observations[t])
+                 - _last_dims(observation_offsets, t, ndims=1))
+            stats['n_obs'] += 1
+            stats['d'] += _last_dims(observation_offsets, t, ndims=1)
+            stats['z'] += z
+            stats['zz'] += np.outer(z, z)
+            stats['zx'] += np.outer(z, mean)
+            stats['x'] += mean
+            stats['xx'] += xx
+
+    # backward pass
+    next_smoothed_state_mean = filtered_state_means[-1]
+    next_smoothed_state_covariance = filtered_state_covariances[-1]
+    next_xx = (
+        next_smoothed_state_covariance
+        + np.outer(next_smoothed_state_mean, next_smoothed_state_mean)
+    )
+    accumulate_observation(n_timesteps - 1, next_smoothed_state_mean, next_xx)
+    for t in reversed(range(n_timesteps - 1)):
+        transition_matrix = _last_dims(transition_matrices, t)
+        transition_offset = _last_dims(transition_offsets, t, ndims=1)
+        predicted_state_mean, predicted_state_covariance = _filter_predict(
+            transition_matrix,
+            _last_dims(transition_covariance, t),
+            transition_offset,
+            filtered_state_means[t],
+            filtered_state_covariances[t]
+        )
+        (smoothed_state_mean, smoothed_state_covariance,
+         kalman_smoothing_gain) = (
+            _smooth_update(
+                transition_matrix, filtered_state_means[t],
+                filtered_state_covariances[t], predicted_state_mean,
+                predicted_state_covariance, next_smoothed_state_mean,
+                next_smoothed_state_covariance
+            )
+        )
+        xx = (
+            smoothed_state_covariance
+            + np.outer(smoothed_state_mean, smoothed_state_mean)
+        )
+
+        stats['x0'] += smoothed_state_mean
+        stats['x0x0'] += xx
+        stats['b0'] += np.outer(smoothed_state_mean, transition_offset)
+        stats['x1'] += next_smoothed_state_mean
+        stats['x1x1'] += next_xx
+        stats['b1'] += np.outer(next_smoothed_state_mean, transition_offset)
+        stats['x1x0'] += (
+            np.dot(next_smoothed_state_covariance, kalman_smoothing_gain.T)
+            + np.outer(next_smoothed_state_mean, smoothed_state_mean)
+        )
+        stats['bb'] += np.outer(transition_offset, transition_offset)
+        accumulate_observation(t, smoothed_state_mean, xx)
+
+        next_smoothed_state_mean = smoothed_state_mean
+        next_smoothed_state_covariance = smoothed_state_covariance
+        next_xx = xx
+
+    stats['initial_state_mean'] = next_smoothed_state_mean
+    stats['initial_state_covariance'] = next_smoothed_state_covariance
+    return (stats, loglikelihood)
+
+
+def _em_from_statistics(statistics, given={}):
+    """Apply the M-step of the EM algorithm to accumulated statistics
+
+    Computes the same estimates as :func:`_em`, but from the sums returned by
+    :func:`_em_statistics` instead of per-time step smoothed moments.
+    Transition and observation matrices which are not estimated must be
+    constant for all time.
+
+    Parameters
+    ----------
+    statistics : dict
+        sufficient statistics from :func:`_em_statistics`
+    given : dict
+        if one of the variables EM is capable of predicting is in given, then
+        that value will be used and EM will not attempt to estimate it.
+
+    Returns
+    -------
+    transition_matrix, observation_matrix, transition_offsets, \
+    observation_offsets, transition_covariance, observation_covariance, \
+    initial_state_mean, initial_state_covariance
+        see :func:`_em`
+    """
+    s = statistics
+    n_timesteps = s['n_timesteps']
+    n_obs = s['n_obs']
+
+    if 'observation_matrices' in given:
+        observation_matrix = given['observation_matrices']
+    else:
+        observation_matrix = np.dot(s['zx'], linalg.pinv(s['xx']))
+
+    if 'observation_covariance' in given:
+        observation_covariance = given['observation_covariance']
+    else:
+        C = _arg_or_default(None, observation_matrix, 2,
+                            "observation_matrices")
+        C_xz = np.dot(C, s['zx'].T)
+        observation_covariance = (
+            s['zz'] - C_xz - C_xz.T + np.dot(C, np.dot(s['xx'], C.T))
+        )
+        if n_obs > 0:
+            observation_covariance = (1.0 / n_obs) * observation_covariance
+
+    if 'transition_matrices' in given:
+        transition_matrix = given['transition_matrices']
+    else:
+        transition_matrix = np.dot(s['x1x0'] - s['b0'].T,
+                                   linalg.pinv(s['x0x0']))
 
+    if 'transition_covariance' in given:
+        transition_covariance = given['transition_covariance']
+    else:
+        A = _arg_or_default(None, transition_matrix, 2,
+                            "transition_matrices")
+        A_x0x1 = np.dot(A, s['x1x0'].T)
+        A_x0b = np.dot(A, s['b0'])
+        transition_covariance = (1.0 / (n_timesteps - 1)) * (
+            s['x1x1'] - A_x0x1 - A_x0x1.T
+            + np.dot(A, np.dot(s['x0x0'], A.T))
+            - s['b1'] - s['b1'].T + A_x0b + A_x0b.T
+            + s['bb']
+        )
 
-def _em_observation_offset(observation_matrices, smoothed_state_means,
-                           observations):
-    r"""Apply the EM algorithm to parameter `observation_offset`
+    if 'initial_state_mean' in given:
+        initial_state_mean = given['initial_state_mean']
+    else:
+        initial_state_mean = s['initial_state_mean']
 
-    Maximize expected log likelihood of observations with respect to the
-    observation offset `observation_offset`.
+    if 'initial_state_covariance' in given:
+        initial_state_covariance = given['initial_state_covariance']
+    else:
+        x0 = s['initial_state_mean']
+        x0_x0 = s['initial_state_covariance'] + np.outer(x0, x0)
+        initial_state_covariance = (
+            x0_x0
+            - np.outer(initial_state_mean, x0)
+            - np.outer(x0, initial_state_mean)
+            + np.outer(initial_state_mean, initial_state_mean)
+        )
 
-    .. math::
+    if 'transition_offsets' in given:
+        transition_offset = given['transition_offsets']
+    elif n_timesteps > 1:
+        A = _arg_or_default(None, transition_matrix, 2,
+                            "transition_matrices")
+        transition_offset = (1.0 / (n_timesteps - 1)) * (
+            s['x1'] - np.dot(A, s['x0'])
+        )
+    else:
+        transition_offset = np.zeros(len(s['x0']))
 
-        d = \frac{1}{T} \sum_{t=0}^{T-1} z_t - C_{t} \mathbb{E}[x_{t}]
-    """
-    n_timesteps, n_dim_obs = observations.shape
-    observation_offset = np.zeros(n_dim_obs)
-    n_obs = 0
-    for t in range(n_timesteps):
-        if not np.any(np.ma.getmask(observations[t])):
-            observation_matrix = _last_dims(observation_matrices, t)
-            observation_offset += (
-                observations[t]
-                - np.dot(observation_matrix, smoothed_state_means[t])
-            )
-            n_obs += 1
-    if n_obs > 0:
-        return (1.0 / n_obs) * observation_offset
+    if 'observation_offsets' in given:
+        observation_offset = given['observation_offsets']
+    elif n_obs > 0:
+        C = _arg_or_default(None, observation_matrix, 2,
+                            "observation_matrices")
+        # observations were accumulated relative to the previous offsets
+        observation_offset = (1.0 / n_obs) * (
+            s['z'] + s['d'] - np.dot(C, s['x'])
+        )
     else:
-        return observation_offset
+        observation_offset = np.zeros(len(s['z']))
+
+    return (transition_matrix, observation_matrix, transition_offset,
+            observation_offset, transition_covariance,
+            observation_covariance, initial_state_mean,
+            initial_state_covariance)
+
+
+def _em_converged(loglikelihood, previous_loglikelihood, tol):
+    """Check whether EM has converged given successive log likelihoods"""
+    return (
+        tol is not None
+        and previous_loglikelihood is not None
+        and abs(loglikelihood - previous_loglikelihood) < tol
+    )
 
 
 class KalmanFilter(object):
@@ -1005,6 +1973,10 @@ class KalmanFilter(object):
         the dimensionality of the observation space. Only meaningful when you
         do not specify initial values for `observation_matrices`,
         `observation_offsets`, or `observation_covariance`.
+    backend : optional, string
+        backend the filtering and smoothing recursions run with, either
+        'numpy' or 'numba'.  Defaults to the ``PYKALMAN_BACKEND`` environment
+        variable, or 'numpy' if it is unset.  See :mod:`pykalman.backend`.
     """
     def __init__(self, transition_matrices=None, observation_matrices=None,
             transition_covariance=None, observation_covariance=None,
@@ -1013,7 +1985,7 @@ class KalmanFilter(object):
             random_state=None,
             em_vars=['transition_covariance', 'observation_covariance',
                      'initial_state_mean', 'initial_state_covariance'],
-            n_dim_state=None, n_dim_obs=None):
+            n_dim_state=None, n_dim_obs=None, backend=None):
         """Initialize Kalman Filter"""
 
         # determine size of state space
@@ -1045,6 +2017,7 @@ class KalmanFilter(object):
         self.em_vars = em_vars
         self.n_dim_state = n_dim_state
         self.n_dim_obs = n_dim_obs
+        self.backend = backend
 
     def sample(self, n_timesteps, initial_state=None, random_state=None):
         """Sample a state sequence :math:`n_{\\text{timesteps}}` timesteps in
@@ -1129,7 +2102,7 @@ class KalmanFilter(object):
 
         return (states, np.ma.array(observations))
 
-    def filter(self, X):
+    def filter(self, X, method='sequential', timesteps=None):
         """Apply the Kalman Filter
 
         Apply the Kalman Filter to estimate the hidden state at time :math:`t`
@@ -1145,17 +2118,28 @@ class KalmanFilter(object):
             observations corresponding to times [0...n_timesteps-1].  If `X` is
             a masked array and any of `X[t]` is masked, then `X[t]` will be
             treated as a missing observation.
+        method : {'sequential', 'scan'}, optional
+            'sequential' loops over time steps.  'scan' computes all time
+            steps with a parallel prefix scan in :math:`O(\\log T)`
+            vectorized passes, which is faster on long sequences.
+        timesteps : optional, int or array-like of ints
+            if given, only the states at these time steps are returned, e.g.
+            -1 for the final state only.  With the sequential method, states
+            at other time steps are discarded as soon as they are no longer
+            needed and filtering stops after the last requested time step.
 
         Returns
         -------
         filtered_state_means : [n_timesteps, n_dim_state]
             mean of hidden state distributions for times [0...n_timesteps-1]
-            given observations up to and including the current time step
+            given observations up to and including the current time step.
+            If `timesteps` is given, only those time steps are included and
+            if it is an int, the leading dimension is dropped.
         filtered_state_covariances : [n_timesteps, n_dim_state, n_dim_state] \
         array
             covariance matrix of hidden state distributions for times
             [0...n_timesteps-1] given observations up to and including the
-            current time step
+            current time step.  Selected by `timesteps` as above.
         """
         Z = self._parse_observations(X)
 
@@ -1165,9 +2149,141 @@ class KalmanFilter(object):
             self._initialize_parameters()
         )
 
+        if method == 'scan':
+            (filtered_state_means, filtered_state_covariances) = (
+                _filter_scan(
+                    transition_matrices, observation_matrices,
+                    transition_covariance, observation_covariance,
+                    transition_offsets, observation_offsets,
+                    initial_state_mean, initial_state_covariance,
+                    Z
+                )
+            )
+            if timesteps is not None:
+                return (filtered_state_means[timesteps],
+                        filtered_state_covariances[timesteps])
+            return (filtered_state_means, filtered_state_covariances)
+        _check_method(method)
+
+        if timesteps is not None:
+            selected = np.arange(Z.shape[0])[timesteps]
+            wanted = set(np.atleast_1d(selected).tolist())
+            last = max(wanted) if wanted else -1
+            states = {}
+            for (t, state) in enumerate(
+                    _filter_iter(
+                        transition_matrices, observation_matrices,
+                        transition_covariance, observation_covariance,
+                        transition_offsets, observation_offsets,
+                        initial_state_mean, initial_state_covariance,
+                        Z[:last + 1], compute_loglikelihood=False
+                    )):
+                if t in wanted:
+                    states[t] = state[3:5]
+            if np.ndim(selected) == 0:
+                return states[int(selected)]
+            n_dim_state = len(initial_state_mean)
+            filtered_state_means = np.zeros((len(selected), n_dim_state))
+            filtered_state_covariances = np.zeros(
+                (len(selected), n_dim_state, n_dim_state)
+            )
+            for (i, t) in enumerate(selected):
+                (filtered_state_means[i],
+                 filtered_state_covariances[i]) = states[t]
+            return (filtered_state_means, filtered_state_covariances)
+
         (_, _, _, filtered_state_means,
          filtered_state_covariances) = (
             _filter(
+                transition_matrices, observation_matrices,
+                transition_covariance, observation_covariance,
+                transition_offsets, observation_offsets,
+                initial_state_mean, initial_state_covariance,
+                Z, backend=self.backend
+            )
+        )
+        return (filtered_state_means, filtered_state_covariances)
+
+    def filter_iter(self, X):
+        """Apply the Kalman Filter lazily
+
+        Generator version of :func:`KalmanFilter.filter`.  The state estimate
+        for each time step is yielded as soon as it has been computed, and
+        no history of past estimates is kept.
+
+        Parameters
+        ----------
+        X : [n_timesteps, n_dim_obs] array-like
+            observations corresponding to times [0...n_timesteps-1].  If `X` is
+            a masked array and any of `X[t]` is masked, then `X[t]` will be
+            treated as a missing observation.
+
+        Yields
+        ------
+        filtered_state_mean : [n_dim_state] array
+            mean of hidden state distribution for time t given observations
+            up to and including time t
+        filtered_state_covariance : [n_dim_state, n_dim_state] array
+            covariance of hidden state distribution for time t given
+            observations up to and including time t
+        """
+        Z = self._parse_observations(X)
+
+        (transition_matrices, transition_offsets, transition_covariance,
+         observation_matrices, observation_offsets, observation_covariance,
+         initial_state_mean, initial_state_covariance) = (
+            self._initialize_parameters()
+        )
+
+        for (_, _, _, filtered_state_mean, filtered_state_covariance, _) in (
+                _filter_iter(
+                    transition_matrices, observation_matrices,
+                    transition_covariance, observation_covariance,
+                    transition_offsets, observation_offsets,
+                    initial_state_mean, initial_state_covariance,
+                    Z, compute_loglikelihood=False
+                )):
+            yield (filtered_state_mean, filtered_state_covariance)
+
+    def filter_batch(self, X):
+        """Apply the Kalman Filter to many independent sequences at once
+
+        Equivalent to calling :func:`KalmanFilter.filter` on each of
+        `X[0], X[1], ...` in turn, but the recursion is vectorized across
+        sequences, which is much faster when there are many of them.
+        Sequences of different lengths can be padded with masked
+        observations.
+
+        Parameters
+        ----------
+        X : [n_sequences, n_timesteps, n_dim_obs] array-like
+            observations corresponding to times [0...n_timesteps-1] of each
+            sequence.  If `X` is a masked array and any of `X[i, t]` is
+            masked, then `X[i, t]` will be treated as a missing observation.
+
+        Returns
+        -------
+        filtered_state_means : [n_sequences, n_timesteps, n_dim_state] array
+            mean of hidden state distributions for times [0...n_timesteps-1]
+            of each sequence given observations up to and including the
+            current time step
+        filtered_state_covariances : [n_sequences, n_timesteps, n_dim_state,\
+        n_dim_state] array
+            covariance matrix of hidden state distributions for times
+            [0...n_timesteps-1] of each sequence given observations up to and
+            including the current time step
+        """
+        Z = self._parse_observation_batch(X)
+
+        (transition_matrices, transition_offsets, transition_covariance,
+         observation_matrices, observation_offsets, observation_covariance,
+         initial_state_mean, initial_state_covariance) = (
+            self._initialize_parameters()
+        )
+
+        (_, _, _, filtered_state_means,
+         filtered_state_covariances) = (
+            _filter_batch(
                 transition_matrices, observation_matrices,
                 transition_covariance, observation_covariance,
                 transition_offsets, observation_offsets,
@@ -1287,7 +2403,207 @@ class KalmanFilter(object):
 
         return (next_filtered_state_mean, next_filtered_state_covariance)
 
-    def smooth(self, X):
+    def steady_state(self):
+        r"""Calculate the steady-state Kalman gain
+
+        For a time-invariant model, the state covariance estimated by the
+        Kalman Filter converges to a fixed point of the discrete Riccati
+        equation irrespective of the observations.  This method solves for
+        that fixed point once; the result is cached until any of the model
+        parameters are reassigned (e.g. by :func:`KalmanFilter.em`).
+
+        Returns
+        -------
+        kalman_gain : [n_dim_state, n_dim_obs] array
+            steady-state Kalman gain
+        predicted_state_covariance : [n_dim_state, n_dim_state] array
+            steady-state covariance of state at time t given observations
+            from times [0...t-1]
+        filtered_state_covariance : [n_dim_state, n_dim_state] array
+            steady-state covariance of state at time t given observations
+            from times [0...t]
+        """
+        cache = self._steady_state_parameters()
+        return (cache['kalman_gain'].copy(),
+                cache['predicted_state_covariance'].copy(),
+                cache['filtered_state_covariance'].copy())
+
+    def steady_state_update(self, filtered_state_mean, observation=None):
+        r"""Update a Kalman Filter state estimate with the steady-state gain
+
+        Equivalent to :func:`KalmanFilter.filter_update` once the filtered
+        state covariance has converged, but only the state mean is
+        propagated.  The predict/correct step reduces to two small
+        matrix-vector products against the cached steady-state gain, making
+        this method suitable for tracking at frame rate.  Only time-invariant
+        models are supported.
+
+        Parameters
+        ----------
+        filtered_state_mean : [n_dim_state] array
+            mean estimate for state at time t given observations from times
+            [1...t]
+        observation : [n_dim_obs] array or None
+            observation from time t+1.  If `observation` is a masked array and
+            any of `observation`'s components are masked or if `observation` is
+            None, then `observation` will be treated as a missing observation.
+
+        Returns
+        -------
+        next_filtered_state_mean : [n_dim_state] array
+            mean estimate for state at time t+1 given observations from times
+            [1...t+1]
+        next_filtered_state_covariance : [n_dim_state, n_dim_state] array
+            steady-state covariance of the above estimate.  If `observation`
+            is missing, this is the steady-state predicted covariance.
+        """
+        cache = self._steady_state_parameters()
+        predicted_state_mean = cache['predicted_state_mean']
+        innovation = cache['innovation']
+
+        np.dot(cache['transition_matrix'], filtered_state_mean,
+               out=predicted_state_mean)
+        predicted_state_mean += cache['transition_offset']
+
+        if observation is None or np.any(np.ma.getmask(observation)):
+            return (predicted_state_mean.copy(),
+                    cache['predicted_state_covariance'].copy())
+
+        np.dot(cache['observation_matrix'], predicted_state_mean,
+               out=innovation)
+        innovation += cache['observation_offset']
+        np.subtract(observation, innovation, out=innovation)
+
+        next_filtered_state_mean = np.dot(cache['kalman_gain'], innovation)
+        next_filtered_state_mean += predicted_state_mean
+        return (next_filtered_state_mean,
+                cache['filtered_state_covariance'].copy())
+
+    def online(self, filtered_state_mean=None, filtered_state_covariance=None,
+               steady_state=False):
+        """Create a stateful filter for streaming observations
+
+        The returned :class:`OnlineKalmanFilter` keeps its state estimate in
+        preallocated buffers and updates them in place on every call to
+        :func:`OnlineKalmanFilter.push` or :func:`OnlineKalmanFilter.predict`.
+        Only time-invariant models are supported.
+
+        Parameters
+        ----------
+        filtered_state_mean : optional, [n_dim_state] array
+            mean estimate for the current state, e.g. the last output of
+            :func:`KalmanFilter.filter`.  Defaults to `initial_state_mean`.
+        filtered_state_covariance : optional, [n_dim_state, n_dim_state] array
+            covariance of estimate for the current state.  Defaults to
+            `initial_state_covariance`.
+        steady_state : bool, optional
+            if True, use the steady-state Kalman gain (see
+            :func:`KalmanFilter.steady_state`) and only propagate the state
+            mean.  Updates are then free of heap allocations.
+
+        Returns
+        -------
+        online_filter : OnlineKalmanFilter
+            stateful filter initialized with the given state estimate
+        """
+        (transition_matrices, transition_offsets, transition_covariance,
+         observation_matrices, observation_offsets, observation_covariance,
+         initial_state_mean, initial_state_covariance) = (
+            self._initialize_parameters()
+        )
+        filtered_state_mean = _arg_or_default(
+            filtered_state_mean, initial_state_mean,
+            1, "filtered_state_mean"
+        )
+        filtered_state_covariance = _arg_or_default(
+            filtered_state_covariance, initial_state_covariance,
+            2, "filtered_state_covariance"
+        )
+
+        if steady_state:
+            (kalman_gain, _, filtered_state_covariance) = self.steady_state()
+        else:
+            kalman_gain = None
+
+        return OnlineKalmanFilter(
+            _arg_or_default(None, transition_matrices, 2,
+                            "transition_matrix"),
+            _arg_or_default(None, transition_offsets, 1,
+                            "transition_offset"),
+            _arg_or_default(None, transition_covariance, 2,
+                            "transition_covariance"),
+            _arg_or_default(None, observation_matrices, 2,
+                            "observation_matrix"),
+            _arg_or_default(None, observation_offsets, 1,
+                            "observation_offset"),
+            _arg_or_default(None, observation_covariance, 2,
+                            "observation_covariance"),
+            filtered_state_mean, filtered_state_covariance,
+            kalman_gain=kalman_gain
+        )
+
+    def _steady_state_parameters(self):
+        """Retrieve the cached steady-state solution, solving it if needed"""
+        key = (
+            self.transition_matrices, self.observation_matrices,
+            self.transition_covariance, self.observation_covariance,
+            self.transition_offsets, self.observation_offsets,
+            self.initial_state_covariance
+        )
+        cache = getattr(self, '_steady_state_cache', None)
+        if cache is not None and all(
+                a is b for (a, b) in zip(cache['key'], key)):
+            return cache
+
+        (transition_matrices, transition_offsets, transition_covariance,
+         observation_matrices, observation_offsets, observation_covariance,
+         initial_state_mean, initial_state_covariance) = (
+            self._initialize_parameters()
+        )
+        transition_matrix = _arg_or_default(
+            None, transition_matrices, 2, "transition_matrix"
+        )
+        observation_matrix = _arg_or_default(
+            None, observation_matrices, 2, "observation_matrix"
+        )
+        transition_offset = _arg_or_default(
+            None, transition_offsets, 1, "transition_offset"
+        )
+        observation_offset = _arg_or_default(
+            None, observation_offsets, 1, "observation_offset"
+        )
+        transition_covariance = _arg_or_default(
+            None, transition_covariance, 2, "transition_covariance"
+        )
+        observation_covariance = _arg_or_default(
+            None, observation_covariance, 2, "observation_covariance"
+        )
+
+        (kalman_gain, predicted_state_covariance,
+         filtered_state_covariance) = (
+            _steady_state(
+                transition_matrix, observation_matrix,
+                transition_covariance, observation_covariance,
+                initial_state_covariance
+            )
+        )
+
+        as_float = lambda x: np.ascontiguousarray(x, dtype=np.float64)
+        self._steady_state_cache = {
+            'key': key,
+            'transition_matrix': as_float(transition_matrix),
+            'transition_offset': as_float(transition_offset),
+            'observation_matrix': as_float(observation_matrix),
+            'observation_offset': as_float(observation_offset),
+            'kalman_gain': as_float(kalman_gain),
+            'predicted_state_covariance': predicted_state_covariance,
+            'filtered_state_covariance': filtered_state_covariance,
+            'predicted_state_mean': np.zeros(transition_matrix.shape[0]),
+            'innovation': np.zeros(observation_matrix.shape[0]),
+        }
+        return self._steady_state_cache
+
+    def smooth(self, X, method='sequential'):
         """Apply the Kalman Smoother
 
         Apply the Kalman Smoother to estimate the hidden state at time
@@ -1300,6 +2616,10 @@ class KalmanFilter(object):
             observations corresponding to times [0...n_timesteps-1].  If `X` is
             a masked array and any of `X[t]` is masked, then `X[t]` will be
             treated as a missing observation.
+        method : {'sequential', 'scan'}, optional
+            'sequential' loops over time steps.  'scan' computes all time
+            steps with parallel prefix scans in :math:`O(\\log T)`
+            vectorized passes, which is faster on long sequences.
 
         Returns
         -------
@@ -1318,25 +2638,43 @@ class KalmanFilter(object):
             self._initialize_parameters()
         )
 
+        if method == 'scan':
+            (filtered_state_means, filtered_state_covariances) = (
+                _filter_scan(
+                    transition_matrices, observation_matrices,
+                    transition_covariance, observation_covariance,
+                    transition_offsets, observation_offsets,
+                    initial_state_mean, initial_state_covariance, Z
+                )
+            )
+            return _smooth_scan(
+                transition_matrices, transition_covariance,
+                transition_offsets, filtered_state_means,
+                filtered_state_covariances
+            )
+        _check_method(method)
+
         (predicted_state_means, predicted_state_covariances,
          _, filtered_state_means, filtered_state_covariances) = (
             _filter(
                 transition_matrices, observation_matrices,
                 transition_covariance, observation_covariance,
                 transition_offsets, observation_offsets,
-                initial_state_mean, initial_state_covariance, Z
+                initial_state_mean, initial_state_covariance, Z,
+                backend=self.backend
             )
         )
         (smoothed_state_means, smoothed_state_covariances) = (
             _smooth(
                 transition_matrices, filtered_state_means,
                 filtered_state_covariances, predicted_state_means,
-                predicted_state_covariances
+                predicted_state_covariances, backend=self.backend
             )[:2]
         )
         return (smoothed_state_means, smoothed_state_covariances)
 
-    def em(self, X, y=None, n_iter=10, em_vars=None):
+    def em(self, X, y=None, n_iter=10, em_vars=None, method='sequential',
+           tol=None):
         """Apply the EM algorithm
 
         Apply the EM algorithm to estimate all parameters specified by
@@ -1350,11 +2688,29 @@ class KalmanFilter(object):
             a masked array and any of `X[t]`'s components is masked, then
             `X[t]` will be treated as a missing observation.
         n_iter : int, optional
-            number of EM iterations to perform
+            maximum number of EM iterations to perform
         em_vars : iterable of strings or 'all'
             variables to perform EM over.  Any variable not appearing here is
             left untouched.
+        method : {'sequential', 'fused'}, optional
+            'sequential' materializes the smoothed distributions for all time
+            steps before each M-step.  'fused' accumulates the statistics
+            needed by the M-step during the backward smoothing pass (see
+            :func:`_em_statistics`).  It stores the filtered means and
+            covariances instead of about seven arrays of that size, so its
+            memory still grows linearly with the number of time steps, by a
+            smaller factor.  With 'fused', transition and observation matrices
+            which are not estimated must be constant for all time.
+        tol : float, optional
+            if given, stop early once the log likelihood of `X` improves by
+            less than `tol` between two iterations
         """
+        if method not in ('sequential', 'fused'):
+            raise ValueError(
+                "method must be one of 'sequential' or 'fused', not {0}"
+                .format(method)
+            )
+
         Z = self._parse_observations(X)
 
         # initialize parameters
@@ -1397,7 +2753,28 @@ class KalmanFilter(object):
                 warnings.warn(warn_str)
 
         # Actual EM iterations
+        previous_loglikelihood = None
         for i in range(n_iter):
+            if method == 'fused':
+                (statistics, loglikelihood) = _em_statistics(
+                    self.transition_matrices, self.observation_matrices,
+                    self.transition_covariance, self.observation_covariance,
+                    self.transition_offsets, self.observation_offsets,
+                    self.initial_state_mean, self.initial_state_covariance,
+                    Z
+                )
+                if _em_converged(loglikelihood, previous_loglikelihood, tol):
+                    break
+                previous_loglikelihood = loglikelihood
+
+                (self.transition_matrices,  self.observation_matrices,
+                 self.transition_offsets, self.observation_offsets,
+                 self.transition_covariance, self.observation_covariance,
+                 self.initial_state_mean, self.initial_state_covariance) = (
+                    _em_from_statistics(statistics, given=given)
+                )
+                continue
+
             (predicted_state_means, predicted_state_covariances,
              kalman_gains, filtered_state_means,
              filtered_state_covariances) = (
@@ -1406,15 +2783,25 @@ class KalmanFilter(object):
                     self.transition_covariance, self.observation_covariance,
                     self.transition_offsets, self.observation_offsets,
                     self.initial_state_mean, self.initial_state_covariance,
-                    Z
+                    Z, backend=self.backend
                 )
             )
+            if tol is not None:
+                loglikelihood = np.sum(_loglikelihoods(
+                    self.observation_matrices, self.observation_offsets,
+                    self.observation_covariance, predicted_state_means,
+                    predicted_state_covariances, Z
+                ))
+                if _em_converged(loglikelihood, previous_loglikelihood, tol):
+                    break
+                previous_loglikelihood = loglikelihood
+
             (smoothed_state_means, smoothed_state_covariances,
              kalman_smoothing_gains) = (
                 _smooth(
                     self.transition_matrices, filtered_state_means,
                     filtered_state_covariances, predicted_state_means,
-                    predicted_state_covariances
+                    predicted_state_covariances, backend=self.backend
                 )
             )
             sigma_pair_smooth = _smooth_pair(
@@ -1455,32 +2842,24 @@ class KalmanFilter(object):
             self._initialize_parameters()
         )
 
-        # apply the Kalman Filter
-        (predicted_state_means, predicted_state_covariances,
-         kalman_gains, filtered_state_means,
-         filtered_state_covariances) = (
-            _filter(
+        # apply the Kalman Filter, scoring each observation as it is used
+        loglikelihood = 0.0
+        for state in _filter_iter(
                 transition_matrices, observation_matrices,
                 transition_covariance, observation_covariance,
                 transition_offsets, observation_offsets,
                 initial_state_mean, initial_state_covariance,
-                Z
-            )
-        )
-
-        # get likelihoods for each time step
-        loglikelihoods = _loglikelihoods(
-          observation_matrices, observation_offsets, observation_covariance,
-          predicted_state_means, predicted_state_covariances, Z
-        )
+                Z):
+            loglikelihood += state[5]
 
-        return np.sum(loglikelihoods)
+        return loglikelihood
 
     def _initialize_parameters(self):
         """Retrieve parameters if they exist, else replace with defaults"""
         n_dim_state, n_dim_obs = self.n_dim_state, self.n_dim_obs
 
         arguments = get_params(self)
+        arguments.pop('backend')  # not a model parameter
         defaults = {
             'transition_matrices': np.eye(n_dim_state),
             'transition_offsets': np.zeros(n_dim_state),
@@ -1532,3 +2911,254 @@ class KalmanFilter(object):
         if obs.shape[0] == 1 and obs.shape[1] > 1:
             obs = obs.T
         return obs
+
+    def _parse_observation_batch(self, obs):
+        """Safely convert a batch of observation sequences to its expected
+        format"""
+        obs = np.ma.asarray(obs)
+        if obs.ndim == 2:
+            obs = obs[:, :, np.newaxis]
+        if obs.ndim != 3:
+            raise ValueError(
+                "observations must have shape [n_sequences, n_timesteps, "
+                + "n_dim_obs], not {0}".format(obs.shape)
+            )
+        return obs
+
+
+class OnlineKalmanFilter(object):
+    """Stateful Kalman Filter for streaming observations
+
+    Holds the current state estimate of a time-invariant Linear-Gaussian
+    model in preallocated, contiguous float64 buffers.  Each call to
+    :func:`OnlineKalmanFilter.push` or :func:`OnlineKalmanFilter.predict`
+    updates these buffers in place, so the caller does not need to thread the
+    state mean and covariance through :func:`KalmanFilter.filter_update`.
+    Instances are usually created with :func:`KalmanFilter.online`.
+
+    The arrays returned by :func:`push`, :func:`predict` and the properties
+    are these internal buffers, not copies: they are overwritten by the next
+    update.  Copy them to keep an estimate across updates.  The covariances
+    are assumed to be symmetric.
+
+    Parameters
+    ----------
+    transition_matrix : [n_dim_state, n_dim_state] array-like
+        state transition matrix
+    transition_offset : [n_dim_state] array-like
+        state offset
+    transition_covariance : [n_dim_state, n_dim_state] array-like
+        state transition covariance matrix
+    observation_matrix : [n_dim_obs, n_dim_state] array-like
+        observation matrix
+    observation_offset : [n_dim_obs] array-like
+        observation offset
+    observation_covariance : [n_dim_obs, n_dim_obs] array-like
+        observation covariance matrix
+    filtered_state_mean : [n_dim_state] array-like
+        mean estimate for the current state
+    filtered_state_covariance : [n_dim_state, n_dim_state] array-like
+        covariance of estimate for the current state
+    kalman_gain : optional, [n_dim_state, n_dim_obs] array-like
+        if given, this fixed (e.g. steady-state) gain is used for every
+        update and `filtered_state_covariance` is taken as the matching
+        steady-state covariance: it is reported after every observation, and
+        the steady-state predicted covariance after every missing one.
+        Updates are then free of heap allocations.
+
+    Attributes
+    ----------
+    n_updates : int
+        number of calls to :func:`push` and :func:`predict` so far
+    last_latency : float
+        wall-clock duration of the most recent update, in seconds
+    total_latency : float
+        summed wall-clock duration of all updates, in seconds
+    """
+    def __init__(self, transition_matrix, transition_offset,
+                 transition_covariance, observation_matrix,
+                 observation_offset, observation_covariance,
+                 filtered_state_mean, filtered_state_covariance,
+                 kalman_gain=None):
+        as_float = lambda x: np.array(x, dtype=np.float64, order='C')
+
+        self._transition_matrix = as_float(transition_matrix)
+        self._transition_matrix_T = as_float(self._transition_matrix.T)
+        self._transition_offset = as_float(transition_offset)
+        self._transition_covariance = as_float(transition_covariance)
+        self._observation_matrix = as_float(observation_matrix)
+        self._observation_matrix_T = as_float(self._observation_matrix.T)
+        self._observation_offset = as_float(observation_offset)
+        self._observation_covariance = as_float(observation_covariance)
+
+        n_dim_obs, n_dim_state = self._observation_matrix.shape
+
+        # state buffers, updated in place
+        self._filtered_state_mean = as_float(filtered_state_mean)
+        self._filtered_state_covariance = as_float(filtered_state_covariance)
+        self._predicted_state_mean = np.zeros(n_dim_state)
+        self._predicted_state_covariance = np.zeros(
+            (n_dim_state, n_dim_state)
+        )
+        self._innovation = np.zeros(n_dim_obs)
+        self._innovation_covariance = np.zeros((n_dim_obs, n_dim_obs))
+        self._state_state = np.zeros((n_dim_state, n_dim_state))
+        self._obs_state = np.zeros((n_dim_obs, n_dim_state))
+        if kalman_gain is None:
+            self._steady_state = False
+            # K' = S^-1 C P is solved in this buffer and K is its transpose.
+            # It is Fortran ordered, so that LAPACK solves it in place.
+            self._kalman_gain_T = np.zeros((n_dim_obs, n_dim_state),
+                                           order='F')
+            self._kalman_gain = self._kalman_gain_T.T
+        else:
+            self._steady_state = True
+            self._kalman_gain = as_float(kalman_gain)
+            self._steady_filtered_state_covariance = as_float(
+                self._filtered_state_covariance
+            )
+            self._steady_predicted_state_covariance = (
+                np.dot(self._transition_matrix,
+                       np.dot(self._steady_filtered_state_covariance,
+                              self._transition_matrix_T))
+                + self._transition_covariance
+            )
+
+        self.n_updates = 0
+        self.last_latency = 0.0
+        self.total_latency = 0.0
+
+    @property
+    def filtered_state_mean(self):
+        """[n_dim_state] array, overwritten by every update"""
+        return self._filtered_state_mean
+
+    @property
+    def filtered_state_covariance(self):
+        """[n_dim_state, n_dim_state] array, overwritten by every update"""
+        return self._filtered_state_covariance
+
+    @property
+    def kalman_gain(self):
+        """[n_dim_state, n_dim_obs] array, gain used by the last update"""
+        return self._kalman_gain
+
+    @property
+    def mean_latency(self):
+        """Average wall-clock duration of an update, in seconds"""
+        if self.n_updates == 0:
+            return 0.0
+        return self.total_latency / self.n_updates
+
+    def predict(self):
+        """Advance the state estimate one time step without an observation
+
+        Returns
+        -------
+        filtered_state_mean : [n_dim_state] array
+            the internal state mean buffer, now holding the mean estimate for
+            state at time t+1 given observations from times [0...t].  It is
+            overwritten by the next update.
+        """
+        start = time.perf_counter()
+        self._predict()
+        np.copyto(self._filtered_state_mean, self._predicted_state_mean)
+        if self._steady_state:
+            np.copyto(self._filtered_state_covariance,
+                      self._steady_predicted_state_covariance)
+        else:
+            np.copyto(self._filtered_state_covariance,
+                      self._predicted_state_covariance)
+        self._record_latency(start)
+        return self._filtered_state_mean
+
+    def push(self, observation):
+        """Advance the state estimate one time step given an observation
+
+        Parameters
+        ----------
+        observation : [n_dim_obs] array or None
+            observation from time t+1.  If `observation` is a masked array and
+            any of `observation`'s components are masked or if `observation` is
+            None, this is equivalent to :func:`predict`.
+
+        Returns
+        -------
+        filtered_state_mean : [n_dim_state] array
+            the internal state mean buffer, now holding the mean estimate for
+            state at time t+1 given observations from times [0...t+1].  It is
+            overwritten by the next update.
+        """
+        if observation is None or np.any(np.ma.getmask(observation)):
+            return self.predict()
+
+        start = time.perf_counter()
+        self._predict()
+
+        # innovation = z - (C x + d)
+        np.dot(self._observation_matrix, self._predicted_state_mean,
+               out=self._innovation)
+        self._innovation += self._observation_offset
+        np.subtract(observation, self._innovation, out=self._innovation)
+
+        if not self._steady_state:
+            # C P and S = C P C' + R
+            np.dot(self._observation_matrix, self._predicted_state_covariance,
+                   out=self._obs_state)
+            np.dot(self._obs_state, self._observation_matrix_T,
+                   out=self._innovation_covariance)
+            self._innovation_covariance += self._observation_covariance
+
+            # K = P C' S^-1, i.e. K' = S^-1 C P as P and S are symmetric
+            np.copyto(self._kalman_gain_T, self._obs_state)
+            try:
+                # S is symmetric, its transpose is a Fortran ordered view that
+                # LAPACK factors in place
+                factor = linalg.cho_factor(self._innovation_covariance.T,
+                                           overwrite_a=True,
+                                           check_finite=False)
+                solved = linalg.cho_solve(factor, self._kalman_gain_T,
+                                          overwrite_b=True,
+                                          check_finite=False)
+            except linalg.LinAlgError:
+                # not positive definite, S was overwritten so recompute it
+                np.dot(self._obs_state, self._observation_matrix_T,
+                       out=self._innovation_covariance)
+                self._innovation_covariance += self._observation_covariance
+                solved = np.dot(linalg.pinv(self._innovation_covariance),
+                                self._obs_state)
+            if solved is not self._kalman_gain_T:
+                np.copyto(self._kalman_gain_T, solved)
+
+            # P - K C P
+            np.dot(self._kalman_gain, self._obs_state,
+                   out=self._filtered_state_covariance)
+            np.subtract(self._predicted_state_covariance,
+                        self._filtered_state_covariance,
+                        out=self._filtered_state_covariance)
+        else:
+            np.copyto(self._filtered_state_covariance,
+                      self._steady_filtered_state_covariance)
+
+        np.dot(self._kalman_gain, self._innovation,
+               out=self._filtered_state_mean)
+        self._filtered_state_mean += self._predicted_state_mean
+        self._record_latency(start)
+        return self._filtered_state_mean
+
+    def _predict(self):
+        """Fill the prediction buffers from the current state estimate"""
+        np.dot(self._transition_matrix, self._filtered_state_mean,
+               out=self._predicted_state_mean)
+        self._predicted_state_mean += self._transition_offset
+        if not self._steady_state:
+            np.dot(self._transition_matrix, self._filtered_state_covariance,
+                   out=self._state_state)
+            np.dot(self._state_state, self._transition_matrix_T,
+                   out=self._predicted_state_covariance)
+            self._predicted_state_covariance += self._transition_covariance
+
+    def _record_latency(self, start):
+        self.last_latency = time.perf_counter() - start
+        self.total_latency += self.last_latency
+        self.n_updates += 1
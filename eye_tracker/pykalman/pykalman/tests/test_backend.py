@@ -0,0 +1,124 @@
+import os
+import warnings
+from unittest import TestCase, skipIf
+
+import numpy as np
+from numpy.testing import assert_array_almost_equal
+from nose.tools import assert_true, assert_raises
+
+from pykalman import KalmanFilter, backend
+from pykalman.sqrt import BiermanKalmanFilter, CholeskyKalmanFilter
+from pykalman.datasets import load_robot
+
+
+class BackendSelectionTestSuite(TestCase):
+    """Check how the backend running the filter recursions is chosen"""
+
+    def setUp(self):
+        self.environ = os.environ.pop(backend.BACKEND_ENVIRONMENT_VARIABLE,
+                                      None)
+
+    def tearDown(self):
+        os.environ.pop(backend.BACKEND_ENVIRONMENT_VARIABLE, None)
+        if self.environ is not None:
+            os.environ[backend.BACKEND_ENVIRONMENT_VARIABLE] = self.environ
+
+    def test_default(self):
+        assert_true(backend.get_backend() == 'numpy')
+        assert_true(backend.get_backend('NumPy') == 'numpy')
+
+    def test_environment_variable(self):
+        os.environ[backend.BACKEND_ENVIRONMENT_VARIABLE] = 'numba'
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            assert_true(backend.get_backend() in backend.BACKENDS)
+        # an explicit argument wins over the environment
+        assert_true(backend.get_backend('numpy') == 'numpy')
+
+    def test_invalid(self):
+        assert_raises(ValueError, backend.get_backend, 'fortran')
+
+    @skipIf(backend.numba is not None, 'numba is installed')
+    def test_fallback(self):
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            assert_true(backend.get_backend('numba') == 'numpy')
+        assert_true(len(caught) == 1)
+
+
+@skipIf(backend.numba is None, 'numba is not installed')
+class BackendParityTestSuite(TestCase):
+    """Check that the compiled recursions match the NumPy implementation"""
+
+    def setUp(self):
+        self.data = load_robot()
+        self.observations = np.ma.array(self.data.observations[:200])
+        self.observations[[5, 50, 51]] = np.ma.masked
+
+    def build(self, KF, backend):
+        return KF(
+            self.data.transition_matrix,
+            self.data.observation_matrix,
+            self.data.transition_covariance,
+            self.data.observation_covariance,
+            self.data.transition_offsets,
+            self.data.observation_offset,
+            self.data.initial_state_mean,
+            self.data.initial_state_covariance,
+            backend=backend)
+
+    def check_filter_smooth(self, KF):
+        expected = self.build(KF, 'numpy')
+        actual = self.build(KF, 'numba')
+
+        for method in ['filter', 'smooth']:
+            (x_expected, V_expected) = (
+                getattr(expected, method)(self.observations)
+            )
+            (x_actual, V_actual) = getattr(actual, method)(self.observations)
+            assert_array_almost_equal(x_actual, x_expected)
+            assert_array_almost_equal(V_actual, V_expected)
+
+    def test_standard(self):
+        self.check_filter_smooth(KalmanFilter)
+
+        # EM runs the same recursions
+        expected = self.build(KalmanFilter, 'numpy')
+        actual = self.build(KalmanFilter, 'numba')
+        expected.em(self.observations, n_iter=3)
+        actual.em(self.observations, n_iter=3)
+        assert_array_almost_equal(actual.transition_covariance,
+                                  expected.transition_covariance)
+        assert_array_almost_equal(actual.observation_covariance,
+                                  expected.observation_covariance)
+
+    def test_cholesky(self):
+        self.check_filter_smooth(CholeskyKalmanFilter)
+
+    def test_bierman(self):
+        self.check_filter_smooth(BiermanKalmanFilter)
+
+    def test_time_varying(self):
+        # time-varying transition matrices, over short and long sequences
+        n_timesteps = self.observations.shape[0]
+        transition_matrices = np.tile(self.data.transition_matrix,
+                                      (n_timesteps - 1, 1, 1))
+        transition_matrices[::2] *= 0.9
+        for n in [2, n_timesteps]:
+            kfs = [
+                KalmanFilter(
+                    transition_matrices[:n - 1],
+                    self.data.observation_matrix,
+                    self.data.transition_covariance,
+                    self.data.observation_covariance,
+                    self.data.transition_offsets[:n - 1],
+                    self.data.observation_offset,
+                    self.data.initial_state_mean,
+                    self.data.initial_state_covariance,
+                    backend=name)
+                for name in ['numpy', 'numba']
+            ]
+            (x_expected, V_expected) = kfs[0].smooth(self.observations[:n])
+            (x_actual, V_actual) = kfs[1].smooth(self.observations[:n])
+            assert_array_almost_equal(x_actual, x_expected)
+            assert_array_almost_equal(V_actual, V_expected)
@@ -8,6 +8,10 @@ from scipy import linalg
 from nose.tools import assert_true
 
 from pykalman import KalmanFilter
+from pykalman.standard import _filter, _filter_correct, \
+    _filter_correct_loglikelihood, _loglikelihoods
+from pykalman.utils import log_multivariate_normal_density, \
+    batch_log_multivariate_normal_density
 from pykalman.datasets import load_robot
 
 
@@ -200,3 +204,320 @@ class KalmanFilterTestSuite(TestCase, KalmanFilterTests):
         self.KF = KalmanFilter
         self.data = load_robot()
 
+    def test_kalman_steady_state_update(self):
+        kf = self.KF(
+            self.data.transition_matrix,
+            self.data.observation_matrix,
+            self.data.transition_covariance,
+            self.data.observation_covariance,
+            self.data.transition_offsets[0],
+            self.data.observation_offset,
+            self.data.initial_state_mean,
+            self.data.initial_state_covariance)
+
+        # after convergence, the filtered covariance is the steady state
+        (x_filt, V_filt) = kf.filter(X=self.data.observations[:200])
+        (_, _, V_steady) = kf.steady_state()
+        assert_array_almost_equal(V_filt[-1], V_steady)
+
+        # and steady-state updates match the full updates
+        x_filt2 = x_filt[-1]
+        x_filt3 = x_filt[-1]
+        V_filt2 = V_filt[-1]
+        for t in range(200, 220):
+            (x_filt2, V_filt2) = kf.filter_update(
+                x_filt2, V_filt2, self.data.observations[t]
+            )
+            (x_filt3, V_filt3) = kf.steady_state_update(
+                x_filt3, self.data.observations[t]
+            )
+            assert_array_almost_equal(x_filt2, x_filt3)
+            assert_array_almost_equal(V_filt2, V_filt3)
+
+        # the cached solution can't be modified through what is returned
+        V_filt3[...] = 0
+        V_steady[...] = 0
+        (_, V_filt3) = kf.steady_state_update(x_filt3)
+        (_, V_pred, V_steady) = kf.steady_state()
+        assert_array_almost_equal(V_filt3, V_pred)
+        assert_true(np.all(np.diag(V_steady) > 0))
+
+    def test_kalman_online(self):
+        kf = self.KF(
+            self.data.transition_matrix,
+            self.data.observation_matrix,
+            self.data.transition_covariance,
+            self.data.observation_covariance,
+            self.data.transition_offsets[0],
+            self.data.observation_offset,
+            self.data.initial_state_mean,
+            self.data.initial_state_covariance)
+
+        # observations with a few missing values
+        X = np.ma.array(self.data.observations[:50])
+        X[10:13] = np.ma.masked
+
+        (x_filt, V_filt) = kf.filter(X)
+        online = kf.online()
+        for t in range(1, X.shape[0]):
+            online.push(X[t])
+            assert_array_almost_equal(online.filtered_state_mean, x_filt[t])
+            assert_array_almost_equal(online.filtered_state_covariance,
+                                      V_filt[t])
+        assert_true(online.n_updates == X.shape[0] - 1)
+        assert_true(online.mean_latency > 0)
+
+        # steady-state mode agrees with the steady-state update
+        online = kf.online(x_filt[-1], V_filt[-1], steady_state=True)
+        x_filt2 = x_filt[-1]
+        for t in range(50, 60):
+            (x_filt2, _) = kf.steady_state_update(
+                x_filt2, self.data.observations[t]
+            )
+            online.push(self.data.observations[t])
+            assert_array_almost_equal(online.filtered_state_mean, x_filt2)
+        (x_filt2, V_filt2) = kf.steady_state_update(x_filt2)
+        assert_array_almost_equal(online.predict(), x_filt2)
+        assert_array_almost_equal(online.filtered_state_covariance, V_filt2)
+        (x_filt2, V_filt2) = kf.steady_state_update(
+            x_filt2, self.data.observations[60]
+        )
+        online.push(self.data.observations[60])
+        assert_array_almost_equal(online.filtered_state_mean, x_filt2)
+        assert_array_almost_equal(online.filtered_state_covariance, V_filt2)
+
+        # updates write to the same buffers
+        x = online.push(self.data.observations[61])
+        assert_true(online.push(self.data.observations[62]) is x)
+
+    def test_kalman_filter_batch(self):
+        kf = self.KF(
+            self.data.transition_matrix,
+            self.data.observation_matrix,
+            self.data.transition_covariance,
+            self.data.observation_covariance,
+            self.data.transition_offsets,
+            self.data.observation_offset,
+            self.data.initial_state_mean,
+            self.data.initial_state_covariance)
+
+        # three sequences with different missing observations
+        X = np.ma.array([self.data.observations[:100]] * 3)
+        X[1, 5:10] = np.ma.masked
+        X[2, 50:] = np.ma.masked
+
+        (x_filt, V_filt) = kf.filter_batch(X)
+        for i in range(X.shape[0]):
+            (x_filt2, V_filt2) = kf.filter(X[i])
+            assert_array_almost_equal(x_filt[i], x_filt2)
+            assert_array_almost_equal(V_filt[i], V_filt2)
+
+    def test_kalman_scan(self):
+        kf = self.KF(
+            self.data.transition_matrix,
+            self.data.observation_matrix,
+            self.data.transition_covariance,
+            self.data.observation_covariance,
+            self.data.transition_offsets,
+            self.data.observation_offset,
+            self.data.initial_state_mean,
+            self.data.initial_state_covariance)
+
+        # odd length, including missing observations
+        X = np.ma.array(self.data.observations[:301])
+        X[100:103] = np.ma.masked
+
+        (x_filt, V_filt) = kf.filter(X)
+        (x_filt2, V_filt2) = kf.filter(X, method='scan')
+        assert_array_almost_equal(x_filt, x_filt2)
+        assert_array_almost_equal(V_filt, V_filt2)
+
+        (x_smooth, V_smooth) = kf.smooth(X)
+        (x_smooth2, V_smooth2) = kf.smooth(X, method='scan')
+        assert_array_almost_equal(x_smooth, x_smooth2)
+        assert_array_almost_equal(V_smooth, V_smooth2)
+
+    def test_kalman_fused_em(self):
+        kwargs = dict(
+            transition_matrices=self.data.transition_matrix,
+            observation_matrices=self.data.observation_matrix,
+            transition_covariance=self.data.initial_transition_covariance,
+            observation_covariance=self.data.initial_observation_covariance,
+            transition_offsets=self.data.transition_offsets,
+            observation_offsets=self.data.observation_offset,
+            initial_state_mean=self.data.initial_state_mean,
+            initial_state_covariance=self.data.initial_state_covariance
+        )
+        X = np.ma.array(self.data.observations[:100])
+        X[20:25] = np.ma.masked
+
+        # time-varying transition offsets, only covariances are estimated
+        kf = self.KF(em_vars=['transition_covariance',
+                              'observation_covariance'], **kwargs)
+        kf2 = self.KF(em_vars=['transition_covariance',
+                               'observation_covariance'], **kwargs)
+        kf.em(X, n_iter=3)
+        kf2.em(X, n_iter=3, method='fused')
+        assert_array_almost_equal(kf.transition_covariance,
+                                  kf2.transition_covariance)
+        assert_array_almost_equal(kf.observation_covariance,
+                                  kf2.observation_covariance)
+
+        # all parameters are estimated
+        kwargs['transition_offsets'] = self.data.transition_offsets[0]
+        kf = self.KF(em_vars='all', **kwargs)
+        kf2 = self.KF(em_vars='all', **kwargs)
+        kf.em(X, n_iter=3)
+        kf2.em(X, n_iter=3, method='fused')
+        for k in ['transition_matrices', 'observation_matrices',
+                  'transition_offsets', 'observation_offsets',
+                  'transition_covariance', 'observation_covariance',
+                  'initial_state_mean', 'initial_state_covariance']:
+            assert_array_almost_equal(getattr(kf, k), getattr(kf2, k))
+
+    def test_kalman_em_tol(self):
+        kf = self.KF(
+            self.data.transition_matrix,
+            self.data.observation_matrix,
+            self.data.initial_transition_covariance,
+            self.data.initial_observation_covariance,
+            self.data.transition_offsets,
+            self.data.observation_offset,
+            self.data.initial_state_mean,
+            self.data.initial_state_covariance,
+            em_vars=['transition_covariance', 'observation_covariance'])
+        X = self.data.observations[:100].data
+
+        # a huge tolerance stops right after the first iteration
+        kf2 = pickle.loads(pickle.dumps(kf))
+        kf.em(X, n_iter=1, method='fused')
+        kf2.em(X, n_iter=10, method='fused', tol=np.inf)
+        assert_array_almost_equal(kf.transition_covariance,
+                                  kf2.transition_covariance)
+
+    def test_kalman_filter_timesteps(self):
+        kf = self.KF(
+            self.data.transition_matrix,
+            self.data.observation_matrix,
+            self.data.transition_covariance,
+            self.data.observation_covariance,
+            self.data.transition_offsets,
+            self.data.observation_offset,
+            self.data.initial_state_mean,
+            self.data.initial_state_covariance)
+        X = self.data.observations[:100]
+
+        (x_filt, V_filt) = kf.filter(X)
+
+        # final state only
+        (x_last, V_last) = kf.filter(X, timesteps=-1)
+        assert_array_almost_equal(x_last, x_filt[-1])
+        assert_array_almost_equal(V_last, V_filt[-1])
+
+        # subset of states
+        timesteps = [50, 10, 10, 99]
+        (x_subset, V_subset) = kf.filter(X, timesteps=timesteps)
+        assert_array_almost_equal(x_subset, x_filt[timesteps])
+        assert_array_almost_equal(V_subset, V_filt[timesteps])
+
+        # lazily
+        for (t, (x, V)) in enumerate(kf.filter_iter(X)):
+            assert_array_almost_equal(x, x_filt[t])
+            assert_array_almost_equal(V, V_filt[t])
+        assert_true(t == X.shape[0] - 1)
+
+    def test_kalman_loglikelihoods(self):
+        kf = self.KF(
+            self.data.transition_matrix,
+            self.data.observation_matrix,
+            self.data.transition_covariance,
+            self.data.observation_covariance,
+            self.data.transition_offsets,
+            self.data.observation_offset,
+            self.data.initial_state_mean,
+            self.data.initial_state_covariance)
+        X = np.ma.array(self.data.observations[:100])
+        X[10] = np.ma.masked
+
+        # batched per-step scores agree with those from the filter pass
+        Z = kf._parse_observations(X)
+        (transition_matrices, transition_offsets, transition_covariance,
+         observation_matrices, observation_offsets, observation_covariance,
+         initial_state_mean, initial_state_covariance) = (
+            kf._initialize_parameters()
+        )
+        (predicted_state_means, predicted_state_covariances, _, _, _) = (
+            _filter(
+                transition_matrices, observation_matrices,
+                transition_covariance, observation_covariance,
+                transition_offsets, observation_offsets,
+                initial_state_mean, initial_state_covariance, Z
+            )
+        )
+        loglikelihoods = _loglikelihoods(
+            observation_matrices, observation_offsets, observation_covariance,
+            predicted_state_means, predicted_state_covariances, Z
+        )
+        assert_true(loglikelihoods[10] == 0.0)
+        assert_array_almost_equal(np.sum(loglikelihoods), kf.loglikelihood(X))
+
+        # each sample scored against its own distribution
+        covars = np.array([np.eye(2), 2 * np.eye(2), [[2.0, 0.5], [0.5, 1.0]]])
+        means = np.array([[0.0, 1.0], [1.0, 0.0], [2.0, 2.0]])
+        samples = np.array([[0.5, 0.5], [1.0, 1.0], [3.0, 1.0]])
+        log_prob = batch_log_multivariate_normal_density(
+            samples, means, covars
+        )
+        for i in range(3):
+            assert_array_almost_equal(
+                log_prob[i],
+                log_multivariate_normal_density(
+                    samples[i:i + 1], means[i:i + 1], covars[i:i + 1]
+                )[0, 0]
+            )
+
+    def test_kalman_filter_correct(self):
+        rng = np.random.RandomState(0)
+        observation_matrix = rng.randn(2, 4)
+        predicted_state_mean = rng.randn(4)
+        A = rng.randn(4, 4)
+        predicted_state_covariance = np.dot(A, A.T) + np.eye(4)
+        observation = rng.randn(2)
+        observation_offset = rng.randn(2)
+
+        # without the log likelihood, the correction is the same, also for
+        # the asymmetric observation covariances EM can leave behind
+        for observation_covariance in [np.eye(2), [[1.0, 0.3], [0.1, 2.0]]]:
+            observation_covariance = np.asarray(observation_covariance)
+            (kalman_gain, x_filt, V_filt, loglikelihood) = (
+                _filter_correct_loglikelihood(
+                    observation_matrix, observation_covariance,
+                    observation_offset, predicted_state_mean,
+                    predicted_state_covariance, observation
+                )
+            )
+            (kalman_gain2, x_filt2, V_filt2) = _filter_correct(
+                observation_matrix, observation_covariance,
+                observation_offset, predicted_state_mean,
+                predicted_state_covariance, observation
+            )
+            assert_array_almost_equal(kalman_gain, kalman_gain2)
+            assert_array_almost_equal(x_filt, x_filt2)
+            assert_array_almost_equal(V_filt, V_filt2)
+            assert_true(loglikelihood < 0)
+
+        # a singular innovation covariance falls back on the pseudo-inverse
+        (kalman_gain, _, _) = _filter_correct(
+            np.zeros((2, 4)), np.zeros((2, 2)), observation_offset,
+            predicted_state_mean, predicted_state_covariance, observation
+        )
+        assert_array_almost_equal(kalman_gain, np.zeros((4, 2)))
+
+        # a missing observation leaves the prediction as it is
+        (_, x_filt, V_filt, loglikelihood) = _filter_correct_loglikelihood(
+            observation_matrix, np.eye(2), observation_offset,
+            predicted_state_mean, predicted_state_covariance,
+            np.ma.masked_all(2), compute_loglikelihood=False
+        )
+        assert_array_almost_equal(x_filt, predicted_state_mean)
+        assert_true(loglikelihood is None)
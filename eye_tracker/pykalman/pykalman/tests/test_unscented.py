@@ -244,3 +244,54 @@ def test_additive_initialize_parameters():
         {'observation_covariance': np.eye(3)})
     check_dims(2, 1, 1, AdditiveUnscentedKalmanFilter,
         {'initial_state_mean': np.zeros(2)})
+
+
+def check_vectorized(cls, f, g):
+    '''Check that propagating all sigma points at once changes nothing'''
+    expected = build_unscented_filter(cls)
+    actual = build_unscented_filter(cls)
+    actual.transition_functions = f
+    actual.observation_functions = g
+    actual.vectorized = True
+    Z = ma.array([0, 1, 2, 3], mask=[True, False, False, False])
+
+    for method in ['filter', 'smooth']:
+        (mu_expected, sigma_expected) = getattr(expected, method)(Z)
+        (mu_actual, sigma_actual) = getattr(actual, method)(Z)
+        assert_array_almost_equal(mu_actual, mu_expected)
+        assert_array_almost_equal(sigma_actual, sigma_expected)
+
+    (mu_expected, sigma_expected) = (
+        expected.filter_update(mu_expected[0], sigma_expected[0], Z[1])
+    )
+    (mu_actual, sigma_actual) = (
+        actual.filter_update(mu_actual[0], sigma_actual[0], Z[1])
+    )
+    assert_array_almost_equal(mu_actual, mu_expected)
+    assert_array_almost_equal(sigma_actual, sigma_expected)
+
+
+def test_unscented_vectorized():
+    A = np.array([[1, 1], [0, 1]])
+    C = np.array([[0.5, -0.3]])
+    check_vectorized(UnscentedKalmanFilter,
+                     lambda X, Y: X.dot(A.T) + Y, lambda X, Y: X.dot(C.T) + Y)
+
+
+def test_additive_vectorized():
+    A = np.array([[1, 1], [0, 1]])
+    C = np.array([[0.5, -0.3]])
+    check_vectorized(AdditiveUnscentedKalmanFilter,
+                     lambda X: X.dot(A.T), lambda X: X.dot(C.T))
+
+
+def test_vectorized_scalar_observation():
+    # with one observation dimension, g may return a 1-D array holding one
+    # value per sigma point
+    A = np.array([[1, 1], [0, 1]])
+    c = np.array([0.5, -0.3])
+    check_vectorized(UnscentedKalmanFilter,
+                     lambda X, Y: X.dot(A.T) + Y,
+                     lambda X, Y: X.dot(c) + Y[:, 0])
+    check_vectorized(AdditiveUnscentedKalmanFilter,
+                     lambda X: X.dot(A.T), lambda X: X.dot(c))
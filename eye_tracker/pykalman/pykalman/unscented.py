@@ -53,7 +53,89 @@ def points2moments(points, sigma_noise=None):
     return Moments(mu.ravel(), sigma)
 
 
-def moments2points(moments, alpha=None, beta=None, kappa=None):
+# sigma point weights by (n_dim, alpha, beta, kappa); see _sigma_weights
+_SIGMA_WEIGHTS = {}
+
+
+def _sigma_weights(n_dim, alpha, beta, kappa):
+    '''Calculate (and cache) the weights of sigma points
+
+    Returns
+    -------
+    weights_mean : [2*n_dim+1] array
+        weights for estimating the mean from sigma points
+    weights_covariance : [2*n_dim+1] array
+        weights for estimating the covariance from sigma points
+    c : float
+        squared scaling factor for all off-center points
+    '''
+    key = (n_dim, alpha, beta, kappa)
+    if key not in _SIGMA_WEIGHTS:
+        # Calculate scaling factor for all off-center points
+        lamda = (alpha * alpha) * (n_dim + kappa) - n_dim
+        c = n_dim + lamda
+
+        # Calculate weights
+        weights_mean = np.ones(2 * n_dim + 1)
+        weights_mean[0] = lamda / c
+        weights_mean[1:] = 0.5 / c
+        weights_cov = np.copy(weights_mean)
+        weights_cov[0] = lamda / c + (1 - alpha * alpha + beta)
+
+        # shared by every call, so must not be modified in place
+        weights_mean.setflags(write=False)
+        weights_cov.setflags(write=False)
+        _SIGMA_WEIGHTS[key] = (weights_mean, weights_cov, c)
+    return _SIGMA_WEIGHTS[key]
+
+
+def _cholesky(covariance, cache=None):
+    '''Upper Cholesky factor of `covariance`, looked up in `cache` if given
+
+    `cache` is a dict keyed by the shape and contents of `covariance`, so it is
+    only worth passing for matrices that repeat between time steps, such as
+    noise covariances.
+    '''
+    if cache is None:
+        return linalg.cholesky(covariance)
+    covariance = np.asarray(covariance)
+    key = (covariance.shape, covariance.tobytes())
+    if key not in cache:
+        if len(cache) >= 16:
+            # covariances are changing every step; don't let the cache grow
+            cache.clear()
+        cache[key] = linalg.cholesky(covariance)
+    return cache[key]
+
+
+def _propagate(f, points, points_noise=None, vectorized=False):
+    '''Pass each row of `points` (and of `points_noise`, if any) through `f`
+
+    If `vectorized`, `f` is called once on all points and must return one
+    propagated point per row, or a 1-D array of one value per point if the
+    output has a single dimension; otherwise it is called once per point.
+
+    Returns
+    -------
+    points_pred : [n_points, n_dim_out] array
+        propagated points, one per row
+    '''
+    if vectorized:
+        if points_noise is None:
+            points_pred = f(points)
+        else:
+            points_pred = f(points, points_noise)
+        return np.asarray(points_pred).reshape(points.shape[0], -1)
+
+    n_points = points.shape[0]
+    if points_noise is None:
+        points_pred = [f(points[i]) for i in range(n_points)]
+    else:
+        points_pred = [f(points[i], points_noise[i]) for i in range(n_points)]
+    return np.vstack(points_pred)
+
+
+def moments2points(moments, alpha=None, beta=None, kappa=None, sigma2=None):
     '''Calculate "sigma points" used in Unscented Kalman Filter
 
     Parameters
@@ -67,6 +149,9 @@ def moments2points(moments, alpha=None, beta=None, kappa=None):
         2 is optimal is the state is normally distributed.
     kappa : float
         a parameter which means ????
+    sigma2 : [n_dim, n_dim] array, optional
+        lower triangular square root of the covariance in `moments`, if it
+        has already been computed
 
     Returns
     -------
@@ -85,11 +170,10 @@ def moments2points(moments, alpha=None, beta=None, kappa=None):
       kappa = 3.0 - n_dim
 
     # compute sqrt(sigma)
-    sigma2 = linalg.cholesky(sigma).T
+    if sigma2 is None:
+        sigma2 = linalg.cholesky(sigma).T
 
-    # Calculate scaling factor for all off-center points
-    lamda = (alpha * alpha) * (n_dim + kappa) - n_dim
-    c = n_dim + lamda
+    (weights_mean, weights_cov, c) = _sigma_weights(n_dim, alpha, beta, kappa)
 
     # calculate the sigma points; that is,
     #   mu
@@ -100,17 +184,11 @@ def moments2points(moments, alpha=None, beta=None, kappa=None):
     points[:, 1:(n_dim + 1)] += sigma2 * np.sqrt(c)
     points[:, (n_dim + 1):] -= sigma2 * np.sqrt(c)
 
-    # Calculate weights
-    weights_mean = np.ones(2 * n_dim + 1)
-    weights_mean[0] = lamda / c
-    weights_mean[1:] = 0.5 / c
-    weights_cov = np.copy(weights_mean)
-    weights_cov[0] = lamda / c + (1 - alpha * alpha + beta)
-
     return SigmaPoints(points.T, weights_mean, weights_cov)
 
 
-def unscented_transform(points, f=None, points_noise=None, sigma_noise=None):
+def unscented_transform(points, f=None, points_noise=None, sigma_noise=None,
+                        vectorized=False):
     '''Apply the Unscented Transform to a set of points
 
     Apply f to points (with secondary argument points_noise, if available),
@@ -129,6 +207,10 @@ def unscented_transform(points, f=None, points_noise=None, sigma_noise=None):
         points to pass into f's second argument, if any
     sigma_noise : [n_dim_state, n_dim_state] array
         covariance matrix for additive noise, if any
+    vectorized : bool
+        if True, f takes all points (and noise points) at once as
+        [n_points, n_dim] arrays and returns the transformed points, one per
+        row
 
     Returns
     -------
@@ -137,21 +219,15 @@ def unscented_transform(points, f=None, points_noise=None, sigma_noise=None):
     moments_pred : [n_dim_state] Moments
         moments associated with points_pred
     '''
-    n_points, n_dim_state = points.points.shape
     (points, weights_mean, weights_covariance) = points
 
-    # propagate points through f
+    # propagate points through f, making each row a predicted point
     if f is not None:
-        if points_noise is None:
-            points_pred = [f(points[i]) for i in range(n_points)]
-        else:
+        if points_noise is not None:
             points_noise = points_noise.points
-            points_pred = [f(points[i], points_noise[i]) for i in range(n_points)]
+        points_pred = _propagate(f, points, points_noise, vectorized)
     else:
-        points_pred = points
-
-    # make each row a predicted point
-    points_pred = np.vstack(points_pred)
+        points_pred = np.vstack(points)
     points_pred = SigmaPoints(points_pred, weights_mean, weights_covariance)
 
     # calculate approximate mean, covariance
@@ -203,13 +279,17 @@ def unscented_correct(cross_sigma, moments_pred, obs_moments_pred, z):
     return Moments(mu_filt, sigma_filt)
 
 
-def augmented_points(momentses):
+def augmented_points(momentses, cache=None):
     '''Calculate sigma points for augmented UKF
 
     Parameters
     ----------
     momentses : list of Moments
         means and covariances for multiple multivariate normals
+    cache : dict, optional
+        cache for the Cholesky factors of all covariances but the first (the
+        noise covariances, which usually stay the same between time steps);
+        see :func:`_cholesky`
 
     Returns
     -------
@@ -222,8 +302,15 @@ def augmented_points(momentses):
     sigma_aug = linalg.block_diag(*covariances)
     moments_aug = Moments(mu_aug, sigma_aug)
 
+    # the square root of a block diagonal matrix is block diagonal, so each
+    # block is factored on its own
+    sigma2_aug = linalg.block_diag(*(
+        [_cholesky(covariances[0]).T]
+        + [_cholesky(covariance, cache).T for covariance in covariances[1:]]
+    ))
+
     # turn augmented representation into sigma points
-    points_aug = moments2points(moments_aug)
+    points_aug = moments2points(moments_aug, sigma2=sigma2_aug)
 
     # unstack everything
     dims = [len(m) for m in means]
@@ -245,7 +332,7 @@ def augmented_points(momentses):
 
 def augmented_unscented_filter_points(mean_state, covariance_state,
                                       covariance_transition,
-                                      covariance_observation):
+                                      covariance_observation, cache=None):
     """Extract sigma points using augmented state representation
 
     Primarily used as a pre-processing step before predicting and updating in
@@ -263,6 +350,9 @@ def augmented_unscented_filter_points(mean_state, covariance_state,
     covariance_observation : [n_dim_obs, n_dim_obs] array
         covariance of zero-mean noise resulting from observation state at time
         t+1
+    cache : dict, optional
+        cache for the Cholesky factors of the noise covariances; see
+        :func:`augmented_points`
 
     Returns
     -------
@@ -291,14 +381,14 @@ def augmented_unscented_filter_points(mean_state, covariance_state,
             state_moments,
             transition_noise_moments,
             observation_noise_moments
-        ])
+        ], cache=cache)
     )
     return (points_state, points_transition, points_observation)
 
 
 def unscented_filter_predict(transition_function, points_state,
                              points_transition=None,
-                             sigma_transition=None):
+                             sigma_transition=None, vectorized=False):
     """Predict next state distribution
 
     Using the sigma points representing the state at time t given observations
@@ -318,6 +408,9 @@ def unscented_filter_predict(transition_function, points_state,
     sigma_transition : [n_dim_state, n_dim_state] array
         covariance corresponding to additive noise in transitioning from time
         step t to t+1, if available. If not, assumes noise is not additive.
+    vectorized : bool
+        whether `transition_function` transforms all sigma points in one call;
+        see :func:`unscented_transform`
 
     Returns
     -------
@@ -334,7 +427,8 @@ def unscented_filter_predict(transition_function, points_state,
     (points_pred, moments_pred) = (
         unscented_transform(
             points_state, transition_function,
-            points_noise=points_transition, sigma_noise=sigma_transition
+            points_noise=points_transition, sigma_noise=sigma_transition,
+            vectorized=vectorized
         )
     )
     return (points_pred, moments_pred)
@@ -343,7 +437,7 @@ def unscented_filter_predict(transition_function, points_state,
 def unscented_filter_correct(observation_function, moments_pred,
                              points_pred, observation,
                              points_observation=None,
-                             sigma_observation=None):
+                             sigma_observation=None, vectorized=False):
     """Integrate new observation to correct state estimates
 
     Parameters
@@ -364,6 +458,9 @@ def unscented_filter_correct(observation_function, moments_pred,
     sigma_observation : [n_dim_obs, n_dim_obs] array
         covariance matrix corresponding to additive noise in observation at
         time t+1, if available. If missing, noise is assumed to be non-linear.
+    vectorized : bool
+        whether `observation_function` transforms all sigma points in one
+        call; see :func:`unscented_transform`
 
     Returns
     -------
@@ -375,7 +472,8 @@ def unscented_filter_correct(observation_function, moments_pred,
     (obs_points_pred, obs_moments_pred) = (
         unscented_transform(
             points_pred, observation_function,
-            points_noise=points_observation, sigma_noise=sigma_observation
+            points_noise=points_observation, sigma_noise=sigma_observation,
+            vectorized=vectorized
         )
     )
 
@@ -391,7 +489,7 @@ def unscented_filter_correct(observation_function, moments_pred,
     return moments_filt
 
 
-def augmented_unscented_filter(mu_0, sigma_0, f, g, Q, R, Z):
+def augmented_unscented_filter(mu_0, sigma_0, f, g, Q, R, Z, vectorized=False):
     '''Apply the Unscented Kalman Filter with arbitrary noise
 
     Parameters
@@ -411,6 +509,9 @@ def augmented_unscented_filter(mu_0, sigma_0, f, g, Q, R, Z):
     R : [n_dim_state, n_dim_state] array
         observation covariance matrix
 
+    vectorized : bool
+        whether `f` and `g` transform all sigma points in one call; see
+        :func:`unscented_transform`
     Returns
     -------
     mu_filt : [T, n_dim_state] array
@@ -429,6 +530,9 @@ def augmented_unscented_filter(mu_0, sigma_0, f, g, Q, R, Z):
     mu_filt = np.zeros((T, n_dim_state))
     sigma_filt = np.zeros((T, n_dim_state, n_dim_state))
 
+    # Cholesky factors of Q and R, which are reused at every time step
+    cache = {}
+
     # TODO use _augumented_unscented_filter_update here
     for t in range(T):
         # Calculate sigma points for augmented state:
@@ -440,7 +544,7 @@ def augmented_unscented_filter(mu_0, sigma_0, f, g, Q, R, Z):
 
         # extract sigma points using augmented representation
         (points_state, points_transition, points_observation) = (
-            augmented_unscented_filter_points(mu, sigma, Q, R)
+            augmented_unscented_filter_points(mu, sigma, Q, R, cache=cache)
         )
 
         # Calculate E[x_t | z_{0:t-1}], Var(x_t | z_{0:t-1}) and sigma points
@@ -453,7 +557,8 @@ def augmented_unscented_filter(mu_0, sigma_0, f, g, Q, R, Z):
             (points_pred, moments_pred) = (
                 unscented_filter_predict(
                     transition_function, points_state,
-                    points_transition=points_transition
+                    points_transition=points_transition,
+                    vectorized=vectorized
                 )
             )
 
@@ -462,14 +567,15 @@ def augmented_unscented_filter(mu_0, sigma_0, f, g, Q, R, Z):
         mu_filt[t], sigma_filt[t] = (
             unscented_filter_correct(
                 observation_function, moments_pred, points_pred,
-                Z[t], points_observation=points_observation
+                Z[t], points_observation=points_observation,
+                vectorized=vectorized
             )
         )
 
     return (mu_filt, sigma_filt)
 
 
-def augmented_unscented_smoother(mu_filt, sigma_filt, f, Q):
+def augmented_unscented_smoother(mu_filt, sigma_filt, f, Q, vectorized=False):
     '''Apply the Unscented Kalman Smoother with arbitrary noise
 
     Parameters
@@ -486,6 +592,9 @@ def augmented_unscented_smoother(mu_filt, sigma_filt, f, Q):
     Q : [n_dim_state, n_dim_state] array
         transition covariance matrix
 
+    vectorized : bool
+        whether `f` transforms all sigma points in one call; see
+        :func:`unscented_transform`
     Returns
     -------
     mu_smooth : [T, n_dim_state] array
@@ -503,6 +612,9 @@ def augmented_unscented_smoother(mu_filt, sigma_filt, f, Q):
     sigma_smooth = np.zeros(sigma_filt.shape)
     mu_smooth[-1], sigma_smooth[-1] = mu_filt[-1], sigma_filt[-1]
 
+    # Cholesky factor of Q, which is reused at every time step
+    cache = {}
+
     for t in reversed(range(T - 1)):
         # get sigma points for [state, transition noise]
         mu = mu_filt[t]
@@ -511,13 +623,15 @@ def augmented_unscented_smoother(mu_filt, sigma_filt, f, Q):
         moments_state = Moments(mu, sigma)
         moments_transition_noise = Moments(np.zeros(n_dim_state), Q)
         (points_state, points_transition) = (
-            augmented_points([moments_state, moments_transition_noise])
+            augmented_points([moments_state, moments_transition_noise],
+                             cache=cache)
         )
 
         # compute E[x_{t+1} | z_{0:t}], Var(x_{t+1} | z_{0:t})
         f_t = _last_dims(f, t, ndims=1)[0]
         (points_pred, moments_pred) = unscented_transform(
-            points_state, f_t, points_noise=points_transition
+            points_state, f_t, points_noise=points_transition,
+            vectorized=vectorized
         )
 
         # Calculate Cov(x_{t+1}, x_t | z_{0:t-1})
@@ -544,7 +658,7 @@ def augmented_unscented_smoother(mu_filt, sigma_filt, f, Q):
     return (mu_smooth, sigma_smooth)
 
 
-def additive_unscented_filter(mu_0, sigma_0, f, g, Q, R, Z):
+def additive_unscented_filter(mu_0, sigma_0, f, g, Q, R, Z, vectorized=False):
     '''Apply the Unscented Kalman Filter with additive noise
 
     Parameters
@@ -564,6 +678,9 @@ def additive_unscented_filter(mu_0, sigma_0, f, g, Q, R, Z):
     R : [n_dim_state, n_dim_state] array
         observation covariance matrix
 
+    vectorized : bool
+        whether `f` and `g` transform all sigma points in one call; see
+        :func:`unscented_transform`
     Returns
     -------
     mu_filt : [T, n_dim_state] array
@@ -599,7 +716,8 @@ def additive_unscented_filter(mu_0, sigma_0, f, g, Q, R, Z):
             transition_function = _last_dims(f, t - 1, ndims=1)[0]
             (_, moments_pred) = (
                 unscented_filter_predict(
-                    transition_function, points_state, sigma_transition=Q
+                    transition_function, points_state, sigma_transition=Q,
+                    vectorized=vectorized
                 )
             )
             points_pred = moments2points(moments_pred)
@@ -609,14 +727,14 @@ def additive_unscented_filter(mu_0, sigma_0, f, g, Q, R, Z):
         mu_filt[t], sigma_filt[t] = (
             unscented_filter_correct(
                 observation_function, moments_pred, points_pred,
-                Z[t], sigma_observation=R
+                Z[t], sigma_observation=R, vectorized=vectorized
             )
         )
 
     return (mu_filt, sigma_filt)
 
 
-def additive_unscented_smoother(mu_filt, sigma_filt, f, Q):
+def additive_unscented_smoother(mu_filt, sigma_filt, f, Q, vectorized=False):
     '''Apply the Unscented Kalman Filter assuming additiven noise
 
     Parameters
@@ -633,6 +751,9 @@ def additive_unscented_smoother(mu_filt, sigma_filt, f, Q):
     Q : [n_dim_state, n_dim_state] array
         transition covariance matrix
 
+    vectorized : bool
+        whether `f` transforms all sigma points in one call; see
+        :func:`unscented_transform`
     Returns
     -------
     mu_smooth : [T, n_dim_state] array
@@ -661,7 +782,8 @@ def additive_unscented_smoother(mu_filt, sigma_filt, f, Q):
         # compute E[x_{t+1} | z_{0:t}], Var(x_{t+1} | z_{0:t})
         f_t = _last_dims(f, t, ndims=1)[0]
         (points_pred, moments_pred) = (
-            unscented_transform(points_state, f_t, sigma_noise=Q)
+            unscented_transform(points_state, f_t, sigma_noise=Q,
+                                vectorized=vectorized)
         )
 
         # Calculate Cov(x_{t+1}, x_t | z_{0:t-1})
@@ -693,7 +815,8 @@ class UnscentedMixin(object):
     def __init__(self, transition_functions=None, observation_functions=None,
             transition_covariance=None, observation_covariance=None,
             initial_state_mean=None, initial_state_covariance=None,
-            n_dim_state=None, n_dim_obs=None, random_state=None):
+            n_dim_state=None, n_dim_obs=None, random_state=None,
+            vectorized=False):
 
         # determine size of state and observation space
         n_dim_state = _determine_dimensionality(
@@ -717,6 +840,10 @@ class UnscentedMixin(object):
         self.n_dim_state = n_dim_state
         self.n_dim_obs = n_dim_obs
         self.random_state = random_state
+        self.vectorized = vectorized
+
+        # Cholesky factors of noise covariances, reused by filter_update
+        self._cholesky_cache = {}
 
     def _initialize_parameters(self):
         """Retrieve parameters if they exist, else replace with defaults"""
@@ -735,6 +862,14 @@ class UnscentedMixin(object):
             processed['initial_state_covariance']
         )
 
+    def _transform(self, f, x, *args):
+        """Apply `f` to a single point `x`, which must be stacked into a
+        [1, n_dim] array if `f` is vectorized"""
+        if self.vectorized:
+            args = [np.atleast_2d(arg) for arg in args]
+            return np.asarray(f(np.atleast_2d(x), *args))[0]
+        return f(x, *args)
+
     def _parse_observations(self, obs):
         """Safely convert observations to their expected format"""
         obs = ma.atleast_2d(obs)
@@ -753,6 +888,7 @@ class UnscentedMixin(object):
             'n_dim_state': int,
             'n_dim_obs': int,
             'random_state': check_random_state,
+            'vectorized': bool,
         }
 
 
@@ -805,6 +941,13 @@ class UnscentedKalmanFilter(UnscentedMixin):
         do not specify initial values for `observation_covariance`.
     random_state : optional, int or RandomState
         seed for random sample generation
+    vectorized : optional, bool
+        if True, `transition_functions` and `observation_functions` are called
+        once per time step with all sigma points stacked in a
+        [2*n_dim_aug+1, n_dim_state] array (and the matching noise points),
+        and must return the transformed points, one per row (or a 1-D array
+        of one value per point for a single dimension, such as a scalar
+        observation).  This avoids a Python call per sigma point.
     '''
     def sample(self, n_timesteps, initial_state=None, random_state=None):
         '''Sample from model defined by the Unscented Kalman Filter
@@ -856,7 +999,9 @@ class UnscentedKalmanFilter(UnscentedMixin):
                         transition_covariance.newbyteorder('=')
                     )
                 )
-                x[t] = transition_function(x[t - 1], transition_noise)
+                x[t] = self._transform(
+                    transition_function, x[t - 1], transition_noise
+                )
 
             observation_function = (
                 _last_dims(observation_functions, t, ndims=1)[0]
@@ -867,7 +1012,9 @@ class UnscentedKalmanFilter(UnscentedMixin):
                     observation_covariance.newbyteorder('=')
                 )
             )
-            z[t] = observation_function(x[t], observation_noise)
+            z[t] = self._transform(
+                observation_function, x[t], observation_noise
+            )
 
         return (x, ma.asarray(z))
 
@@ -903,7 +1050,7 @@ class UnscentedKalmanFilter(UnscentedMixin):
                 initial_state_mean, initial_state_covariance,
                 transition_functions, observation_functions,
                 transition_covariance, observation_covariance,
-                Z
+                Z, vectorized=self.vectorized
             )
         )
 
@@ -996,14 +1143,16 @@ class UnscentedKalmanFilter(UnscentedMixin):
         (points_state, points_transition, points_observation) = (
             augmented_unscented_filter_points(
                 filtered_state_mean, filtered_state_covariance,
-                transition_covariance, observation_covariance
+                transition_covariance, observation_covariance,
+                cache=self._cholesky_cache
             )
         )
 
         # predict
         (points_pred, moments_pred) = (
             unscented_filter_predict(
-                transition_function, points_state, points_transition
+                transition_function, points_state, points_transition,
+                vectorized=self.vectorized
             )
         )
 
@@ -1011,7 +1160,8 @@ class UnscentedKalmanFilter(UnscentedMixin):
         next_filtered_state_mean, next_filtered_state_covariance = (
             unscented_filter_correct(
                 observation_function, moments_pred, points_pred,
-                observation, points_observation=points_observation
+                observation, points_observation=points_observation,
+                vectorized=self.vectorized
             )
         )
 
@@ -1048,7 +1198,8 @@ class UnscentedKalmanFilter(UnscentedMixin):
         (smoothed_state_means, smoothed_state_covariances) = (
             augmented_unscented_smoother(
                 filtered_state_means, filtered_state_covariances,
-                transition_functions, transition_covariance
+                transition_functions, transition_covariance,
+                vectorized=self.vectorized
             )
         )
 
@@ -1108,6 +1259,11 @@ class AdditiveUnscentedKalmanFilter(UnscentedMixin):
         do not specify initial values for `observation_covariance`.
     random_state : optional, int or RandomState
         seed for random sample generation
+    vectorized : optional, bool
+        if True, `transition_functions` and `observation_functions` are called
+        once per time step with all sigma points stacked in a
+        [2*n_dim_state+1, n_dim_state] array, and must return the transformed
+        points, one per row.  This avoids a Python call per sigma point.
     '''
     def sample(self, n_timesteps, initial_state=None, random_state=None):
         '''Sample from model defined by the Unscented Kalman Filter
@@ -1160,7 +1316,10 @@ class AdditiveUnscentedKalmanFilter(UnscentedMixin):
                         transition_covariance.newbyteorder('=')
                     )
                 )
-                x[t] = transition_function(x[t - 1]) + transition_noise
+                x[t] = (
+                    self._transform(transition_function, x[t - 1])
+                    + transition_noise
+                )
 
             observation_function = (
                 _last_dims(observation_functions, t, ndims=1)[0]
@@ -1171,7 +1330,10 @@ class AdditiveUnscentedKalmanFilter(UnscentedMixin):
                     observation_covariance.newbyteorder('=')
                 )
             )
-            z[t] = observation_function(x[t]) + observation_noise
+            z[t] = (
+                self._transform(observation_function, x[t])
+                + observation_noise
+            )
 
         return (x, ma.asarray(z))
 
@@ -1207,7 +1369,7 @@ class AdditiveUnscentedKalmanFilter(UnscentedMixin):
                 initial_state_mean, initial_state_covariance,
                 transition_functions, observation_functions,
                 transition_covariance, observation_covariance,
-                Z
+                Z, vectorized=self.vectorized
             )
         )
 
@@ -1304,7 +1466,8 @@ class AdditiveUnscentedKalmanFilter(UnscentedMixin):
         (_, moments_pred) = (
             unscented_filter_predict(
                 transition_function, points_state,
-                sigma_transition=transition_covariance
+                sigma_transition=transition_covariance,
+                vectorized=self.vectorized
             )
         )
         points_pred = moments2points(moments_pred)
@@ -1313,7 +1476,8 @@ class AdditiveUnscentedKalmanFilter(UnscentedMixin):
         (next_filtered_state_mean, next_filtered_state_covariance) = (
             unscented_filter_correct(
                 observation_function, moments_pred, points_pred,
-                observation, sigma_observation=observation_covariance
+                observation, sigma_observation=observation_covariance,
+                vectorized=self.vectorized
             )
         )
 
@@ -1350,7 +1514,8 @@ class AdditiveUnscentedKalmanFilter(UnscentedMixin):
         (smoothed_state_means, smoothed_state_covariances) = (
             additive_unscented_smoother(
                 filtered_state_means, filtered_state_covariances,
-                transition_functions, transition_covariance
+                transition_functions, transition_covariance,
+                vectorized=self.vectorized
             )
         )
 
@@ -50,31 +50,86 @@ def array2d(X, dtype=None, order=None):
     return np.asarray(np.atleast_2d(X), dtype=dtype, order=order)
 
 
+def _batch_cholesky(covars, min_covar=1.e-7):
+    """Lower Cholesky factors for a stack of covariance matrices
+
+    Matrices which are not positive definite are regularized by adding
+    `min_covar` to their diagonal before factoring them again.
+    """
+    try:
+        return np.linalg.cholesky(covars)
+    except np.linalg.LinAlgError:
+        cv_chol = np.empty(covars.shape)
+        n_dim = covars.shape[-1]
+        for c, cv in enumerate(covars):
+            try:
+                cv_chol[c] = linalg.cholesky(cv, lower=True)
+            except linalg.LinAlgError:
+                # The model is most probabily stuck in a component with too
+                # few observations, we need to reinitialize this components
+                cv_chol[c] = linalg.cholesky(cv + min_covar * np.eye(n_dim),
+                                             lower=True)
+        return cv_chol
+
+
+def _batch_mahalanobis(cv_chol, diffs):
+    """Log determinants and squared Mahalanobis distances for a stack of
+    Cholesky factors `cv_chol` [n, n_dim, n_dim] and residuals `diffs`
+    [n, n_samples, n_dim]"""
+    cv_log_det = 2 * np.sum(
+        np.log(np.diagonal(cv_chol, axis1=-2, axis2=-1)), axis=-1
+    )
+    cv_sol = np.linalg.solve(cv_chol, np.swapaxes(diffs, -1, -2))
+    return cv_log_det, np.sum(cv_sol ** 2, axis=-2)
+
+
 def log_multivariate_normal_density(X, means, covars, min_covar=1.e-7):
     """Log probability for full covariance matrices. """
-    if hasattr(linalg, 'solve_triangular'):
-        # only in scipy since 0.9
-        solve_triangular = linalg.solve_triangular
-    else:
-        # slower, but works
-        solve_triangular = linalg.solve
+    X = np.asarray(X)
+    means = np.asarray(means)
+    covars = np.asarray(covars)
     n_samples, n_dim = X.shape
-    nmix = len(means)
-    log_prob = np.empty((n_samples, nmix))
-    for c, (mu, cv) in enumerate(zip(means, covars)):
-        try:
-            cv_chol = linalg.cholesky(cv, lower=True)
-        except linalg.LinAlgError:
-            # The model is most probabily stuck in a component with too
-            # few observations, we need to reinitialize this components
-            cv_chol = linalg.cholesky(cv + min_covar * np.eye(n_dim),
-                                      lower=True)
-        cv_log_det = 2 * np.sum(np.log(np.diagonal(cv_chol)))
-        cv_sol = solve_triangular(cv_chol, (X - mu).T, lower=True).T
-        log_prob[:, c] = - .5 * (np.sum(cv_sol ** 2, axis=1) + \
-                                     n_dim * np.log(2 * np.pi) + cv_log_det)
-
-    return log_prob
+
+    cv_chol = _batch_cholesky(covars, min_covar)
+    cv_log_det, mahalanobis = _batch_mahalanobis(
+        cv_chol, X[np.newaxis, :, :] - means[:, np.newaxis, :]
+    )
+    log_prob = - .5 * (mahalanobis + n_dim * np.log(2 * np.pi)
+                       + cv_log_det[:, np.newaxis])
+    return log_prob.T
+
+
+def batch_log_multivariate_normal_density(X, means, covars, min_covar=1.e-7):
+    """Log probability of each sample under its own full covariance Gaussian
+
+    Parameters
+    ----------
+    X : [n_samples, n_dim] array
+        samples to evaluate
+    means : [n_samples, n_dim] array
+        `means[i]` is the mean of the distribution `X[i]` is drawn from
+    covars : [n_samples, n_dim, n_dim] array
+        `covars[i]` is the covariance of the distribution `X[i]` is drawn from
+    min_covar : float
+        regularization added to the diagonal of covariances which are not
+        positive definite
+
+    Returns
+    -------
+    log_prob : [n_samples] array
+        `log_prob[i]` is the log density of `X[i]`
+    """
+    X = np.asarray(X)
+    means = np.asarray(means)
+    covars = np.asarray(covars)
+    n_samples, n_dim = X.shape
+
+    cv_chol = _batch_cholesky(covars, min_covar)
+    cv_log_det, mahalanobis = _batch_mahalanobis(
+        cv_chol, (X - means)[:, np.newaxis, :]
+    )
+    return - .5 * (mahalanobis[:, 0] + n_dim * np.log(2 * np.pi)
+                   + cv_log_det)
 
 
 def check_random_state(seed):
@@ -37,5 +37,8 @@ setup(
         'tests': [
           'nose',
         ],
+        'numba': [
+          'numba',
+        ],
     },
 )
@@ -0,0 +1,121 @@
+import math
+import os
+import shutil
+import tempfile
+
+import numpy as np
+from numpy.testing import assert_array_almost_equal
+
+from eye_tracker.calibration import Calibration, load_calibration_data, save_calibration_data, _forward_fill
+
+data_file = 'matt.csv'
+
+
+def load_calibration(file_name):
+    return Calibration(0.04, 8, 6, 1920, 1080, None, collect_data=False, file_name=file_name)
+
+
+def test_states_linearly_dependent():
+    # x + ax / k and y + ay / k are constant along the dot trajectory, so the
+    # fits of the model have singular normal equations
+    X = load_calibration(data_file).states.T
+    assert np.linalg.matrix_rank(np.dot(X, X.T)) < X.shape[0]
+    assert np.linalg.matrix_rank(np.dot(X[:, :-1], X[:, :-1].T)) < X.shape[0]
+
+
+def test_kalman_parameters_least_squares():
+    calibration = load_calibration(data_file)
+    A, H, W, Q = calibration.get_kalman_parameters()
+
+    # minimum norm least squares solutions of X2 = A X1 and Z = H X
+    X = calibration.states.T
+    X1, X2 = X[:, :-1], X[:, 1:]
+    Z = calibration.get_measurements().T
+    assert_array_almost_equal(A, np.linalg.lstsq(X1.T, X2.T, rcond=None)[0].T)
+    assert_array_almost_equal(H, np.linalg.lstsq(X.T, Z.T, rcond=None)[0].T)
+
+    residuals = X2 - np.dot(A, X1)
+    assert_array_almost_equal(W, np.dot(residuals, residuals.T) / X1.shape[1])
+    residuals = Z - np.dot(H, X)
+    assert_array_almost_equal(Q, np.dot(residuals, residuals.T) / X.shape[1])
+
+
+def test_kalman_parameters_round_trip():
+    # the same data saved in the other format gives the same model
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'data.npy')
+        original = load_calibration(data_file)
+        save_calibration_data(path, load_calibration_data(original.file_path))
+        loaded = load_calibration(path)
+
+        for expected, actual in zip(original.get_kalman_parameters(), loaded.get_kalman_parameters()):
+            assert_array_almost_equal(actual, expected)
+    finally:
+        shutil.rmtree(directory)
+
+
+def old_trajectory(dt, period, total_loops, screen_width, screen_height):
+    """The dot trajectory as the calibration built it with lists, one step at a time"""
+    total_steps = int(period / dt) * total_loops * 2
+    t = [(s + 1) * dt for s in range(total_steps)]
+    def x(t): return (screen_width / 2) * math.sin(t * ((2 * math.pi) / period)) + (screen_width / 2)
+    def y(t): return (screen_height / 2) * math.sin(t * ((2 * math.pi) / period)) + (screen_height / 2)
+    def vx(t): return ((screen_width * math.pi) / period) * math.cos(t * ((2 * math.pi) / period))
+    def vy(t): return ((screen_height * math.pi) / period) * math.cos(t * ((2 * math.pi) / period))
+    def ax(t): return ((-2 * screen_width * (math.pi ** 2)) / (period ** 2)) * math.sin(t * ((2 * math.pi) / period))
+    def ay(t): return ((-2 * screen_height * (math.pi ** 2)) / (period ** 2)) * math.sin(t * ((2 * math.pi) / period))
+
+    return t, [
+        [x(t[s]) if s < total_steps / 2 else (screen_width / 2) for s in range(total_steps)],
+        [y(t[s]) if s >= total_steps / 2 else (screen_height / 2) for s in range(total_steps)],
+        [vx(t[s]) if s < total_steps / 2 else 0 for s in range(total_steps)],
+        [vy(t[s]) if s >= total_steps / 2 else 0 for s in range(total_steps)],
+        [ax(t[s]) if s < total_steps / 2 else 0 for s in range(total_steps)],
+        [ay(t[s]) if s >= total_steps / 2 else 0 for s in range(total_steps)],
+    ]
+
+
+def test_trajectory():
+    for args in [(0.04, 8, 6, 1920, 1080), (0.033, 5, 3, 1366, 768), (0.01, 7.3, 2, 800, 600)]:
+        calibration = Calibration(*args, gaze_tracker=None, use_mp=False)
+        t, columns = old_trajectory(*args)
+
+        assert np.array_equal(calibration.t, t)
+        assert calibration.states.shape == (len(t), 6)
+        for column, expected in zip(calibration.states.T, columns):
+            assert np.array_equal(column, expected)
+        assert np.isnan(calibration.ratios).all()
+
+
+def test_forward_fill():
+    nan = np.nan
+    values = np.array([
+        [nan, 1.0, nan],
+        [nan, nan, 2.0],
+        [3.0, nan, nan],
+        [nan, 4.0, nan],
+        [nan, nan, nan],
+        [5.0, nan, 6.0],
+    ])
+    expected = np.array([
+        [7.0, 1.0, 9.0],
+        [7.0, 1.0, 2.0],
+        [3.0, 1.0, 2.0],
+        [3.0, 4.0, 2.0],
+        [3.0, 4.0, 2.0],
+        [5.0, 4.0, 6.0],
+    ])
+    previous = np.array([7.0, 8.0, 9.0])
+    original = values.copy()
+    filled = _forward_fill(values, previous)
+    assert np.array_equal(filled, expected)
+
+    # the input is not changed, and rows without NaN are kept as they are
+    assert np.array_equal(values, original, equal_nan=True)
+    assert np.array_equal(_forward_fill(expected, previous), expected)
+
+    # a column that is all NaN takes previous everywhere, NaN if previous is
+    values = np.full((3, 2), nan)
+    assert np.array_equal(_forward_fill(values, np.array([1.0, 2.0])), [[1.0, 2.0]] * 3)
+    assert np.isnan(_forward_fill(values, np.full(2, nan))).all()
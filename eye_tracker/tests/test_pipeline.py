@@ -0,0 +1,125 @@
+import queue
+import time
+
+from eye_tracker.pipeline import CursorPipeline
+from utils.bufferless_video_capture import CapturedFrame
+
+
+class Camera(object):
+    """Numbered frames, one every 2ms, as BufferlessVideoCapture.read(record=True).
+    With frames, the queue of the capture stage, a frame is only read once the
+    previous one has been taken, so that none is dropped"""
+
+    def __init__(self):
+        self.sequence = 0
+        self.frames = None
+
+    def read(self, record=False, timeout=None):
+        time.sleep(0.002)
+        if self.frames is not None and not self.frames.empty():
+            raise queue.Empty
+        self.sequence += 1
+        return CapturedFrame(self.sequence, time.monotonic(), self.sequence, 0)
+
+
+class Result(object):
+    def __init__(self, frame, located):
+        self.located = located
+        self.horizontal_ratio = 1 - frame
+        self.vertical_ratio = frame
+
+
+class GazeTracker(object):
+    """The gaze of a frame is its number. The pupils aren't located in the
+    frames in lost, and analyzing the frame fail raises an exception"""
+
+    def __init__(self, lost=(), fail=None):
+        self.lost = lost
+        self.fail = fail
+        self.detected = []
+
+    def detect_landmarks(self, frame, face_lost=False):
+        self.detected.append((frame, face_lost))
+        return frame, 'landmarks'
+
+    def analyze_landmarks(self, gray, landmarks):
+        if gray == self.fail:
+            raise ValueError('frame {}'.format(gray))
+        return Result(gray, gray not in self.lost)
+
+
+class Calibration(object):
+    def transform(self, x, y):
+        return x, y
+
+
+class CursorFilter(object):
+    def push(self, measurement):
+        return measurement
+
+
+def test_cursors_in_order():
+    pipeline = CursorPipeline(Camera(), GazeTracker(), Calibration(), CursorFilter())
+    pipeline.start()
+    try:
+        cursors = [pipeline.get() for _ in range(20)]
+    finally:
+        assert pipeline.stop()
+
+    frames = [x for x, y in cursors]
+    assert all(x == y for x, y in cursors)
+    assert all(previous < frame for previous, frame in zip(frames, frames[1:]))
+    assert len(pipeline.latencies) == 20
+    assert all(latency >= 0 for latency in pipeline.latencies)
+    mean, p95 = pipeline.latency()
+    assert 0 <= mean <= p95 < 1
+
+
+def test_stage_exception():
+    pipeline = CursorPipeline(Camera(), GazeTracker(fail=5), Calibration(), CursorFilter())
+    pipeline.start()
+    try:
+        for _ in range(1000):
+            pipeline.get()
+    except ValueError as error:
+        assert str(error) == 'frame 5'
+    else:
+        raise AssertionError('get() did not raise the exception of the analysis stage')
+    assert not pipeline.running.is_set()
+    assert pipeline.stop()
+
+
+def test_stop():
+    pipeline = CursorPipeline(Camera(), GazeTracker(), Calibration(), CursorFilter())
+    pipeline.start()
+    pipeline.get()
+
+    start = time.monotonic()
+    assert pipeline.stop(timeout=1)
+    assert time.monotonic() - start < 1
+    assert not any(thread.is_alive() for thread in pipeline.threads)
+    try:
+        pipeline.get()
+    except Exception as error:
+        assert str(error) == 'Cursor pipeline is not running.'
+    else:
+        raise AssertionError('get() did not raise once stopped')
+
+
+def test_lost_face():
+    camera = Camera()
+    gaze_tracker = GazeTracker(lost=(5,))
+    pipeline = CursorPipeline(camera, gaze_tracker, Calibration(), CursorFilter())
+    camera.frames = pipeline.frames
+    pipeline.start()
+    try:
+        cursors = [pipeline.get() for _ in range(20)]
+    finally:
+        assert pipeline.stop()
+
+    assert [frame for frame, face_lost in gaze_tracker.detected][:20] == list(range(1, 21))
+    # the next frame detected once frame 5 has been analyzed redoes the detection
+    lost = [frame for frame, face_lost in gaze_tracker.detected if face_lost]
+    assert len(lost) == 1
+    assert lost[0] > 5
+    assert pipeline.lost_faces.empty()
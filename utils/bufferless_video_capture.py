@@ -1,17 +1,31 @@
 # Credit to Ulrich Stern on Stack Overflow
 # https://stackoverflow.com/questions/45310718/opencv-python-how-to-get-latest-frame-from-the-live-video-stream-or-skip-old-on?noredirect=1&lq=1
 
-import cv2, queue, threading
+import cv2, queue, threading, time
+from collections import deque, namedtuple
+
+# frame returned by read(record=True)
+# timestamp: time.monotonic() when the frame was captured
+# sequence: number of the frame since the camera was opened
+# dropped: number of frames captured but never read since the previous read
+CapturedFrame = namedtuple('CapturedFrame', ['image', 'timestamp', 'sequence', 'dropped'])
 
 # bufferless VideoCapture
 class BufferlessVideoCapture:
-  def __init__(self, cam_index, image_width, image_height, fps):
+  def __init__(self, cam_index, image_width, image_height, fps, stats_window=120):
     self.cap = cv2.VideoCapture(cam_index)
     self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, image_width)
     self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, image_height)
     self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc('M', 'J', 'P', 'G'))
     self.cap.set(cv2.CAP_PROP_FPS, fps)
 
+    # rolling windows for stats(): capture times, read times and age of the frames read
+    self.capture_times = deque(maxlen=stats_window)
+    self.read_times = deque(maxlen=stats_window)
+    self.frame_ages = deque(maxlen=stats_window)
+    self.last_sequence = -1
+    self.dropped = 0
+
     self.q = queue.Queue()
     t = threading.Thread(target=self._reader)
     t.daemon = True
@@ -19,16 +33,51 @@ class BufferlessVideoCapture:
 
   # read frames as soon as they are available, keeping only most recent one
   def _reader(self):
+    sequence = 0
     while True:
       ret, frame = self.cap.read()
       if not ret:
         break
+      timestamp = time.monotonic()
+      self.capture_times.append(timestamp)
       if not self.q.empty():
         try:
           self.q.get_nowait() # discard previous (unprocessed) frame
         except queue.Empty:
           pass
-      self.q.put(frame)
+      self.q.put((frame, timestamp, sequence))
+      sequence += 1
+
+  # timeout: seconds to wait for a frame (None waits forever), raises queue.Empty after it
+  def read(self, record=False, timeout=None):
+    frame, timestamp, sequence = self.q.get(timeout=timeout)
+    now = time.monotonic()
+    self.read_times.append(now)
+    self.frame_ages.append(now - timestamp)
+
+    dropped = sequence - self.last_sequence - 1
+    self.last_sequence = sequence
+    self.dropped += dropped
+
+    if record:
+      return CapturedFrame(frame, timestamp, sequence, dropped)
+    return frame
+
+  # capture_fps: frames delivered by the camera per second
+  # read_fps: frames read by the consumer per second
+  # frame_age: mean time between capture and read, in seconds
+  # dropped: total number of frames never read
+  def stats(self):
+    frame_ages = list(self.frame_ages)
+    return {
+      'capture_fps': self._rate(list(self.capture_times)),
+      'read_fps': self._rate(list(self.read_times)),
+      'frame_age': sum(frame_ages) / len(frame_ages) if frame_ages else None,
+      'dropped': self.dropped,
+    }
 
-  def read(self):
-    return self.q.get()
\ No newline at end of file
+  @staticmethod
+  def _rate(times):
+    if len(times) < 2 or times[-1] == times[0]:
+      return None
+    return (len(times) - 1) / (times[-1] - times[0])